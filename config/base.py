@@ -132,6 +132,41 @@ STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static'), ]
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Fotos y mapas se guardan repartidos en subdirectorios (core.storage);
+# para migrar los archivos existentes: manage.py shard_media
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+    'media_sharded': {'BACKEND': 'core.storage.ShardedFileSystemStorage'},
+}
+
+# URLs versionadas de MEDIA (/media-v/<versión>/<ruta>) con caché inmutable.
+# En producción nginx entrega el archivo vía X-Accel-Redirect a una location interna.
+MEDIA_VERSIONED_URLS = os.getenv('MEDIA_VERSIONED_URLS', 'True') == 'True'
+MEDIA_REQUIRE_AUTH = os.getenv('MEDIA_REQUIRE_AUTH', 'True') == 'True'
+MEDIA_ACCEL_REDIRECT_PREFIX = os.getenv('MEDIA_ACCEL_REDIRECT_PREFIX', '')
+
+# Procesamiento de fotos en segundo plano (manage.py run_photo_worker).
+# Si está desactivado, las fotos se procesan dentro del request de subida.
+PHOTOS_BACKGROUND_PROCESSING = os.getenv('PHOTOS_BACKGROUND_PROCESSING', 'True') == 'True'
+
+# Subida de imágenes por partes (API móvil): archivos temporales fuera de MEDIA
+PHOTOS_UPLOAD_TMP_DIR = os.getenv('PHOTOS_UPLOAD_TMP_DIR', os.path.join(BASE_DIR, 'tmp', 'uploads'))
+
+# Caché en disco de los reportes PDF ya generados (ver pdf_reports.cache)
+PDF_CACHE_DIR = os.getenv('PDF_CACHE_DIR', os.path.join(BASE_DIR, 'tmp', 'pdf_cache'))
+# Bytes de imágenes y estilos que cada proceso guarda en memoria al generar PDF (ver pdf_reports.fetcher)
+PDF_FETCHER_CACHE_BYTES = int(os.getenv('PDF_FETCHER_CACHE_BYTES', str(64 * 1024 * 1024)))
+# Resolución de impresión de las fotos en los reportes PDF (ver pdf_reports.images)
+PDF_IMAGE_DPI = int(os.getenv('PDF_IMAGE_DPI', '200'))
+# Procesos que usa el worker de PDF para una exportación en lote (ver pdf_reports.export)
+PDF_EXPORT_WORKERS = int(os.getenv('PDF_EXPORT_WORKERS', '2'))
+# Registros que se pueden exportar desde el admin en una sola acción
+PDF_EXPORT_MAX_REGISTROS = int(os.getenv('PDF_EXPORT_MAX_REGISTROS', '500'))
+
+# Distancia máxima (metros) entre el GPS de una foto y su sitio (manage.py check_photo_geofence)
+PHOTOS_GEOFENCE_METERS = int(os.getenv('PHOTOS_GEOFENCE_METERS', '500'))
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # Custom User Model
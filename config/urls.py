@@ -4,14 +4,17 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 from django.contrib.staticfiles.urls import staticfiles_urlpatterns
+from core.views.media import serve_media
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('media-v/<str:version>/<path:path>', serve_media, name='media_versioned'),
     path('', include('core.urls.dashboard')),
     path('', include('core.urls.sitios')),
     path('', include('core.urls.contractors')),
     path('reg_txtss/', include('reg_txtss.urls')),
     path('reg_construccion/', include('reg_construccion.urls')),
+    path('photos/export/', include('photos.export_urls')),
     path('photos/', include('photos.urls')),
     path('', include('pdf_reports.urls')),
     path('dashboard/', include('dashboard.urls')),
@@ -0,0 +1,100 @@
+"""
+Cola de trabajos en base de datos compartida por los workers.
+
+Los modelos de trabajo (``photos.PhotoJob``, ``pdf_reports.PDFJob``) tienen
+los campos ``status``, ``attempts``, ``error``, ``run_after``, ``locked_at`` y
+``updated_at`` y las constantes ``STATUS_*``. Aquí se toman, se liberan y se
+reintentan los trabajos; cada app define solo cómo se ejecuta uno (su
+``handler``) y su comando de worker (ver ``core.management.worker``).
+"""
+
+import logging
+import traceback
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# Espera antes de reintentar, multiplicada por el número de intentos
+RETRY_BACKOFF = timedelta(seconds=30)
+
+
+def release_stale(model, stale_after):
+    """Devuelve a la cola los trabajos abandonados por un worker caído."""
+    limite = timezone.now() - stale_after
+    return model.objects.filter(
+        status=model.STATUS_RUNNING,
+        locked_at__lt=limite
+    ).update(status=model.STATUS_PENDING, locked_at=None)
+
+
+def claim_next(model, order_by='id'):
+    """
+    Toma el siguiente trabajo pendiente y lo marca en ejecución.
+
+    Usa ``SELECT ... FOR UPDATE SKIP LOCKED`` para que varios workers
+    puedan trabajar en paralelo sin tomar el mismo trabajo.
+    """
+    with transaction.atomic():
+        job = model.objects.select_for_update(skip_locked=True).filter(
+            status=model.STATUS_PENDING,
+            run_after__lte=timezone.now()
+        ).order_by(order_by).first()
+        if job is None:
+            return None
+        job.status = model.STATUS_RUNNING
+        job.attempts += 1
+        job.locked_at = timezone.now()
+        job.save(update_fields=['status', 'attempts', 'locked_at', 'updated_at'])
+    return job
+
+
+def _mark_finished(job):
+    """Registra el fin del trabajo si el modelo guarda ``finished_at``."""
+    if not hasattr(job, 'finished_at'):
+        return []
+    job.finished_at = timezone.now()
+    return ['finished_at']
+
+
+def run(job, handler, max_attempts):
+    """
+    Ejecuta un trabajo ya tomado y registra el resultado.
+
+    Args:
+        job: Trabajo devuelto por ``claim_next``
+        handler: ``handler(job)`` ejecuta el trabajo; puede devolver un dict
+            con campos del trabajo a guardar al terminar
+        max_attempts: Reintentos antes de marcar el trabajo como fallido
+
+    Returns:
+        bool: True si el trabajo terminó correctamente
+    """
+    try:
+        result = handler(job) or {}
+    except Exception:
+        job.error = traceback.format_exc()
+        update_fields = ['status', 'error', 'run_after', 'locked_at', 'updated_at']
+        if job.attempts < max_attempts:
+            # Reintentar más tarde con espera creciente
+            job.status = job.STATUS_PENDING
+            job.run_after = timezone.now() + RETRY_BACKOFF * job.attempts
+        else:
+            job.status = job.STATUS_FAILED
+            update_fields += _mark_finished(job)
+        job.locked_at = None
+        job.save(update_fields=update_fields)
+        logger.warning("%s %s falló (intento %s)", job._meta.verbose_name, job.pk, job.attempts)
+        return False
+
+    job.status = job.STATUS_DONE
+    job.error = ''
+    job.locked_at = None
+    for field, value in result.items():
+        setattr(job, field, value)
+    job.save(update_fields=[
+        'status', 'error', 'locked_at', 'updated_at', *_mark_finished(job), *result
+    ])
+    return True
@@ -0,0 +1,143 @@
+"""
+Comando para eliminar archivos de MEDIA que ya no están referenciados en la base de datos.
+Uso: python manage.py gc_media [--dry-run] [--dir photos --dir google_maps --dir pdf_images]
+"""
+
+import os
+import time
+
+from django.apps import apps
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import models
+
+
+class Command(BaseCommand):
+    help = 'Elimina archivos huérfanos de MEDIA (fotos, mapas, imágenes de PDF) que ninguna fila referencia'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dir',
+            action='append',
+            dest='dirs',
+            help='Subdirectorio de MEDIA a revisar (puede repetirse). Por defecto: photos, google_maps y pdf_images'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Solo informar los archivos huérfanos, sin eliminarlos',
+        )
+        parser.add_argument(
+            '--min-age-hours',
+            type=float,
+            default=24,
+            help='No tocar archivos modificados hace menos de estas horas (por defecto 24)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=2000,
+            help='Tamaño de lote para leer la base de datos y eliminar archivos (por defecto 2000)'
+        )
+
+    def handle(self, *args, **options):
+        media_root = os.path.abspath(settings.MEDIA_ROOT)
+        dirs = options['dirs'] or ['photos', 'google_maps', 'pdf_images']
+        batch_size = options['batch_size']
+        dry_run = options['dry_run']
+        limite = time.time() - options['min_age_hours'] * 3600
+
+        inicio = time.monotonic()
+        referenced = self._referenced_paths(batch_size)
+        self.stdout.write(
+            f'{len(referenced)} archivos referenciados en la base de datos '
+            f'({time.monotonic() - inicio:.1f}s)'
+        )
+
+        revisados = 0
+        huerfanos = 0
+        bytes_huerfanos = 0
+        lote = []
+        for subdir in dirs:
+            for entry in self._scan(os.path.join(media_root, subdir)):
+                revisados += 1
+                name = os.path.relpath(entry.path, media_root).replace(os.sep, '/')
+                if name in referenced:
+                    continue
+                stat = entry.stat(follow_symlinks=False)
+                if stat.st_mtime > limite:
+                    # Subida reciente: puede que su fila aún no esté guardada
+                    continue
+                huerfanos += 1
+                bytes_huerfanos += stat.st_size
+                if dry_run:
+                    self.stdout.write(f'  huérfano: {name}')
+                    continue
+                lote.append(entry.path)
+                if len(lote) >= batch_size:
+                    self._delete(lote)
+                    lote = []
+        if lote:
+            self._delete(lote)
+
+        accion = 'encontrados' if dry_run else 'eliminados'
+        self.stdout.write(self.style.SUCCESS(
+            f'Revisados {revisados} archivos: {huerfanos} huérfanos {accion} '
+            f'({bytes_huerfanos / (1024 * 1024):.1f} MB) en {time.monotonic() - inicio:.1f}s'
+        ))
+
+    def _referenced_paths(self, batch_size):
+        """
+        Conjunto de rutas referenciadas por cualquier FileField/ImageField
+        (incluidos los modelos históricos), por las versiones derivadas
+        de las fotos y por sus imágenes para PDF a la resolución actual
+        (``pdf_reports.images``). Las filas se leen en streaming con
+        ``iterator()``.
+        """
+        referenced = set()
+        for model in apps.get_models():
+            file_fields = [
+                field.name for field in model._meta.concrete_fields
+                if isinstance(field, models.FileField)
+            ]
+            for field_name in file_fields:
+                names = model._default_manager.exclude(**{field_name: ''}).exclude(
+                    **{f'{field_name}__isnull': True}
+                ).values_list(field_name, flat=True)
+                referenced.update(names.iterator(chunk_size=batch_size))
+
+        from photos.models import Photos
+        renditions = Photos.objects.exclude(renditions={}).values_list('renditions', flat=True)
+        for value in renditions.iterator(chunk_size=batch_size):
+            referenced.update(name for name in (value or {}).values() if name)
+
+        from pdf_reports.images import print_image_names
+        referenced.update(print_image_names(Photos.objects.exclude(imagen=''), batch_size))
+        return referenced
+
+    def _scan(self, path):
+        """Recorre un directorio con os.scandir (sin cargar listas completas)."""
+        stack = [path]
+        while stack:
+            current = stack.pop()
+            try:
+                with os.scandir(current) as entries:
+                    for entry in entries:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+                        elif entry.is_file(follow_symlinks=False):
+                            yield entry
+            except FileNotFoundError:
+                continue
+
+    def _delete(self, paths):
+        eliminados = 0
+        for path in paths:
+            try:
+                os.remove(path)
+                eliminados += 1
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                self.stdout.write(self.style.WARNING(f'  No se pudo eliminar {path}: {e}'))
+        self.stdout.write(f'  Lote eliminado: {eliminados} archivos')
@@ -0,0 +1,160 @@
+"""
+Comando para mover las fotos y mapas existentes al esquema de directorios repartidos.
+Uso: python manage.py shard_media [--dry-run] [--only photos|google_maps]
+"""
+
+import os
+import posixpath
+
+from django.core.management.base import BaseCommand
+from django.db import models, transaction
+from django.db.models import Case, Value, When
+from django.utils.text import capfirst
+
+from core.models.google_maps import GoogleMapsImage
+from core.storage import is_sharded
+from photos.models import Photos
+from photos.renditions import rendition_name
+
+
+class Command(BaseCommand):
+    help = 'Mueve los archivos de fotos y mapas a rutas repartidas por app/año/mes/hash'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--only',
+            choices=['photos', 'google_maps'],
+            help='Migrar solo las fotos o solo los mapas'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Solo informar cuántos archivos se moverían',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Filas leídas y actualizadas por lote (por defecto 500)'
+        )
+
+    def handle(self, *args, **options):
+        targets = {
+            'photos': (Photos, ['id', 'imagen', 'digest', 'app', 'created_at', 'renditions']),
+            'google_maps': (GoogleMapsImage, ['id', 'imagen', 'content_type', 'created_at']),
+        }
+        for key, (model, fields) in targets.items():
+            if options['only'] and options['only'] != key:
+                continue
+            self._migrate(model, fields, options['batch_size'], options['dry_run'])
+
+    def _migrate(self, model, fields, batch_size, dry_run):
+        label = model._meta.verbose_name_plural
+        field = model._meta.get_field('imagen')
+        storage = field.storage
+        has_renditions = any(f.name == 'renditions' for f in model._meta.fields)
+
+        movidos = 0
+        faltantes = 0
+        last_id = 0
+        while True:
+            # Se relee por rango de IDs: las filas ya actualizadas se saltan
+            batch = list(
+                model.objects.filter(id__gt=last_id).exclude(imagen='')
+                .only(*fields).order_by('id')[:batch_size]
+            )
+            if not batch:
+                break
+            last_id = batch[-1].id
+
+            # Nombre nuevo por archivo (varias filas pueden compartir archivo)
+            plan = {}
+            for obj in batch:
+                old = obj.imagen.name
+                if is_sharded(old) or old in plan:
+                    continue
+                new = field.generate_filename(obj, posixpath.basename(old))
+                renditions = dict(getattr(obj, 'renditions', None) or {})
+                plan[old] = (new, renditions)
+
+            if dry_run:
+                movidos += len(plan)
+                continue
+
+            updates = {}
+            for old, (new, renditions) in plan.items():
+                if not storage.exists(old):
+                    if storage.exists(new):
+                        # Movido en una ejecución anterior interrumpida
+                        updates[old] = (new, {
+                            s: rendition_name(new, s) if name else name for s, name in renditions.items()
+                        })
+                    else:
+                        faltantes += 1
+                        self.stdout.write(self.style.WARNING(f'No existe {old}'))
+                    continue
+                if storage.exists(new) and not self._is_content_addressed(new):
+                    new = storage.get_available_name(new)
+                self._move(storage, old, new)
+                new_renditions = {}
+                for size, name in renditions.items():
+                    if not name:
+                        # Versión omitida (ver photos.renditions)
+                        new_renditions[size] = name
+                        continue
+                    target = rendition_name(new, size)
+                    if name and storage.exists(name):
+                        self._move(storage, name, target)
+                    new_renditions[size] = target
+                updates[old] = (new, new_renditions)
+
+            if updates:
+                self._update_paths(model, updates, has_renditions)
+                movidos += len(updates)
+                self.stdout.write(f'  {label}: {movidos} archivos movidos (hasta id {last_id})')
+
+        accion = 'se moverían' if dry_run else 'movidos'
+        self.stdout.write(self.style.SUCCESS(
+            f'{capfirst(label)}: {movidos} archivos {accion}, {faltantes} no encontrados'
+        ))
+
+    @staticmethod
+    def _is_content_addressed(name):
+        root = posixpath.splitext(posixpath.basename(name))[0]
+        return len(root) == 64 and all(c in '0123456789abcdef' for c in root)
+
+    @staticmethod
+    def _move(storage, old, new):
+        """Mueve un archivo; en disco local es un rename (no copia los bytes)."""
+        try:
+            old_path, new_path = storage.path(old), storage.path(new)
+        except NotImplementedError:
+            if not storage.exists(new):
+                with storage.open(old, 'rb') as f:
+                    storage.save(new, f)
+            storage.delete(old)
+            return
+        os.makedirs(os.path.dirname(new_path), exist_ok=True)
+        if os.path.exists(new_path):
+            # Mismo contenido (nombre por hash): basta con quitar el anterior
+            os.remove(old_path)
+        else:
+            os.replace(old_path, new_path)
+
+    @staticmethod
+    def _update_paths(model, updates, has_renditions):
+        """Reescribe las rutas de un lote con un solo UPDATE."""
+        values = {
+            'imagen': Case(
+                *[When(imagen=old, then=Value(new)) for old, (new, _r) in updates.items()],
+                output_field=models.CharField(),
+            ),
+        }
+        if has_renditions:
+            values['renditions'] = Case(
+                *[When(imagen=old, then=Value(r, output_field=models.JSONField()))
+                  for old, (_new, r) in updates.items()],
+                output_field=models.JSONField(),
+            )
+        with transaction.atomic():
+            model.objects.filter(imagen__in=list(updates)).update(**values)
@@ -0,0 +1,81 @@
+import signal
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from core import jobs
+
+
+class WorkerCommand(BaseCommand):
+    """
+    Comando base de los workers de la cola de trabajos (``core.jobs``).
+
+    Las subclases indican el modelo de trabajo, su ``handler`` y los
+    límites de la cola; ``on_start`` y ``before_job`` permiten tareas de
+    mantenimiento propias.
+    """
+    # Nombre que aparece en los mensajes del worker
+    label = ''
+    job_model = None
+    handler = None
+    max_attempts = 3
+    stale_after = None
+    order_by = 'id'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=2.0,
+            help='Segundos de espera cuando no hay trabajos pendientes (por defecto 2)'
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Procesar los trabajos pendientes y terminar',
+        )
+
+    def on_start(self):
+        """Se ejecuta una vez, antes de tomar trabajos."""
+
+    def before_job(self, job):
+        """Se ejecuta antes de cada trabajo tomado."""
+
+    def handle(self, *args, **options):
+        self._stop = False
+        signal.signal(signal.SIGTERM, self._request_stop)
+        signal.signal(signal.SIGINT, self._request_stop)
+
+        liberados = jobs.release_stale(self.job_model, self.stale_after)
+        if liberados:
+            self.stdout.write(f'{liberados} trabajos abandonados devueltos a la cola')
+        self.on_start()
+
+        self.stdout.write(f'Worker de {self.label} iniciado')
+        procesados = 0
+        while not self._stop:
+            close_old_connections()
+            job = jobs.claim_next(self.job_model, self.order_by)
+            if job is None:
+                if options['once']:
+                    break
+                time.sleep(options['interval'])
+                continue
+
+            self.before_job(job)
+            inicio = time.monotonic()
+            ok = jobs.run(job, self.handler, self.max_attempts)
+            procesados += 1
+            duracion = time.monotonic() - inicio
+            if ok:
+                self.stdout.write(f'Trabajo {job.id} terminado en {duracion:.2f}s')
+            else:
+                self.stdout.write(self.style.WARNING(
+                    f'Trabajo {job.id} falló (intento {job.attempts}): {job.error.splitlines()[-1] if job.error else ""}'
+                ))
+
+        self.stdout.write(self.style.SUCCESS(f'Worker de {self.label} detenido ({procesados} trabajos)'))
+
+    def _request_stop(self, signum, frame):
+        self._stop = True
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.3 on 2026-10-17 18:04
+
+import core.models.google_maps
+import core.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_sharded_media_storage'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='googlemapsimage',
+            name='imagen',
+            field=models.ImageField(help_text='Imagen estática generada por Google Maps API', max_length=255, storage=core.storage.get_media_storage, upload_to=core.models.google_maps.google_maps_upload_to, verbose_name='Imagen del mapa'),
+        ),
+    ]
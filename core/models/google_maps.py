@@ -6,10 +6,18 @@ from django.db import models
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.contrib.contenttypes.models import ContentType
 from core.models.core_models import BaseModel
+from core.storage import dated_path, get_media_storage
+from core.utils.media import versioned_media_url
 import os
 import json
 
 
+def google_maps_upload_to(instance, filename):
+    """Ruta ``google_maps/<app>/<año>/<mes>/<archivo>`` (ver ``core.storage``)."""
+    app = instance.content_type.app_label if instance.content_type_id else None
+    return dated_path('google_maps', filename, app, instance.created_at)
+
+
 class GoogleMapsImage(BaseModel):
     """
     Modelo para almacenar imágenes de Google Maps generadas.
@@ -28,7 +36,9 @@ class GoogleMapsImage(BaseModel):
     
     # Archivo de imagen
     imagen = models.ImageField(
-        upload_to='google_maps/',
+        upload_to=google_maps_upload_to,
+        storage=get_media_storage,
+        max_length=255,
         verbose_name='Imagen del mapa',
         help_text='Imagen estática generada por Google Maps API'
     )
@@ -92,9 +102,9 @@ class GoogleMapsImage(BaseModel):
     
     @property
     def file_url(self):
-        """Devuelve la URL del archivo."""
+        """Devuelve la URL versionada del archivo (cambia al regenerar el mapa)."""
         if self.imagen:
-            return self.imagen.url
+            return versioned_media_url(self.imagen.name, self.updated_at, self.imagen.storage)
         return None
     
     @property
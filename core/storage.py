@@ -0,0 +1,87 @@
+"""
+Almacenamiento de MEDIA repartido en subdirectorios.
+
+Con cientos de miles de archivos en un mismo directorio (``photos/``,
+``google_maps/``) listar, crear y borrar archivos se vuelve lento. Las rutas
+se reparten por aplicación y año/mes (lo arma ``upload_to`` de cada campo) y
+este almacenamiento agrega además un subdirectorio con el prefijo del hash
+del nombre:
+
+    photos/reg_construccion/2024/01/3f/3f9a...c2.jpg
+
+El backend se configura en ``settings.STORAGES['media_sharded']``; los
+campos lo obtienen con ``get_media_storage`` para que pueda reemplazarse
+(por ejemplo por un almacenamiento S3) sin tocar los modelos.
+"""
+
+import hashlib
+import posixpath
+import re
+
+from django.core.files.storage import FileSystemStorage, InvalidStorageError, storages
+from django.utils import timezone
+
+# Un nivel de 256 subdirectorios por mes
+SHARD_LENGTH = 2
+
+_HEX_NAME = re.compile(r'^[0-9a-f]{32,64}$')
+_SHARDED = re.compile(r'^[^/]+/[^/]+/\d{4}/\d{2}/[0-9a-f]{%d}/[^/]+$' % SHARD_LENGTH)
+_SHARDED_FLAT = re.compile(r'^[^/]+/\d{4}/\d{2}/[0-9a-f]{%d}/[^/]+$' % SHARD_LENGTH)
+
+
+def shard_prefix(filename):
+    """
+    Prefijo de reparto de un archivo.
+
+    Si el nombre ya es un hash del contenido (fotos) se usan sus primeros
+    caracteres; si no, los del SHA-1 del nombre.
+    """
+    root = posixpath.splitext(posixpath.basename(filename))[0].lower()
+    if not _HEX_NAME.match(root):
+        root = hashlib.sha1(root.encode('utf-8')).hexdigest()
+    return root[:SHARD_LENGTH]
+
+
+def dated_path(prefix, filename, app=None, when=None):
+    """
+    Ruta ``<prefijo>/<app>/<año>/<mes>/<archivo>`` (sin el prefijo de hash,
+    que agrega el almacenamiento).
+    """
+    when = when or timezone.now()
+    parts = [prefix]
+    if app:
+        parts.append(app)
+    parts.extend([f'{when:%Y}', f'{when:%m}', filename])
+    return posixpath.join(*parts)
+
+
+def is_sharded(name):
+    """Indica si una ruta ya sigue el esquema repartido."""
+    return bool(_SHARDED.match(name) or _SHARDED_FLAT.match(name))
+
+
+class ShardedFileSystemStorage(FileSystemStorage):
+    """
+    ``FileSystemStorage`` que agrega un subdirectorio con el prefijo del hash
+    al nombre que entrega ``upload_to``.
+    """
+
+    def generate_filename(self, filename):
+        filename = super().generate_filename(filename).replace('\\', '/')
+        if is_sharded(filename):
+            return filename
+        dirname, basename = posixpath.split(filename)
+        return posixpath.join(dirname, shard_prefix(basename), basename)
+
+
+def get_media_storage():
+    """
+    Almacenamiento de las fotos y los mapas.
+
+    Usa ``STORAGES['media_sharded']`` y, si no está configurado, el
+    almacenamiento por defecto.
+    """
+    try:
+        return storages['media_sharded']
+    except InvalidStorageError:
+        return storages['default']
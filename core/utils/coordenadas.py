@@ -1,4 +1,5 @@
 from geopy.distance import geodesic
+import numpy as np
 import requests
 import math
 from core.models.app_settings import AppSettings
@@ -30,6 +31,30 @@ def calcular_distancia_geopy(lat_1, lon_1, lat_2, lon_2):
         return None
 
 
+# Radio medio de la Tierra (metros)
+RADIO_TIERRA_M = 6371008.8
+
+
+def calcular_distancias_haversine(lat_1, lon_1, lat_2, lon_2):
+    """
+    Calcula en lote la distancia (metros) entre pares de puntos con la
+    fórmula de haversine.
+
+    Recibe arreglos (o listas) del mismo largo y devuelve un arreglo NumPy con
+    una distancia por par, en una sola pasada vectorizada. Los pares con algún
+    valor nulo (NaN) devuelven NaN. Para distancias de pocos kilómetros la
+    diferencia con ``calcular_distancia_geopy`` (geodésica) es menor al 0,5 %.
+    """
+    lat_1, lon_1, lat_2, lon_2 = (
+        np.radians(np.asarray(v, dtype=np.float64)) for v in (lat_1, lon_1, lat_2, lon_2)
+    )
+    a = (
+        np.sin((lat_2 - lat_1) / 2) ** 2
+        + np.cos(lat_1) * np.cos(lat_2) * np.sin((lon_2 - lon_1) / 2) ** 2
+    )
+    return 2 * RADIO_TIERRA_M * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
 def calcular_distancia_entre_puntos(lat_1, lon_1, lat_2, lon_2):
     """Alias para calcular_distancia_geopy para compatibilidad."""
     return calcular_distancia_geopy(lat_1, lon_1, lat_2, lon_2)
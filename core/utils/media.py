@@ -0,0 +1,40 @@
+"""
+URLs versionadas para archivos de MEDIA.
+
+Las URLs tienen la forma ``/media-v/<versión>/<ruta>``. La versión cambia
+cuando cambia el archivo (hash del contenido o fecha de modificación), por
+lo que el navegador y la app móvil pueden guardarlas en caché de forma
+indefinida: una URL nueva implica un archivo nuevo.
+"""
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.urls import reverse
+
+
+def media_version(value):
+    """
+    Convierte un hash o una fecha en un token de versión corto.
+
+    Args:
+        value (str | datetime): Hash del contenido o fecha de modificación
+    """
+    if not value:
+        return '0'
+    if hasattr(value, 'timestamp'):
+        return format(int(value.timestamp()), 'x')
+    return str(value)[:12]
+
+
+def versioned_media_url(name, version, storage=None):
+    """
+    URL versionada de un archivo de MEDIA.
+
+    Si ``MEDIA_VERSIONED_URLS`` está desactivado devuelve la URL normal
+    del almacenamiento.
+    """
+    if not name:
+        return None
+    if not getattr(settings, 'MEDIA_VERSIONED_URLS', True):
+        return (storage or default_storage).url(name)
+    return reverse('media_versioned', kwargs={'version': media_version(version), 'path': name})
@@ -0,0 +1,129 @@
+"""
+Entrega protegida de archivos de MEDIA con caché HTTP.
+
+Django verifica la sesión (o el token JWT de la app móvil) y responde las
+peticiones condicionales (ETag / Last-Modified). El archivo en sí lo envía
+nginx mediante ``X-Accel-Redirect`` hacia una ``location`` interna, de modo
+que los workers de gunicorn no transfieren bytes de imágenes.
+
+Para las imágenes JPEG que tienen una versión WebP/AVIF junto a ellas (las
+versiones web de las fotos, ver ``photos.renditions``) se entrega el formato
+más liviano que el cliente declare en ``Accept``.
+"""
+
+import mimetypes
+import os
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+# Las URLs versionadas nunca cambian de contenido
+CACHE_CONTROL_VERSIONED = 'private, max-age=31536000, immutable'
+
+# Formatos alternativos de un JPEG, en orden de preferencia
+NEGOTIATED_FORMATS = (
+    ('image/avif', '.avif'),
+    ('image/webp', '.webp'),
+)
+
+
+def _accepted_types(request):
+    """Tipos MIME aceptados por el cliente (se descartan los de ``q=0``)."""
+    accepted = set()
+    for item in request.headers.get('Accept', '').split(','):
+        media_type, *params = [part.strip() for part in item.split(';')]
+        quality = 1.0
+        for param in params:
+            name, _eq, value = param.partition('=')
+            if name.strip() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    pass
+        if quality > 0:
+            accepted.add(media_type.lower())
+    return accepted
+
+
+def _negotiate(request, path, full_path):
+    """
+    Busca una versión WebP/AVIF del JPEG pedido que el cliente acepte.
+
+    Returns:
+        tuple: ``(path, full_path, stat, extensión)`` del archivo a entregar,
+        o None si se debe entregar el JPEG
+    """
+    root = os.path.splitext(full_path)[0]
+    accepted = _accepted_types(request)
+    path_root = os.path.splitext(path)[0]
+    for media_type, alt_ext in NEGOTIATED_FORMATS:
+        if media_type not in accepted:
+            continue
+        try:
+            stat = os.stat(root + alt_ext)
+        except (FileNotFoundError, NotADirectoryError):
+            continue
+        return path_root + alt_ext, root + alt_ext, stat, alt_ext
+    return None
+
+
+def _is_authenticated(request):
+    """Sesión de Django o token JWT (API móvil)."""
+    if request.user.is_authenticated:
+        return True
+    try:
+        from rest_framework_simplejwt.authentication import JWTAuthentication
+        return JWTAuthentication().authenticate(request) is not None
+    except Exception:
+        return False
+
+
+def serve_media(request, version, path):
+    """
+    Sirve un archivo de MEDIA a partir de su URL versionada.
+
+    GET /media-v/<version>/<path>
+    """
+    if getattr(settings, 'MEDIA_REQUIRE_AUTH', True) and not _is_authenticated(request):
+        return HttpResponse(status=401)
+
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404("Archivo no encontrado")
+    try:
+        stat = os.stat(full_path)
+    except (FileNotFoundError, NotADirectoryError):
+        raise Http404("Archivo no encontrado")
+
+    etag = f'"{version}"'
+    negotiable = os.path.splitext(full_path)[1].lower() in ('.jpg', '.jpeg')
+    negotiated = _negotiate(request, path, full_path) if negotiable else None
+    if negotiated:
+        path, full_path, stat, alt_ext = negotiated
+        etag = f'"{version}{alt_ext}"'
+    last_modified = int(stat.st_mtime)
+
+    # 304 Not Modified si el cliente ya tiene esta versión
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        accel_prefix = getattr(settings, 'MEDIA_ACCEL_REDIRECT_PREFIX', '')
+        content_type, _encoding = mimetypes.guess_type(full_path)
+        if accel_prefix:
+            response = HttpResponse(content_type=content_type or 'application/octet-stream')
+            response['X-Accel-Redirect'] = accel_prefix.rstrip('/') + '/' + quote(path)
+        else:
+            response = FileResponse(open(full_path, 'rb'), content_type=content_type)
+            response['Content-Length'] = stat.st_size
+
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    response['Cache-Control'] = CACHE_CONTROL_VERSIONED
+    if negotiable:
+        response['Vary'] = 'Accept'
+    return response
@@ -12,4 +12,5 @@ urlpatterns = [
     # APIs
     path('api/stats/', views.api_dashboard_stats, name='api_stats'),
     path('api/sitio/<int:sitio_id>/', views.api_sitio_detail, name='api_sitio_detail'),
+    path('api/avance-cartera/', views.api_avance_cartera, name='api_avance_cartera'),
 ]
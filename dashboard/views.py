@@ -8,8 +8,13 @@ from django.utils import timezone
 from datetime import datetime, timedelta
 import json
 
+import numpy as np
+
 from .models import DashboardStats
+from core.models.contractors import Contractor
 from core.models.sites import Site
+from proyectos.models import GrupoComponentes
+from reg_construccion.avance import avance_por_sitio
 from reg_construccion.models import RegConstruccion
 from reg_txtss.models import RegTxtss
 from users.models import User
@@ -142,6 +147,12 @@ def dashboard_construccion(request):
         'fecha_hasta': fecha_hasta,
         'estados_stats': estados_stats,
         'estados_choices': RegConstruccion.ESTADO_CHOICES,
+        # Opciones de los filtros del panel "Avance de la Cartera"
+        'cartera_estructuras': GrupoComponentes.objects.order_by('nombre'),
+        'cartera_regiones': Site.objects.filter(is_deleted=False).exclude(region__isnull=True).exclude(
+            region=''
+        ).order_by('region').values_list('region', flat=True).distinct(),
+        'cartera_contratistas': Contractor.objects.order_by('name'),
     }
     
     return render(request, 'dashboard/dashboard_construccion.html', context)
@@ -314,3 +325,74 @@ def api_sitio_detail(request, sitio_id):
             'success': False,
             'error': str(e)
         }, status=500)
+
+# Rangos de avance para la distribución de la cartera
+RANGOS_AVANCE = [0, 25, 50, 75, 100]
+
+
+def _resumen_cartera(sitios):
+    """Totales de la cartera: promedio, mediana y distribución por rango de avance."""
+    valores = np.array([sitio['avance'] for sitio in sitios if sitio['avance'] is not None], dtype=float)
+    resumen = {
+        'sitios': len(sitios),
+        'sin_estructura': len(sitios) - len(valores),
+        'promedio': None,
+        'mediana': None,
+        'completados': 0,
+        'distribucion': [],
+    }
+    if not len(valores):
+        return resumen
+    valores = np.clip(valores, 0, 100)
+    conteos, _bordes = np.histogram(valores, bins=RANGOS_AVANCE)
+    resumen.update(
+        promedio=round(float(valores.mean()), 1),
+        mediana=round(float(np.median(valores)), 1),
+        completados=int((valores >= 100).sum()),
+        distribucion=[
+            {'rango': f'{desde}-{hasta}%', 'sitios': int(conteo)}
+            for desde, hasta, conteo in zip(RANGOS_AVANCE, RANGOS_AVANCE[1:], conteos)
+        ],
+    )
+    return resumen
+
+
+@login_required
+def api_avance_cartera(request):
+    """
+    API con el avance físico ponderado de todos los sitios en construcción.
+
+    Para cada sitio se usa su registro de construcción más reciente. Filtros
+    opcionales: ``estructura`` (ID de ``GrupoComponentes``), ``region`` y
+    ``contratista`` (ID).
+    """
+    registros = RegConstruccion.objects.filter(
+        is_deleted=False,
+        is_active=True,
+        sitio__is_deleted=False,
+    )
+    try:
+        if request.GET.get('estructura'):
+            registros = registros.filter(estructura_id=int(request.GET['estructura']))
+        if request.GET.get('contratista'):
+            registros = registros.filter(contratista_id=int(request.GET['contratista']))
+    except ValueError:
+        return JsonResponse({
+            'success': False,
+            'error': 'Los filtros estructura y contratista deben ser IDs numéricos'
+        }, status=400)
+    if request.GET.get('region'):
+        registros = registros.filter(sitio__region__iexact=request.GET['region'])
+
+    sitios = avance_por_sitio(registros)
+    for sitio in sitios:
+        sitio['fecha'] = sitio['fecha'].isoformat() if sitio['fecha'] else None
+        if sitio['avance'] is not None:
+            sitio['avance'] = round(sitio['avance'], 1)
+    sitios.sort(key=lambda sitio: (sitio['avance'] is None, -(sitio['avance'] or 0), sitio['sitio']))
+
+    return JsonResponse({
+        'success': True,
+        'resumen': _resumen_cartera(sitios),
+        'sitios': sitios,
+    })
@@ -1,3 +1,10 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import PDFJob
+
+
+@admin.register(PDFJob)
+class PDFJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'report', 'registro_id', 'user', 'status', 'attempts', 'created_at', 'finished_at')
+    list_filter = ('status', 'report')
+    readonly_fields = ('created_at', 'updated_at', 'locked_at', 'finished_at')
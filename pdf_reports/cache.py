@@ -0,0 +1,318 @@
+"""
+Caché en disco de los reportes PDF.
+
+Renderizar un reporte con WeasyPrint toma segundos; mientras el registro no
+cambie, el PDF resultante es el mismo. Cada reporte se identifica con una
+huella (SHA-256) de todo lo que se usa para generarlo:
+
+- los campos del registro, su sitio, usuario y contratista,
+- las filas de sus pasos (``Objetivo``, ``AvanceComponente``, ``RSitio``, ...),
+- las fotos (digest, orden, descripción y versiones),
+- los mapas de Google Maps,
+- las plantillas y hojas de estilo del reporte.
+
+El PDF se guarda en ``PDF_CACHE_DIR/<app>/<registro>/<huella>.pdf``. Si algo
+cambia, la huella es otra: el PDF se vuelve a generar y el anterior se borra.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.http import FileResponse, HttpResponseNotModified, JsonResponse
+from django.shortcuts import get_object_or_404
+from django.template.loader import get_template
+from django.urls import reverse
+from django.utils.cache import patch_cache_control
+from django.utils.http import parse_etags
+from django_weasyprint.views import WeasyTemplateResponse
+
+from core.models.google_maps import GoogleMapsImage
+from photos.models import Photos, photos_q_for_registro
+
+from .fetcher import make_local_url_fetcher
+from .jobs import enqueue_pdf_job
+from .models import PDFJob
+
+# Base para resolver las URLs del reporte sin request: ``/media/...`` y
+# ``/static/...`` quedan como ``file:///media/...`` y se leen del disco
+LOCAL_BASE_URL = 'file:///'
+
+
+def _cache_dir():
+    return settings.PDF_CACHE_DIR
+
+
+def _field_values(obj):
+    return [getattr(obj, field.attname) for field in obj._meta.concrete_fields]
+
+
+def _files_mtime(template_names, stylesheets):
+    """
+    Fecha de modificación más reciente de las plantillas y hojas de estilo.
+
+    Se revisa todo el directorio de la plantilla principal, que incluye las
+    plantillas parciales del reporte.
+    """
+    paths = list(stylesheets)
+    for name in template_names:
+        origin = get_template(name).origin.name
+        for root, _dirs, files in os.walk(os.path.dirname(origin)):
+            paths.extend(os.path.join(root, filename) for filename in files)
+    mtimes = []
+    for path in paths:
+        try:
+            mtimes.append(os.stat(path).st_mtime_ns)
+        except OSError:
+            continue
+    return max(mtimes, default=0)
+
+
+# Firmas ya calculadas por (plantillas, hojas de estilo). Las plantillas solo
+# cambian con un despliegue, que reinicia los procesos.
+_files_signatures = {}
+
+
+def _files_signature(template_names, stylesheets):
+    """
+    ``_files_mtime`` calculado una vez por proceso.
+
+    Con ``DEBUG`` se recalcula en cada llamada: las plantillas se editan sin
+    reiniciar el servidor.
+    """
+    key = (tuple(template_names), tuple(stylesheets))
+    if settings.DEBUG or key not in _files_signatures:
+        _files_signatures[key] = _files_mtime(template_names, stylesheets)
+    return _files_signatures[key]
+
+
+def registro_fingerprint(registro, template_names=(), stylesheets=(), extra=()):
+    """
+    Huella del contenido de un reporte.
+
+    Args:
+        registro: Registro del reporte (``RegTxtss``, ``RegConstruccion``, ...)
+        template_names: Plantillas usadas para el reporte
+        stylesheets: Hojas de estilo del PDF
+        extra: Datos adicionales que usa el reporte (p. ej. la estructura)
+
+    Returns:
+        str: SHA-256 hexadecimal
+    """
+    parts = {
+        'files': _files_signature(template_names, stylesheets),
+        'registro': [registro._meta.label, *_field_values(registro)],
+        # Sitio y usuario son opcionales en los registros
+        'sitio': _field_values(registro.sitio) if registro.sitio_id else None,
+        'user': [registro.user.first_name, registro.user.last_name] if registro.user_id else None,
+    }
+    contratista = getattr(registro, 'contratista', None)
+    if contratista is not None:
+        parts['contratista'] = _field_values(contratista)
+
+    # Filas de los pasos: todos los modelos con FK "registro" a este registro
+    for rel in registro._meta.related_objects:
+        if rel.field.name != 'registro' or rel.many_to_many:
+            continue
+        model = rel.related_model
+        rows = model._base_manager.filter(registro=registro).order_by('pk')
+        parts[model._meta.label] = [_field_values(obj) for obj in rows]
+
+    parts['photos'] = list(
+        Photos.objects.filter(photos_q_for_registro(registro)).order_by('pk').values_list(
+            'pk', 'etapa', 'digest', 'file_digest', 'orden', 'descripcion', 'renditions', 'updated_at'
+        )
+    )
+    parts['maps'] = list(
+        GoogleMapsImage.objects.filter(
+            content_type=ContentType.objects.get_for_model(registro),
+            object_id=registro.pk,
+        ).order_by('pk').values_list('pk', 'etapa', 'imagen', 'updated_at')
+    )
+    parts['extra'] = list(extra)
+
+    payload = json.dumps(parts, default=str, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def pdf_job_data(job):
+    """Estado de un trabajo de PDF para el cliente."""
+    data = {
+        'job_id': str(job.id),
+        'kind': job.kind,
+        'status': job.status,
+        'status_url': reverse('pdf_reports:pdf_job_status', args=[job.id]),
+        'download_url': None,
+        'created_at': job.created_at.isoformat(),
+        'finished_at': job.finished_at.isoformat() if job.finished_at else None,
+    }
+    if job.status == PDFJob.STATUS_DONE:
+        data['download_url'] = reverse('pdf_reports:pdf_job_download', args=[job.id])
+        if job.error:
+            # Exportación en lote con algunos registros fallidos
+            data['warning'] = job.error
+    elif job.status == PDFJob.STATUS_FAILED:
+        data['error'] = job.error.strip().splitlines()[-1] if job.error.strip() else ''
+    return data
+
+
+def _registro_dir(registro):
+    return os.path.join(_cache_dir(), registro._meta.app_label, str(registro.pk))
+
+
+def get_cached_pdf(registro, fingerprint):
+    """Ruta del PDF en caché para esta huella, o None si no existe."""
+    path = os.path.join(_registro_dir(registro), f'{fingerprint}.pdf')
+    return path if os.path.exists(path) else None
+
+
+def store_pdf(registro, fingerprint, data):
+    """
+    Guarda un PDF en la caché y elimina las versiones anteriores del registro.
+
+    La escritura es atómica (archivo temporal + ``os.replace``): una
+    descarga concurrente nunca ve un PDF a medio escribir.
+    """
+    directory = _registro_dir(registro)
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f'{fingerprint}.pdf')
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    for filename in os.listdir(directory):
+        if filename.endswith('.pdf') and filename != f'{fingerprint}.pdf':
+            try:
+                os.remove(os.path.join(directory, filename))
+            except OSError:
+                pass
+    return path
+
+
+class ReportPDFResponse(WeasyTemplateResponse):
+    """
+    ``WeasyTemplateResponse`` que también se puede generar sin request.
+
+    Las imágenes y estilos de ``/media/`` y ``/static/`` se leen del disco
+    (ver ``pdf_reports.fetcher``) en lugar de pedirse por HTTP.
+    """
+
+    def get_base_url(self):
+        if self._request is None:
+            return LOCAL_BASE_URL
+        return super().get_base_url()
+
+    def get_url_fetcher(self):
+        return make_local_url_fetcher(self.get_base_url())
+
+
+class CachedPDFMixin:
+    """
+    Sirve el PDF desde la caché mientras el registro no cambie.
+
+    Se usa con ``WeasyTemplateView``: la vista debe definir
+    ``registro_model``. La respuesta lleva un ``ETag`` con la huella, por lo
+    que el navegador puede revalidar (``If-None-Match``) sin descargar el PDF.
+
+    Con ``?modo=async`` el PDF no se genera en el request: se encola un
+    ``PDFJob`` y se responde con la URL para consultar su estado.
+    """
+    registro_model = None
+    response_class = ReportPDFResponse
+
+    def get_registro(self):
+        return get_object_or_404(
+            self.registro_model.objects.select_related('sitio', 'user'),
+            pk=self.kwargs.get('registro_id'),
+        )
+
+    def get_fingerprint_extra(self, registro):
+        """Datos adicionales del reporte que no dependen de las filas del registro."""
+        return []
+
+    def get_fingerprint(self, registro):
+        return registro_fingerprint(
+            registro,
+            self.get_template_names(),
+            self.get_pdf_stylesheets(),
+            # La resolución de las fotos cambia las URLs de las imágenes
+            [settings.PDF_IMAGE_DPI, *self.get_fingerprint_extra(registro)],
+        )
+
+    def render_pdf(self):
+        """Genera el PDF y devuelve los bytes (funciona sin request)."""
+        response = self.render_to_response(self.get_context_data(**self.kwargs))
+        response.render()
+        return response.content
+
+    def render_document(self):
+        """Documento de WeasyPrint del reporte, para combinarlo con otros."""
+        response = self.render_to_response(self.get_context_data(**self.kwargs))
+        return response.get_document()
+
+    def build_pdf(self):
+        """
+        Devuelve el PDF en caché del registro, generándolo si hace falta.
+
+        Returns:
+            tuple: ``(huella, ruta del archivo)``
+        """
+        registro = self.get_registro()
+        fingerprint = self.get_fingerprint(registro)
+        path = get_cached_pdf(registro, fingerprint)
+        if path is None:
+            path = store_pdf(registro, fingerprint, self.render_pdf())
+        return fingerprint, path
+
+    def enqueue(self, request, registro, fingerprint):
+        """Encola la generación del PDF y responde con el estado del trabajo."""
+        job = enqueue_pdf_job(
+            self.registro_model._meta.app_label,
+            registro.pk,
+            user=request.user if request.user.is_authenticated else None,
+            fingerprint=fingerprint,
+            file_path=get_cached_pdf(registro, fingerprint) or '',
+        )
+        return JsonResponse(
+            pdf_job_data(job),
+            status=200 if job.status == PDFJob.STATUS_DONE else 202,
+        )
+
+    def _finalize(self, response, etag):
+        response['ETag'] = etag
+        # El navegador puede guardar el PDF pero debe revalidarlo siempre
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+    def get(self, request, *args, **kwargs):
+        registro = self.get_registro()
+        fingerprint = self.get_fingerprint(registro)
+        etag = f'"{fingerprint}"'
+
+        if request.GET.get('modo') == 'async':
+            return self.enqueue(request, registro, fingerprint)
+
+        if etag in parse_etags(request.headers.get('If-None-Match', '')):
+            return self._finalize(HttpResponseNotModified(), etag)
+
+        path = get_cached_pdf(registro, fingerprint)
+        if path is None:
+            response = super().get(request, *args, **kwargs)
+            response.render()
+            store_pdf(registro, fingerprint, response.content)
+            return self._finalize(response, etag)
+
+        response = FileResponse(open(path, 'rb'), content_type=self.content_type)
+        filename = self.get_pdf_filename()
+        if filename:
+            display = 'attachment' if self.pdf_attachment else 'inline'
+            response['Content-Disposition'] = f'{display};filename="{filename}"'
+        return self._finalize(response, etag)
@@ -0,0 +1,178 @@
+"""
+Exportación de reportes PDF en lote.
+
+WeasyPrint usa un núcleo completo por reporte y no libera el GIL, por lo que
+los registros se reparten en un ``ProcessPoolExecutor``. Cada proceso inicia
+Django una sola vez (``_init_worker``) y después genera varios reportes.
+
+Los PDF individuales salen de la caché de reportes (``build_pdf``): exportar
+dos veces el mismo mes solo genera los registros que cambiaron. En el modo
+combinado cada sitio es una tarea: sus reportes se renderizan y las páginas
+se unen en un solo documento.
+"""
+
+import os
+import shutil
+import tempfile
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import get_context
+
+import django
+from django.conf import settings
+from django.template.loader import get_template
+from django.utils.module_loading import import_string
+from django.utils.text import slugify
+
+from .reports import REPORT_VIEWS, get_report_view
+
+
+def get_registro_model(report):
+    """Modelo de registro del reporte (``RegConstruccion``, ``RegTxtss``, ...)."""
+    try:
+        return import_string(REPORT_VIEWS[report]).registro_model
+    except KeyError:
+        raise ValueError(f"Reporte desconocido: {report}")
+
+
+def _init_worker(settings_module):
+    """
+    Prepara un proceso del pool: inicia Django y carga las plantillas.
+
+    Los procesos se crean con ``spawn``: no heredan conexiones a la base de
+    datos ni locks del proceso principal.
+    """
+    os.environ['DJANGO_SETTINGS_MODULE'] = settings_module
+    django.setup()
+    for path in REPORT_VIEWS.values():
+        get_template(import_string(path).template_name)
+
+
+def _write_atomic(destination, write):
+    directory = os.path.dirname(destination)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    os.close(fd)
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, destination)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def _export_task(report, registro_ids, destination):
+    """
+    Genera el PDF de una tarea en el proceso del pool.
+
+    Con un registro se copia el PDF de la caché; con varios (modo combinado)
+    se unen las páginas de todos los reportes en un documento.
+    """
+    inicio = time.perf_counter()
+    result = {'registros': registro_ids, 'path': destination, 'error': ''}
+    try:
+        if len(registro_ids) == 1:
+            _fingerprint, path = get_report_view(report, registro_ids[0]).build_pdf()
+            _write_atomic(destination, lambda tmp_path: shutil.copyfile(path, tmp_path))
+        else:
+            documents = [get_report_view(report, pk).render_document() for pk in registro_ids]
+            pages = [page for document in documents for page in document.pages]
+            merged = documents[0].copy(pages)
+            _write_atomic(destination, merged.write_pdf)
+    except Exception as e:
+        result['error'] = f'{type(e).__name__}: {e}'
+    result['ms'] = (time.perf_counter() - inicio) * 1000
+    return result
+
+
+def _build_tasks(registros, output_dir, merge_by_site):
+    """Lista de ``(ids, destino)``, un PDF por registro o uno por sitio."""
+    if not merge_by_site:
+        return [
+            ([registro.pk], os.path.join(
+                output_dir, f'{slugify(registro.sitio.name if registro.sitio else "sin-sitio")}_{registro.pk}.pdf'
+            ))
+            for registro in registros
+        ]
+    sitios = {}
+    for registro in registros:
+        nombre = registro.sitio.name if registro.sitio else 'sin-sitio'
+        sitios.setdefault((registro.sitio_id, nombre), []).append(registro.pk)
+    return [
+        (ids, os.path.join(output_dir, f'{slugify(nombre)}_{sitio_id or 0}.pdf'))
+        for (sitio_id, nombre), ids in sitios.items()
+    ]
+
+
+def export_reports(report, registros, output_dir, merge_by_site=False, workers=None, progress=None):
+    """
+    Genera los PDF de varios registros en paralelo.
+
+    Args:
+        report: Clave del reporte en ``REPORT_VIEWS`` (p. ej. ``'reg_construccion'``)
+        registros: Registros a exportar (se ordenan por sitio y fecha)
+        output_dir: Carpeta donde se escriben los PDF
+        merge_by_site: Un solo PDF por sitio con todos sus registros
+        workers: Procesos del pool (por defecto, uno por núcleo)
+        progress: Función ``progress(hechos, total, resultado)`` llamada al
+            terminar cada tarea
+
+    Returns:
+        dict: Resultados por tarea y tiempos totales
+    """
+    registros = list(
+        registros.select_related('sitio').order_by('sitio__name', 'fecha', 'pk')
+    )
+    os.makedirs(output_dir, exist_ok=True)
+    tasks = _build_tasks(registros, output_dir, merge_by_site)
+    summary = {
+        'registros': len(registros), 'results': [], 'workers': 0,
+        'ms': 0.0, 'render_ms': 0.0, 'errors': 0,
+    }
+    if not tasks:
+        return summary
+
+    workers = max(1, min(workers or os.cpu_count() or 1, len(tasks)))
+    summary['workers'] = workers
+    inicio = time.perf_counter()
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=get_context('spawn'),
+        initializer=_init_worker,
+        initargs=(settings.SETTINGS_MODULE,),
+    ) as executor:
+        futures = [executor.submit(_export_task, report, ids, destination) for ids, destination in tasks]
+        for done, future in enumerate(as_completed(futures), start=1):
+            result = future.result()
+            summary['results'].append(result)
+            if progress:
+                progress(done, len(futures), result)
+    summary['ms'] = (time.perf_counter() - inicio) * 1000
+    summary['render_ms'] = sum(result['ms'] for result in summary['results'])
+    summary['errors'] = sum(1 for result in summary['results'] if result['error'])
+    return summary
+
+
+def _write_zip(archive, summary):
+    # Los PDF ya vienen comprimidos: se guardan sin volver a comprimir
+    with zipfile.ZipFile(archive, 'w', zipfile.ZIP_STORED) as zf:
+        for result in sorted(summary['results'], key=lambda result: result['path']):
+            if not result['error']:
+                zf.write(result['path'], os.path.basename(result['path']))
+
+
+def export_reports_to_file(report, registros, destination, merge_by_site=False, workers=None):
+    """
+    Exporta los registros a un ZIP en ``destination`` (escritura atómica).
+
+    Returns:
+        dict: Resumen de ``export_reports``
+    """
+    os.makedirs(os.path.dirname(destination), exist_ok=True)
+    with tempfile.TemporaryDirectory() as output_dir:
+        summary = export_reports(
+            report, registros, output_dir, merge_by_site=merge_by_site, workers=workers
+        )
+        _write_atomic(destination, lambda tmp_path: _write_zip(tmp_path, summary))
+    return summary
@@ -0,0 +1,141 @@
+"""
+Lectura local de los archivos que usa WeasyPrint al generar un reporte.
+
+Las plantillas referencian las fotos, los mapas y la hoja de estilo con URLs
+(``/media/...``, ``/static/...``). Con la URL base del request, WeasyPrint
+las pediría por HTTP al mismo servidor, una petición por imagen.
+``local_url_fetcher`` convierte esas URLs en rutas bajo ``MEDIA_ROOT`` y
+``STATIC_ROOT`` y lee el archivo directamente.
+
+Los bytes leídos se guardan en una caché LRU del proceso, limitada a
+``PDF_FETCHER_CACHE_BYTES``: los reportes siguientes (el logo, la hoja de
+estilo, las mismas fotos en otro reporte del sitio) no vuelven al disco. La
+clave incluye la fecha de modificación y el tamaño del archivo, así que un
+archivo reescrito nunca se sirve desde la caché.
+"""
+
+import mimetypes
+import os
+import threading
+from collections import OrderedDict
+from urllib.parse import unquote, urlparse
+
+from django.conf import settings
+from django.contrib.staticfiles.finders import find
+from django.core.exceptions import SuspiciousFileOperation
+from django.utils._os import safe_join
+from django_weasyprint.utils import django_url_fetcher
+
+# Prefijo de las URLs versionadas de MEDIA (ver core.utils.media)
+MEDIA_VERSIONED_PREFIX = '/media-v/'
+
+
+class BytesLRUCache:
+    """Caché LRU de contenidos de archivo limitada por la suma de bytes."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        if len(value) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self.size -= len(old)
+            self._data[key] = value
+            self.size += len(value)
+            while self.size > self.max_bytes:
+                _key, removed = self._data.popitem(last=False)
+                self.size -= len(removed)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.size = 0
+
+
+_cache = BytesLRUCache(settings.PDF_FETCHER_CACHE_BYTES)
+
+
+def _join(root, relative):
+    if not root:
+        return None
+    try:
+        return safe_join(root, relative)
+    except SuspiciousFileOperation:
+        return None
+
+
+def resolve_local_path(url_path):
+    """
+    Ruta en disco de una URL de MEDIA o STATIC, o None si no es local.
+
+    Args:
+        url_path (str): Ruta de la URL (sin esquema ni host)
+    """
+    url_path = unquote(url_path)
+    if url_path.startswith(MEDIA_VERSIONED_PREFIX):
+        # /media-v/<versión>/<ruta>
+        _version, _slash, relative = url_path[len(MEDIA_VERSIONED_PREFIX):].partition('/')
+        return _join(settings.MEDIA_ROOT, relative)
+    if settings.MEDIA_URL and url_path.startswith(settings.MEDIA_URL):
+        return _join(settings.MEDIA_ROOT, url_path[len(settings.MEDIA_URL):])
+    if settings.STATIC_URL and url_path.startswith(settings.STATIC_URL):
+        relative = url_path[len(settings.STATIC_URL):]
+        path = _join(settings.STATIC_ROOT, relative)
+        if path and os.path.isfile(path):
+            return path
+        # Sin collectstatic (desarrollo): se busca en STATICFILES_DIRS y las apps
+        return find(relative)
+    return None
+
+
+def read_cached(path):
+    """Contenido de un archivo, desde la caché LRU si no cambió en disco."""
+    stat = os.stat(path)
+    key = (path, stat.st_mtime_ns, stat.st_size)
+    data = _cache.get(key)
+    if data is None:
+        with open(path, 'rb') as f:
+            data = f.read()
+        _cache.set(key, data)
+    return data
+
+
+def make_local_url_fetcher(base_url):
+    """
+    Crea el ``url_fetcher`` de un reporte.
+
+    Se leen del disco las URLs ``file:`` y las del mismo host que
+    ``base_url``; el resto (p. ej. otros dominios) pasa a
+    ``django_url_fetcher``.
+    """
+    local_host = urlparse(base_url).netloc
+
+    def local_url_fetcher(url, *args, **kwargs):
+        parsed = urlparse(url)
+        if parsed.scheme == 'file' or (parsed.scheme in ('http', 'https') and parsed.netloc == local_host):
+            path = resolve_local_path(parsed.path)
+            if path and os.path.isfile(path):
+                mime_type, encoding = mimetypes.guess_type(path)
+                return {
+                    'string': read_cached(path),
+                    'mime_type': mime_type,
+                    'encoding': encoding,
+                    'filename': os.path.basename(path),
+                    'redirected_url': 'file://' + path,
+                }
+        return django_url_fetcher(url, *args, **kwargs)
+
+    return local_url_fetcher
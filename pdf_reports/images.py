@@ -0,0 +1,153 @@
+"""
+Imágenes de las fotos con la resolución de impresión del reporte.
+
+En el PDF cada foto ocupa un espacio fijo (``section.imagenes div img``:
+300 px CSS, unos 8 cm). Insertar el original de 12 MP o la versión
+``print`` de 2000 px obliga a WeasyPrint a decodificar y embeber muchos más
+píxeles de los que se imprimen.
+
+``print_image_url`` entrega una versión con el ancho justo para el espacio a
+``PDF_IMAGE_DPI``. Se genera una sola vez, a partir de la versión más chica
+que alcance, y se guarda en ``pdf_images/`` identificada por el digest de la
+foto y su ancho: la comparten todos los reportes (y fotos duplicadas) que la
+usan.
+"""
+
+import io
+import logging
+import math
+import os
+import tempfile
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+
+from photos.renditions import RENDITIONS
+
+logger = logging.getLogger(__name__)
+
+# Ancho de cada espacio del reporte en px CSS (ver static/css/weasyprint.css)
+SLOTS = {
+    'foto': 300,
+}
+
+# WeasyPrint usa 96 px CSS por pulgada
+CSS_PX_PER_INCH = 96
+
+# Calidad JPEG de las imágenes para el PDF
+PRINT_QUALITY = 85
+
+# Relación alto/ancho máxima: las fotos verticales mantienen su ancho
+MAX_ASPECT = 2
+
+
+def slot_width(slot='foto', dpi=None):
+    """Ancho en píxeles de una imagen para el espacio ``slot`` a ``dpi``."""
+    dpi = dpi or settings.PDF_IMAGE_DPI
+    return math.ceil(SLOTS[slot] / CSS_PX_PER_INCH * dpi)
+
+
+def _image_key(file_digest, digest, pk, updated_at):
+    # El hash del archivo guardado: una copia hecha antes de normalizar la
+    # foto no se reutiliza después
+    return file_digest or digest or f'{pk}-{updated_at:%Y%m%d%H%M%S}'
+
+
+def _image_name(key, width):
+    return f'pdf_images/{key[:2]}/{key}_{width}.jpg'
+
+
+def print_image_name(photo, width):
+    """Nombre de la imagen para el PDF: ``pdf_images/<xx>/<digest>_<ancho>.jpg``."""
+    return _image_name(_image_key(photo.file_digest, photo.digest, photo.pk, photo.updated_at), width)
+
+
+def print_image_names(photos, chunk_size=2000):
+    """
+    Nombres de las imágenes para PDF vigentes de las fotos: las de cada
+    espacio a la resolución actual. Lo usa ``gc_media`` para eliminar las
+    copias de fotos borradas o de otro ``PDF_IMAGE_DPI``.
+    """
+    widths = sorted({slot_width(slot) for slot in SLOTS})
+    rows = photos.values_list('file_digest', 'digest', 'pk', 'updated_at')
+    for row in rows.iterator(chunk_size=chunk_size):
+        key = _image_key(*row)
+        for width in widths:
+            yield _image_name(key, width)
+
+
+def _source_name(photo, width):
+    """
+    Archivo desde el que se reduce la foto: la versión JPEG más chica que
+    alcance el ancho pedido, o el original.
+    """
+    renditions = photo.renditions or {}
+    for size, spec in reversed(RENDITIONS.items()):
+        if spec['max_size'][0] >= width and renditions.get(size):
+            return renditions[size]
+    return photo.imagen.name
+
+
+def _render(storage, source, width):
+    box = (width, width * MAX_ASPECT)
+    with storage.open(source, 'rb') as f:
+        image = Image.open(f)
+        # El decodificador JPEG reduce al leer: no se decodifican los 12 MP
+        image.draft('RGB', box)
+        image = ImageOps.exif_transpose(image)
+        if image.mode != 'RGB':
+            image = image.convert('RGB')
+        image.thumbnail(box, Image.LANCZOS)
+    buffer = io.BytesIO()
+    image.save(buffer, format='JPEG', quality=PRINT_QUALITY, optimize=True)
+    return buffer.getvalue()
+
+
+def _write(storage, name, data):
+    """
+    Guarda la imagen con el nombre exacto (sin el reparto ni los sufijos del
+    almacenamiento). En almacenamiento local la escritura es atómica.
+    """
+    try:
+        path = storage.path(name)
+    except NotImplementedError:
+        if not storage.exists(name):
+            storage.save(name, ContentFile(data))
+        return
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as tmp:
+            tmp.write(data)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def print_image_url(photo, slot='foto'):
+    """
+    URL de la imagen de una foto para el espacio ``slot`` del reporte.
+
+    Si la foto ya es más chica que el espacio se usa la versión ``print``.
+    Si la imagen no se puede generar también se vuelve a ``print``: el
+    reporte sale igual, solo más pesado.
+    """
+    if not photo.imagen:
+        return None
+    width = slot_width(slot)
+    if photo.width and photo.height and photo.width <= width and photo.height <= width * MAX_ASPECT:
+        return photo.print_url
+
+    storage = photo.imagen.storage
+    name = print_image_name(photo, width)
+    if not storage.exists(name):
+        try:
+            _write(storage, name, _render(storage, _source_name(photo, width), width))
+        except Exception as e:
+            logger.warning("No se pudo generar la imagen para PDF de la foto %s: %s", photo.pk, e)
+            return photo.print_url
+    return storage.url(name)
@@ -0,0 +1,138 @@
+"""
+Cola de trabajos para generar reportes PDF fuera del request.
+
+Un reporte de construcción con decenas de fotos puede tardar más que el
+``--timeout`` de gunicorn. En modo asíncrono (``?modo=async``) la vista solo
+encola un ``PDFJob``; el proceso ``manage.py run_pdf_worker`` genera el PDF
+y lo deja en la caché de reportes, desde donde se descarga.
+
+Las exportaciones en lote (acciones del admin) también pasan por esta cola:
+el worker genera los PDF con un pool acotado (``PDF_EXPORT_WORKERS``) y deja
+el ZIP en ``PDF_CACHE_DIR/exports/``.
+"""
+
+import os
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .export import export_reports_to_file, get_registro_model
+from .models import PDFJob
+from .reports import get_report_view
+
+# Reintentos antes de marcar un trabajo como fallido
+MAX_ATTEMPTS = 2
+# Trabajos en ejecución más antiguos que esto se consideran abandonados
+STALE_AFTER = timedelta(minutes=15)
+# Tiempo que se conservan los ZIP de las exportaciones terminadas
+EXPORT_RETENTION = timedelta(days=1)
+
+
+def enqueue_pdf_job(report, registro_id, user=None, fingerprint='', file_path=''):
+    """
+    Encola la generación de un reporte.
+
+    Si ya hay un trabajo pendiente o en ejecución para el mismo registro se
+    devuelve ese. Con ``file_path`` (PDF ya en caché) el trabajo se crea
+    terminado, o se reutiliza el trabajo terminado del mismo usuario con la
+    misma huella: los clientes que consultan en bucle no agregan filas.
+    """
+    if file_path:
+        existing = PDFJob.objects.filter(
+            report=report,
+            kind=PDFJob.KIND_REPORT,
+            registro_id=registro_id,
+            user=user,
+            status=PDFJob.STATUS_DONE,
+            fingerprint=fingerprint,
+        ).order_by('-finished_at').first()
+        if existing:
+            if existing.file_path != file_path:
+                existing.file_path = file_path
+                existing.save(update_fields=['file_path', 'updated_at'])
+            return existing
+        return PDFJob.objects.create(
+            report=report,
+            registro_id=registro_id,
+            user=user,
+            status=PDFJob.STATUS_DONE,
+            fingerprint=fingerprint,
+            file_path=file_path,
+            finished_at=timezone.now(),
+        )
+    existing = PDFJob.objects.filter(
+        report=report,
+        registro_id=registro_id,
+        status__in=[PDFJob.STATUS_PENDING, PDFJob.STATUS_RUNNING],
+    ).first()
+    if existing:
+        return existing
+    return PDFJob.objects.create(report=report, registro_id=registro_id, user=user)
+
+
+def enqueue_export_job(report, registro_ids, merge_by_site=False, user=None):
+    """Encola la exportación de varios registros a un ZIP."""
+    return PDFJob.objects.create(
+        report=report,
+        kind=PDFJob.KIND_EXPORT,
+        user=user,
+        payload={'registros': sorted(registro_ids), 'merge_by_site': merge_by_site},
+    )
+
+
+def export_path(job):
+    """Ruta del ZIP de un trabajo de exportación."""
+    return os.path.join(settings.PDF_CACHE_DIR, 'exports', f'{job.id}.zip')
+
+
+def purge_old_exports():
+    """Elimina los ZIP de las exportaciones terminadas hace más de ``EXPORT_RETENTION``."""
+    limite = timezone.now() - EXPORT_RETENTION
+    jobs = PDFJob.objects.filter(
+        kind=PDFJob.KIND_EXPORT,
+        finished_at__lt=limite,
+    ).exclude(file_path='')
+    eliminados = 0
+    for job in jobs:
+        try:
+            os.remove(job.file_path)
+            eliminados += 1
+        except FileNotFoundError:
+            pass
+    jobs.update(file_path='')
+    return eliminados
+
+
+def _build(job):
+    """
+    Genera el archivo de un trabajo.
+
+    Returns:
+        tuple: ``(huella, ruta del archivo, error parcial)``
+    """
+    if job.kind != PDFJob.KIND_EXPORT:
+        fingerprint, path = get_report_view(job.report, job.registro_id).build_pdf()
+        return fingerprint, path, ''
+
+    registros = get_registro_model(job.report).objects.filter(pk__in=job.payload.get('registros', []))
+    path = export_path(job)
+    summary = export_reports_to_file(
+        job.report,
+        registros,
+        path,
+        merge_by_site=job.payload.get('merge_by_site', False),
+        workers=settings.PDF_EXPORT_WORKERS,
+    )
+    errores = [result for result in summary['results'] if result['error']]
+    if summary['results'] and len(errores) == len(summary['results']):
+        os.remove(path)
+        raise RuntimeError(f"No se pudo generar ningún PDF: {errores[0]['error']}")
+    error = f"No se pudieron generar {len(errores)} PDF" if errores else ''
+    return '', path, error
+
+
+def handle_job(job):
+    """Genera el archivo de un ``PDFJob`` tomado por el worker (ver ``core.jobs.run``)."""
+    fingerprint, path, error = _build(job)
+    return {'error': error, 'fingerprint': fingerprint, 'file_path': path}
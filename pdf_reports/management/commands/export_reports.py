@@ -0,0 +1,113 @@
+from django.core.management.base import BaseCommand, CommandError
+from pdf_reports.export import export_reports, get_registro_model
+from pdf_reports.reports import REPORT_VIEWS
+
+
+class Command(BaseCommand):
+    help = 'Exporta en paralelo los reportes PDF de varios registros'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'output',
+            help='Carpeta donde se guardan los PDF'
+        )
+        parser.add_argument(
+            '--report',
+            choices=sorted(REPORT_VIEWS),
+            default='reg_construccion',
+            help='Tipo de reporte (por defecto reg_construccion)'
+        )
+        parser.add_argument(
+            '--ids',
+            type=int,
+            nargs='+',
+            help='IDs de los registros a exportar'
+        )
+        parser.add_argument(
+            '--contratista',
+            type=int,
+            help='ID del contratista (solo reg_construccion)'
+        )
+        parser.add_argument(
+            '--region',
+            type=str,
+            help='Región de los sitios'
+        )
+        parser.add_argument(
+            '--desde',
+            type=str,
+            help='Fecha de registro inicial (AAAA-MM-DD)'
+        )
+        parser.add_argument(
+            '--hasta',
+            type=str,
+            help='Fecha de registro final (AAAA-MM-DD)'
+        )
+        parser.add_argument(
+            '--por-sitio',
+            action='store_true',
+            help='Generar un solo PDF por sitio con todos sus registros'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            help='Procesos en paralelo (por defecto, uno por núcleo)'
+        )
+
+    def handle(self, *args, **options):
+        model = get_registro_model(options['report'])
+        queryset = model.objects.filter(is_active=True)
+
+        if options['ids']:
+            queryset = queryset.filter(pk__in=options['ids'])
+        if options['contratista']:
+            if not any(field.name == 'contratista' for field in model._meta.fields):
+                raise CommandError(f"El reporte {options['report']} no tiene contratista")
+            queryset = queryset.filter(contratista_id=options['contratista'])
+        if options['region']:
+            queryset = queryset.filter(sitio__region__iexact=options['region'])
+        if options['desde']:
+            queryset = queryset.filter(fecha__gte=options['desde'])
+        if options['hasta']:
+            queryset = queryset.filter(fecha__lte=options['hasta'])
+
+        total = queryset.count()
+        if not total:
+            self.stdout.write(self.style.WARNING('No hay registros para exportar.'))
+            return
+        self.stdout.write(f'Exportando {total} registros a {options["output"]}')
+
+        def progress(done, count, result):
+            ids = ', '.join(str(pk) for pk in result['registros'])
+            label = 'Registros' if len(result['registros']) > 1 else 'Registro'
+            if result['error']:
+                self.stdout.write(self.style.ERROR(
+                    f'[{done}/{count}] {label} {ids}: {result["error"]}'
+                ))
+            else:
+                self.stdout.write(
+                    f'[{done}/{count}] {label} {ids} -> {result["path"]} ({result["ms"] / 1000:.2f}s)'
+                )
+
+        summary = export_reports(
+            options['report'],
+            queryset,
+            options['output'],
+            merge_by_site=options['por_sitio'],
+            workers=options['workers'],
+            progress=progress,
+        )
+
+        archivos = len(summary['results']) - summary['errors']
+        self.stdout.write('=' * 80)
+        self.stdout.write(f"Registros: {summary['registros']}")
+        self.stdout.write(f"Archivos generados: {archivos}")
+        self.stdout.write(f"Procesos: {summary['workers']}")
+        self.stdout.write(f"Tiempo total: {summary['ms'] / 1000:.2f}s")
+        self.stdout.write(f"Tiempo de generación (suma): {summary['render_ms'] / 1000:.2f}s")
+        if summary['ms']:
+            self.stdout.write(f"Paralelismo efectivo: {summary['render_ms'] / summary['ms']:.1f}x")
+        if summary['errors']:
+            self.stdout.write(self.style.ERROR(f"Errores: {summary['errors']}"))
+        else:
+            self.stdout.write(self.style.SUCCESS('Exportación completada'))
@@ -0,0 +1,22 @@
+from core.management.worker import WorkerCommand
+from pdf_reports.jobs import MAX_ATTEMPTS, STALE_AFTER, handle_job, purge_old_exports
+from pdf_reports.models import PDFJob
+
+
+class Command(WorkerCommand):
+    help = 'Ejecuta el worker que genera los reportes PDF encolados (?modo=async)'
+    label = 'PDF'
+    job_model = PDFJob
+    handler = staticmethod(handle_job)
+    max_attempts = MAX_ATTEMPTS
+    stale_after = STALE_AFTER
+    order_by = 'created_at'
+
+    def on_start(self):
+        eliminados = purge_old_exports()
+        if eliminados:
+            self.stdout.write(f'{eliminados} exportaciones antiguas eliminadas')
+
+    def before_job(self, job):
+        if job.kind == PDFJob.KIND_EXPORT:
+            purge_old_exports()
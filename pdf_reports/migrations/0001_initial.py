@@ -0,0 +1,44 @@
+# Generated by Django 5.2.3 on 2026-10-17 18:16
+
+import django.db.models.deletion
+import django.utils.timezone
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PDFJob',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('report', models.CharField(max_length=100, verbose_name='Reporte')),
+                ('registro_id', models.PositiveIntegerField(verbose_name='Registro')),
+                ('status', models.CharField(choices=[('pending', 'Pendiente'), ('running', 'En ejecución'), ('done', 'Terminado'), ('failed', 'Fallido')], default='pending', max_length=20, verbose_name='Estado')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='Intentos')),
+                ('error', models.TextField(blank=True, default='', verbose_name='Error')),
+                ('fingerprint', models.CharField(blank=True, default='', max_length=64, verbose_name='Huella del contenido')),
+                ('file_path', models.CharField(blank=True, default='', max_length=500, verbose_name='Archivo')),
+                ('run_after', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Ejecutar después de')),
+                ('locked_at', models.DateTimeField(blank=True, null=True, verbose_name='Tomado en')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='Terminado en')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='pdf_jobs', to=settings.AUTH_USER_MODEL, verbose_name='Usuario')),
+            ],
+            options={
+                'verbose_name': 'Trabajo de PDF',
+                'verbose_name_plural': 'Trabajos de PDF',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status', 'run_after'], name='pdfjob_status_run_after_idx'), models.Index(fields=['report', 'registro_id'], name='pdfjob_report_registro_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.3 on 2026-10-17 18:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pdf_reports', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pdfjob',
+            name='kind',
+            field=models.CharField(choices=[('report', 'Reporte'), ('export', 'Exportación en lote')], default='report', max_length=20, verbose_name='Tipo'),
+        ),
+        migrations.AddField(
+            model_name='pdfjob',
+            name='payload',
+            field=models.JSONField(blank=True, default=dict, verbose_name='Datos'),
+        ),
+        migrations.AlterField(
+            model_name='pdfjob',
+            name='registro_id',
+            field=models.PositiveIntegerField(blank=True, null=True, verbose_name='Registro'),
+        ),
+    ]
@@ -1,3 +1,75 @@
+import uuid
+
+from django.conf import settings
 from django.db import models
+from django.utils import timezone
+
+
+class PDFJob(models.Model):
+    """
+    Generación de un reporte PDF fuera del request.
+
+    La vista del reporte encola el trabajo y responde de inmediato; el
+    proceso ``manage.py run_pdf_worker`` genera el PDF y lo deja en la caché
+    de reportes (ver ``pdf_reports.cache``), desde donde se descarga.
+
+    Un trabajo de exportación (``KIND_EXPORT``) genera los PDF de varios
+    registros (``payload``) y los entrega en un ZIP.
+    """
+    KIND_REPORT = 'report'
+    KIND_EXPORT = 'export'
+    KIND_CHOICES = [
+        (KIND_REPORT, 'Reporte'),
+        (KIND_EXPORT, 'Exportación en lote'),
+    ]
+
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pendiente'),
+        (STATUS_RUNNING, 'En ejecución'),
+        (STATUS_DONE, 'Terminado'),
+        (STATUS_FAILED, 'Fallido'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='pdf_jobs',
+        verbose_name='Usuario'
+    )
+    # Reporte: app del registro (ver ``pdf_reports.reports.REPORT_VIEWS``)
+    report = models.CharField(max_length=100, verbose_name='Reporte')
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES, default=KIND_REPORT, verbose_name='Tipo')
+    # Sin registro en las exportaciones: los IDs van en ``payload``
+    registro_id = models.PositiveIntegerField(null=True, blank=True, verbose_name='Registro')
+    payload = models.JSONField(default=dict, blank=True, verbose_name='Datos')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING, verbose_name='Estado')
+    attempts = models.PositiveSmallIntegerField(default=0, verbose_name='Intentos')
+    error = models.TextField(blank=True, default='', verbose_name='Error')
+    fingerprint = models.CharField(max_length=64, blank=True, default='', verbose_name='Huella del contenido')
+    file_path = models.CharField(max_length=500, blank=True, default='', verbose_name='Archivo')
+    run_after = models.DateTimeField(default=timezone.now, verbose_name='Ejecutar después de')
+    locked_at = models.DateTimeField(null=True, blank=True, verbose_name='Tomado en')
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name='Terminado en')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Trabajo de PDF'
+        verbose_name_plural = 'Trabajos de PDF'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'run_after'], name='pdfjob_status_run_after_idx'),
+            models.Index(fields=['report', 'registro_id'], name='pdfjob_report_registro_idx'),
+        ]
 
-# Create your models here.
+    def __str__(self):
+        if self.kind == self.KIND_EXPORT:
+            return f"{self.report}: {len(self.payload.get('registros', []))} registros ({self.get_status_display()})"
+        return f"{self.report} #{self.registro_id} ({self.get_status_display()})"
@@ -0,0 +1,26 @@
+"""
+Vistas de los reportes PDF, por app del registro.
+
+Este módulo no importa modelos: lo usan los procesos del pool de exportación
+(``pdf_reports.export``), que se crean con ``spawn`` e importan las funciones
+antes de iniciar Django.
+"""
+
+from django.utils.module_loading import import_string
+
+# Vista de cada reporte, por app del registro
+REPORT_VIEWS = {
+    'reg_txtss': 'pdf_reports.views.RegistroPDFView',
+    'reg_construccion': 'reg_construccion.pdf_views.RegConstruccionPDFView',
+}
+
+
+def get_report_view(report, registro_id):
+    """Instancia la vista de un reporte lista para generarlo sin request."""
+    try:
+        view_class = import_string(REPORT_VIEWS[report])
+    except KeyError:
+        raise ValueError(f"Reporte desconocido: {report}")
+    view = view_class()
+    view.setup(None, registro_id=registro_id)
+    return view
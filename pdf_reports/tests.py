@@ -1,3 +1,48 @@
-from django.test import TestCase
+from unittest import mock
 
-# Create your tests here.
+from django.test import TestCase, override_settings
+
+from core.models.sites import Site
+from reg_construccion.models import RegConstruccion
+from users.models import User
+
+from . import cache
+
+
+class RegistroFingerprintTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.registro = RegConstruccion.objects.create(
+            sitio=Site.objects.create(name='Sitio PDF', pti_cell_id='PTI-P'),
+            user=User.objects.create(username='pdf', first_name='Ana'),
+            title='Con sitio',
+        )
+
+    def setUp(self):
+        cache._files_signatures.clear()
+
+    def test_registro_sin_sitio_ni_usuario(self):
+        registro = RegConstruccion.objects.create(title='Sin sitio')
+        self.assertEqual(len(cache.registro_fingerprint(registro)), 64)
+
+    def test_la_huella_cambia_con_el_usuario(self):
+        antes = cache.registro_fingerprint(self.registro)
+        self.registro.user.first_name = 'Eva'
+        self.registro.user.save()
+        self.registro.refresh_from_db()
+        self.assertNotEqual(cache.registro_fingerprint(self.registro), antes)
+
+    @override_settings(DEBUG=False)
+    def test_plantillas_revisadas_una_vez_por_proceso(self):
+        with mock.patch.object(cache, '_files_mtime', return_value=1) as files_mtime:
+            cache.registro_fingerprint(self.registro, ['a.html'], ['a.css'])
+            cache.registro_fingerprint(self.registro, ['a.html'], ['a.css'])
+            cache.registro_fingerprint(self.registro, ['b.html'], ['a.css'])
+        self.assertEqual(files_mtime.call_count, 2)
+
+    @override_settings(DEBUG=True)
+    def test_con_debug_se_revisan_en_cada_llamada(self):
+        with mock.patch.object(cache, '_files_mtime', return_value=1) as files_mtime:
+            cache.registro_fingerprint(self.registro, ['a.html'], ['a.css'])
+            cache.registro_fingerprint(self.registro, ['a.html'], ['a.css'])
+        self.assertEqual(files_mtime.call_count, 2)
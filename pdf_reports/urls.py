@@ -1,9 +1,11 @@
 from django.urls import path
-from .views import RegistroPDFView, preview_registro_individual
+from .views import RegistroPDFView, preview_registro_individual, pdf_job_status, pdf_job_download
 
 app_name = 'pdf_reports'
 
 urlpatterns = [
     path('pdf/<int:registro_id>/', RegistroPDFView.as_view(), name='registro_pdf'),
     path('preview/<int:registro_id>/', preview_registro_individual, name='preview_registro_individual'),
+    path('pdf/jobs/<uuid:job_id>/', pdf_job_status, name='pdf_job_status'),
+    path('pdf/jobs/<uuid:job_id>/descargar/', pdf_job_download, name='pdf_job_download'),
 ]
\ No newline at end of file
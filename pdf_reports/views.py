@@ -3,10 +3,14 @@ from datetime import datetime
 from reg_txtss.models import RegTxtss
 from django.conf import settings
 from pathlib import Path
-from django.shortcuts import render
+from django.shortcuts import render, get_object_or_404
+from django.http import FileResponse, Http404, JsonResponse
 from core.models.google_maps import GoogleMapsImage
 from django.contrib.contenttypes.models import ContentType
 from reg_txtss.config import PASOS_CONFIG
+from .cache import CachedPDFMixin, pdf_job_data
+from .images import print_image_url
+from .models import PDFJob
 
 def convert_lat_to_dms(lat):
     if lat is None:
@@ -32,8 +36,9 @@ def convert_lon_to_dms(lon):
 
 
 
-class RegistroPDFView(WeasyTemplateView):
+class RegistroPDFView(CachedPDFMixin, WeasyTemplateView):
     template_name = 'reportes_txtss/txtss.html'
+    registro_model = RegTxtss
     # pdf_attachment = True
     # pdf_filename = 'registro_individual.pdf'
     pdf_options = {
@@ -227,7 +232,7 @@ class RegistroPDFView(WeasyTemplateView):
         fotos_list = []
         for foto in fotos:
             fotos_list.append({
-                'src': foto.imagen.url,
+                'src': print_image_url(foto),
                 'alt': foto.descripcion or f'Foto del sitio {registro.sitio.pti_cell_id}',
                 'descripcion': foto.descripcion,
                 'orden': foto.orden
@@ -258,7 +263,7 @@ class RegistroPDFView(WeasyTemplateView):
         fotos_list = []
         for foto in fotos:
             fotos_list.append({
-                'src': foto.imagen.url,
+                'src': print_image_url(foto),
                 'alt': foto.descripcion or f'Foto del empalme {registro.sitio.pti_cell_id}',
                 'descripcion': foto.descripcion,
                 'orden': foto.orden
@@ -275,4 +280,46 @@ def preview_registro_individual(request, registro_id):
     # print('--------------------------------')
     # print(context)
     # print('--------------------------------')
-    return render(request, 'reportes_txtss/txtss.html', context)
\ No newline at end of file
+    return render(request, 'reportes_txtss/txtss.html', context)
+
+
+def _get_pdf_job(request, job_id):
+    """Trabajo de PDF visible para el usuario (el que lo pidió o staff)."""
+    job = get_object_or_404(PDFJob, id=job_id)
+    if job.user_id and job.user_id != request.user.id and not request.user.is_staff:
+        raise Http404
+    return job
+
+
+def pdf_job_status(request, job_id):
+    """Estado de un trabajo de generación de PDF (``?modo=async``)."""
+    return JsonResponse(pdf_job_data(_get_pdf_job(request, job_id)))
+
+
+def pdf_job_download(request, job_id):
+    """Descarga el PDF (o el ZIP de una exportación) de un trabajo terminado."""
+    job = _get_pdf_job(request, job_id)
+    if job.status != PDFJob.STATUS_DONE:
+        return JsonResponse(pdf_job_data(job), status=409)
+    try:
+        archivo = open(job.file_path, 'rb')
+    except OSError:
+        # El registro cambió y la caché ya guarda una versión más nueva, o el
+        # ZIP de la exportación ya se eliminó
+        return JsonResponse({
+            **pdf_job_data(job),
+            'error': 'El reporte cambió desde que se generó; vuelve a solicitarlo',
+        }, status=410)
+    if job.kind == PDFJob.KIND_EXPORT:
+        return FileResponse(
+            archivo,
+            content_type='application/zip',
+            as_attachment=True,
+            filename=f'reportes_{job.report}.zip',
+        )
+    return FileResponse(
+        archivo,
+        content_type='application/pdf',
+        as_attachment=True,
+        filename=f'{job.report}_{job.registro_id}.pdf',
+    )
@@ -1,5 +1,209 @@
+from datetime import date, timedelta
+
+from collections import defaultdict
+
+from django.conf import settings
 from django.contrib import admin
-from .models import Photos
+from django.contrib.contenttypes.models import ContentType
+from django.http import JsonResponse
+from django.template.response import TemplateResponse
+from django.utils import timezone
+from django.urls import path
+
+from core.models.sites import Site
+from .geofence import check_geofence, geofence_queryset
+from .metrics import storage_usage_summary, upload_timing_summary
+from .models import (
+    Photos, PhotoJob, PhotoStorageUsage, PhotoTombstone, PhotoUploadMetric, PhotoUploadSession,
+)
+from .similarity import DEFAULT_MAX_DISTANCE, find_similar_photos
+
+# Máximo de filas listadas en los reportes de ubicación y fotos similares
+REPORT_LIMIT = 500
+
+
+def _parse_date(value):
+    try:
+        return date.fromisoformat(value) if value else None
+    except ValueError:
+        return None
+
+
+@admin.register(Photos)
+class PhotosAdmin(admin.ModelAdmin):
+    list_display = ('id', 'app', 'etapa', 'taken_at', 'processing_state', 'created_at')
+    search_fields = ('digest', 'phash')
+    list_filter = ('app', 'processing_state')
+
+    def get_urls(self):
+        urls = [
+            path(
+                'geofence/',
+                self.admin_site.admin_view(self.geofence_view),
+                name='photos_photos_geofence',
+            ),
+            path(
+                'similares/',
+                self.admin_site.admin_view(self.similar_view),
+                name='photos_photos_similar',
+            ),
+            path(
+                'metricas/',
+                self.admin_site.admin_view(self.metrics_view),
+                name='photos_photos_metrics',
+            ),
+            path(
+                'metricas.json',
+                self.admin_site.admin_view(self.metrics_json_view),
+                name='photos_photos_metrics_json',
+            ),
+        ]
+        return urls + super().get_urls()
+
+    def geofence_view(self, request):
+        """Reporte de fotos tomadas lejos de su sitio."""
+        desde = _parse_date(request.GET.get('desde'))
+        hasta = _parse_date(request.GET.get('hasta'))
+        try:
+            max_distance = float(request.GET.get('max_distance') or settings.PHOTOS_GEOFENCE_METERS)
+        except ValueError:
+            max_distance = settings.PHOTOS_GEOFENCE_METERS
+
+        result = check_geofence(geofence_queryset(desde=desde, hasta=hasta), max_distance)
+        flagged = result['flagged'][:REPORT_LIMIT]
+        photos = Photos.objects.in_bulk([item['photo_id'] for item in flagged])
+        sites = Site.objects.in_bulk({item['site_id'] for item in flagged})
+        rows = [
+            {
+                'photo': photos.get(item['photo_id']),
+                'site': sites.get(item['site_id']),
+                'distance': item['distance'],
+            }
+            for item in flagged
+        ]
+
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': 'Fotos fuera del sitio',
+            'rows': rows,
+            'result': result,
+            'desde': desde,
+            'hasta': hasta,
+            'max_distance': max_distance,
+            'limit': REPORT_LIMIT,
+        }
+        return TemplateResponse(request, 'admin/photos/photos/geofence.html', context)
+
+    def similar_view(self, request):
+        """Reporte de fotos casi duplicadas entre registros de un sitio."""
+        site_id = request.GET.get('site')
+        site = Site.objects.filter(pk=site_id).first() if site_id and site_id.isdigit() else None
+        try:
+            max_distance = int(request.GET.get('max_distance') or DEFAULT_MAX_DISTANCE)
+        except ValueError:
+            max_distance = DEFAULT_MAX_DISTANCE
+
+        rows = []
+        if site is not None:
+            pairs = find_similar_photos(site, max_distance)[:REPORT_LIMIT]
+            photos = Photos.objects.in_bulk(
+                {pair['photo_a'] for pair in pairs} | {pair['photo_b'] for pair in pairs}
+            )
+            # Registros involucrados: una consulta por tipo de registro
+            registro_ids = defaultdict(set)
+            for pair in pairs:
+                for ct_id, registro_id in (pair['registro_a'], pair['registro_b']):
+                    registro_ids[ct_id].add(registro_id)
+            registros = {}
+            for ct_id, ids in registro_ids.items():
+                model = ContentType.objects.get_for_id(ct_id).model_class()
+                for pk, registro in model.objects.in_bulk(ids).items():
+                    registros[(ct_id, pk)] = registro
+            rows = [
+                {
+                    'distance': pair['distance'],
+                    'photo_a': photos.get(pair['photo_a']),
+                    'photo_b': photos.get(pair['photo_b']),
+                    'registro_a': registros.get(tuple(pair['registro_a'])),
+                    'registro_b': registros.get(tuple(pair['registro_b'])),
+                }
+                for pair in pairs
+            ]
+
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': 'Fotos similares entre registros',
+            'sites': Site.objects.order_by('name').only('id', 'name'),
+            'site': site,
+            'rows': rows,
+            'max_distance': max_distance,
+            'limit': REPORT_LIMIT,
+        }
+        return TemplateResponse(request, 'admin/photos/photos/similar.html', context)
+
+    @staticmethod
+    def _metrics(request):
+        """Tiempos de subida de los últimos ``dias`` días y almacenamiento usado."""
+        try:
+            dias = max(int(request.GET.get('dias') or 30), 1)
+        except ValueError:
+            dias = 30
+        return {
+            'dias': dias,
+            'uploads': upload_timing_summary(desde=timezone.now() - timedelta(days=dias)),
+            'storage': storage_usage_summary(),
+        }
+
+    def metrics_view(self, request):
+        """Tiempos de subida por etapa y espacio ocupado por las fotos."""
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': 'Métricas de fotos',
+            **self._metrics(request),
+        }
+        return TemplateResponse(request, 'admin/photos/photos/metrics.html', context)
+
+    def metrics_json_view(self, request):
+        """Las mismas métricas en JSON, para monitoreo externo."""
+        return JsonResponse(self._metrics(request))
+
+
+@admin.register(PhotoJob)
+class PhotoJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'kind', 'photo', 'status', 'attempts', 'run_after', 'updated_at')
+    list_filter = ('status', 'kind')
+    readonly_fields = ('created_at', 'updated_at', 'locked_at')
+
+
+@admin.register(PhotoUploadSession)
+class PhotoUploadSessionAdmin(admin.ModelAdmin):
+    list_display = ('id', 'user', 'filename', 'received_size', 'total_size', 'status', 'updated_at')
+    list_filter = ('status',)
+
+
+@admin.register(PhotoUploadMetric)
+class PhotoUploadMetricAdmin(admin.ModelAdmin):
+    list_display = (
+        'id', 'source', 'app', 'etapa', 'site', 'size', 'duplicate',
+        'receive_ms', 'storage_ms', 'decode_ms', 'renditions_ms', 'created_at',
+    )
+    list_filter = ('source', 'app', 'duplicate')
+    list_select_related = ('site',)
+    raw_id_fields = ('photo', 'site')
+
+
+@admin.register(PhotoStorageUsage)
+class PhotoStorageUsageAdmin(admin.ModelAdmin):
+    list_display = ('month', 'app', 'etapa', 'site', 'files', 'original_bytes', 'renditions_bytes', 'updated_at')
+    list_filter = ('app', 'month')
+    list_select_related = ('site',)
+    raw_id_fields = ('site',)
+
 
-# Register your models here.
-admin.site.register(Photos)
+@admin.register(PhotoTombstone)
+class PhotoTombstoneAdmin(admin.ModelAdmin):
+    list_display = ('photo_id', 'content_type', 'object_id', 'etapa', 'deleted_at')
+    list_filter = ('etapa',)
@@ -0,0 +1,174 @@
+"""
+Eliminación y traslado de fotos en lote.
+
+Cada operación se hace dentro de una transacción con un solo DELETE o
+UPDATE sobre el conjunto de fotos, en lugar de una petición por foto. Los
+archivos no se borran dentro del request: se encola un ``PhotoJob`` de
+limpieza que el worker ejecuta después (ver ``cleanup_photo_files``).
+
+Las fotos que dejan su registro y etapa quedan anotadas en
+``PhotoTombstone`` para la sincronización incremental de los clientes.
+"""
+
+from django.db import transaction
+from django.db.models import Case, IntegerField, Max, Q, Value, When
+from django.utils import timezone
+
+from .models import Photos, PhotoJob, PhotoTombstone
+
+
+class BulkPhotoError(Exception):
+    """La operación en lote no se puede realizar con los datos recibidos."""
+
+
+def parse_photo_ids(values):
+    """Convierte la lista de IDs recibida en enteros (sin repetir, en orden)."""
+    if not isinstance(values, (list, tuple)) or not values:
+        raise BulkPhotoError('Se debe indicar una lista de fotos')
+    try:
+        return list(dict.fromkeys(int(value) for value in values))
+    except (TypeError, ValueError):
+        raise BulkPhotoError('Los IDs de las fotos deben ser números')
+
+
+def enqueue_file_cleanup(rows):
+    """
+    Encola la eliminación de los archivos de fotos ya borradas.
+
+    Args:
+        rows: Pares ``(imagen, renditions)`` de las fotos eliminadas
+    """
+    files = {}
+    for name, renditions in rows:
+        if name:
+            files.setdefault(name, sorted({r for r in (renditions or {}).values() if r}))
+    if not files:
+        return None
+    return PhotoJob.objects.create(kind=PhotoJob.KIND_CLEANUP, payload={'files': files})
+
+
+def record_tombstones(rows):
+    """
+    Anota las fotos que salieron de su registro y etapa.
+
+    Args:
+        rows: Tuplas ``(id, content_type_id, object_id, etapa)`` de las fotos
+    """
+    now = timezone.now()
+    PhotoTombstone.objects.bulk_create([
+        PhotoTombstone(
+            photo_id=pk, content_type_id=content_type_id, object_id=object_id, etapa=etapa, deleted_at=now
+        )
+        for pk, content_type_id, object_id, etapa in rows
+    ])
+
+
+def delete_photo(photo):
+    """Elimina una foto y la anota para la sincronización incremental."""
+    with transaction.atomic():
+        record_tombstones([(photo.pk, photo.content_type_id, photo.object_id, photo.etapa)])
+        photo.delete()
+
+
+def bulk_delete_photos(queryset, ids):
+    """
+    Elimina las fotos indicadas que pertenecen a ``queryset``.
+
+    Returns:
+        list: IDs de las fotos eliminadas (los demás se ignoran)
+    """
+    ids = parse_photo_ids(ids)
+    with transaction.atomic():
+        rows = list(
+            queryset.filter(id__in=ids).select_for_update().values_list(
+                'id', 'imagen', 'renditions', 'content_type_id', 'object_id', 'etapa'
+            )
+        )
+        found = [row[0] for row in rows]
+        if not found:
+            return []
+        Photos.objects.filter(id__in=found).delete()
+        # En la misma transacción: si el DELETE se revierte, no hay limpieza
+        enqueue_file_cleanup((name, renditions) for _pk, name, renditions, *_scope in rows)
+        record_tombstones((pk, *scope) for pk, _name, _renditions, *scope in rows)
+    return found
+
+
+def bulk_move_photos(queryset, ids, content_type, object_id, etapa):
+    """
+    Mueve las fotos indicadas a otra etapa y/o registro con un solo UPDATE.
+
+    Las fotos quedan al final del orden de la etapa destino, respetando su
+    orden relativo. Una foto cuya imagen ya existe en el destino se omite
+    (la restricción ``photos_unique_digest_per_etapa`` no lo permite).
+
+    Returns:
+        dict: ``{'moved': [...], 'skipped': [...]}``
+    """
+    ids = parse_photo_ids(ids)
+    destino = Q(content_type=content_type, object_id=object_id, etapa=etapa)
+    with transaction.atomic():
+        rows = list(
+            queryset.filter(id__in=ids).exclude(destino).select_for_update()
+            .order_by('orden', 'id').values_list('id', 'digest', 'content_type_id', 'object_id', 'etapa')
+        )
+        target = Photos.objects.filter(destino)
+        digests = set(target.exclude(digest='').values_list('digest', flat=True))
+
+        moved, skipped, origins = [], [], []
+        for pk, digest, *scope in rows:
+            if digest and digest in digests:
+                skipped.append(pk)
+                continue
+            if digest:
+                digests.add(digest)
+            moved.append(pk)
+            origins.append((pk, *scope))
+
+        if moved:
+            start = (target.aggregate(maximo=Max('orden'))['maximo'] or 0) + 1
+            Photos.objects.filter(id__in=moved).update(
+                content_type=content_type,
+                object_id=object_id,
+                etapa=etapa,
+                orden=Case(
+                    *[When(id=pk, then=Value(start + index)) for index, pk in enumerate(moved)],
+                    output_field=IntegerField(),
+                ),
+                # update() no modifica auto_now; la sincronización móvil depende de él
+                updated_at=timezone.now(),
+            )
+            # En la etapa de origen la foto ya no está
+            record_tombstones(origins)
+    return {'moved': moved, 'skipped': skipped}
+
+
+def cleanup_photo_files(files):
+    """
+    Elimina los archivos (original y versiones) que ninguna foto usa.
+
+    Un archivo puede estar compartido con otras fotos (ver ``photos.dedup``)
+    o haber sido reutilizado por una subida posterior: solo se borra si
+    ninguna fila lo referencia al momento de ejecutar la limpieza.
+
+    Args:
+        files (dict): ``{imagen: [versiones]}``
+
+    Returns:
+        int: Cantidad de archivos eliminados
+    """
+    if not files:
+        return 0
+    storage = Photos._meta.get_field('imagen').storage
+    in_use = set(
+        Photos.objects.filter(imagen__in=list(files)).values_list('imagen', flat=True)
+    )
+    deleted = 0
+    for name, renditions in files.items():
+        if name in in_use:
+            continue
+        for file_name in [name, *renditions]:
+            if storage.exists(file_name):
+                storage.delete(file_name)
+                deleted += 1
+    return deleted
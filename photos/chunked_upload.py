@@ -0,0 +1,184 @@
+"""
+Subida de imágenes por partes (reanudable) para la API móvil.
+
+Protocolo:
+
+1. ``iniciar``: el cliente declara nombre, tamaño y (opcional) SHA-256 de la
+   imagen y recibe un ``upload_id``.
+2. ``parte``: envía bloques consecutivos indicando su ``offset`` y el
+   SHA-256 del bloque. Los bloques se escriben en un archivo temporal.
+   Si la conexión se corta, consulta el estado y continúa desde
+   ``received_size``; reenviar un bloque ya recibido no tiene efecto.
+3. ``completar``: el archivo ensamblado se entrega a ``store_photo`` como
+   cualquier otra subida.
+"""
+
+import hashlib
+import os
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.core.files import File
+from django.db import transaction
+from django.utils import timezone
+
+from .dedup import store_photo
+from .jobs import schedule_photo_processing
+from .models import Photos, PhotoUploadSession
+
+# Tamaño de bloque sugerido al cliente y máximo aceptado
+CHUNK_SIZE = getattr(settings, 'PHOTOS_UPLOAD_CHUNK_SIZE', 1024 * 1024)
+MAX_CHUNK_SIZE = getattr(settings, 'PHOTOS_UPLOAD_MAX_CHUNK_SIZE', 8 * 1024 * 1024)
+# Tamaño máximo de una imagen subida por partes
+MAX_UPLOAD_SIZE = getattr(settings, 'PHOTOS_UPLOAD_MAX_SIZE', 50 * 1024 * 1024)
+
+
+class ChunkUploadError(Exception):
+    """
+    Error en una subida por partes. ``received_size`` indica al cliente
+    desde qué byte debe continuar.
+    """
+
+    def __init__(self, message, received_size=None):
+        super().__init__(message)
+        self.received_size = received_size
+
+
+def _temp_dir():
+    return getattr(settings, 'PHOTOS_UPLOAD_TMP_DIR', os.path.join(settings.BASE_DIR, 'tmp', 'uploads'))
+
+
+def temp_path(session):
+    """Ruta del archivo temporal donde se ensambla la subida."""
+    return os.path.join(_temp_dir(), f'{session.pk}.part')
+
+
+def start_upload(user, registro, etapa, filename, total_size, sha256='', mime_type='image/jpeg', descripcion=''):
+    """Crea una sesión de subida por partes para un registro."""
+    if total_size <= 0 or total_size > MAX_UPLOAD_SIZE:
+        raise ChunkUploadError(f'Tamaño inválido (máximo {MAX_UPLOAD_SIZE} bytes)')
+    if not mime_type.startswith('image/'):
+        raise ChunkUploadError('Solo se aceptan imágenes')
+
+    session = PhotoUploadSession.objects.create(
+        user=user,
+        content_type=ContentType.objects.get_for_model(registro),
+        object_id=registro.id,
+        app=registro._meta.app_label,
+        etapa=etapa,
+        filename=os.path.basename(filename)[:255] or 'imagen.jpg',
+        mime_type=mime_type,
+        descripcion=descripcion or '',
+        total_size=total_size,
+        sha256=(sha256 or '').lower(),
+    )
+    os.makedirs(_temp_dir(), exist_ok=True)
+    # Crear el archivo vacío para que los bloques se escriban con r+b
+    open(temp_path(session), 'wb').close()
+    return session
+
+
+def append_chunk(session_id, offset, data, checksum):
+    """
+    Escribe un bloque en el archivo temporal de la sesión.
+
+    El bloque debe empezar exactamente en ``received_size``. Un bloque ya
+    recibido (reintento) se ignora. El checksum se verifica antes de
+    escribir para no aceptar bytes corruptos.
+
+    Returns:
+        PhotoUploadSession: Sesión actualizada
+    """
+    if len(data) > MAX_CHUNK_SIZE:
+        raise ChunkUploadError(f'El bloque supera el máximo de {MAX_CHUNK_SIZE} bytes')
+    if hashlib.sha256(data).hexdigest() != (checksum or '').lower():
+        raise ChunkUploadError('El checksum del bloque no coincide')
+
+    with transaction.atomic():
+        # Bloquear la sesión para que dos reintentos no escriban a la vez
+        session = PhotoUploadSession.objects.select_for_update().get(pk=session_id)
+        if session.status != PhotoUploadSession.STATUS_ACTIVE:
+            raise ChunkUploadError('La subida ya fue completada', session.received_size)
+
+        end = offset + len(data)
+        if end <= session.received_size:
+            # Bloque ya recibido: reintento tras un corte de conexión
+            return session
+        if offset != session.received_size:
+            raise ChunkUploadError(
+                f'Offset inesperado: se esperaba {session.received_size}',
+                session.received_size
+            )
+        if end > session.total_size:
+            raise ChunkUploadError('El bloque excede el tamaño declarado', session.received_size)
+
+        # r+b + truncate: descarta bytes escritos por un intento que no
+        # alcanzó a registrarse en la base de datos
+        with open(temp_path(session), 'r+b') as f:
+            f.seek(offset)
+            f.write(data)
+            f.truncate()
+
+        session.received_size = end
+        session.save(update_fields=['received_size', 'updated_at'])
+    return session
+
+
+def complete_upload(session_id):
+    """
+    Verifica el archivo ensamblado y crea la foto.
+
+    Returns:
+        tuple: ``(photo, created)`` como ``store_photo``
+    """
+    with transaction.atomic():
+        session = PhotoUploadSession.objects.select_for_update().get(pk=session_id)
+        if session.status == PhotoUploadSession.STATUS_COMPLETED and session.photo_id:
+            # Reintento de "completar": devolver la misma foto
+            return session.photo, False
+        if not session.is_complete:
+            raise ChunkUploadError('Faltan bloques por recibir', session.received_size)
+
+        path = temp_path(session)
+        with open(path, 'rb') as f:
+            if session.sha256:
+                sha = hashlib.sha256()
+                for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                    sha.update(chunk)
+                if sha.hexdigest() != session.sha256:
+                    raise ChunkUploadError('El checksum de la imagen no coincide', session.received_size)
+                f.seek(0)
+
+            photo, created = store_photo(
+                File(f, name=session.filename),
+                content_type=session.content_type,
+                object_id=session.object_id,
+                app=session.app,
+                etapa=session.etapa,
+                descripcion=session.descripcion
+            )
+
+        session.status = PhotoUploadSession.STATUS_COMPLETED
+        session.photo = photo
+        session.save(update_fields=['status', 'photo', 'updated_at'])
+
+    if created and photo.processing_state != Photos.PROCESSING_READY:
+        schedule_photo_processing(photo)
+    os.remove(path)
+    return photo, created
+
+
+def purge_stale_sessions(max_age=timedelta(days=1)):
+    """Elimina las sesiones abandonadas y sus archivos temporales."""
+    limite = timezone.now() - max_age
+    sessions = PhotoUploadSession.objects.filter(updated_at__lt=limite)
+    total = 0
+    for session in sessions.only('id').iterator():
+        try:
+            os.remove(temp_path(session))
+        except FileNotFoundError:
+            pass
+        total += 1
+    sessions.delete()
+    return total
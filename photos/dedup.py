@@ -0,0 +1,92 @@
+"""
+Deduplicación de fotos por contenido.
+
+Cada foto guarda el SHA-256 de sus bytes en ``Photos.digest`` y el archivo
+se almacena en una ruta derivada de ese hash (ver ``photo_upload_to``).
+Así, volver a subir la misma imagen para el mismo registro y etapa (por
+ejemplo, un reintento desde la app móvil) devuelve la foto existente, y
+la misma imagen en otro registro reutiliza el archivo ya guardado.
+"""
+
+import hashlib
+
+from django.db import IntegrityError, transaction
+
+from .models import Photos
+
+
+def compute_digest(file):
+    """
+    Calcula el SHA-256 de un archivo subido leyéndolo por bloques.
+    Deja el archivo posicionado al inicio para poder guardarlo después.
+    """
+    sha = hashlib.sha256()
+    if hasattr(file, 'seek'):
+        file.seek(0)
+    for chunk in file.chunks():
+        sha.update(chunk)
+    file.seek(0)
+    return sha.hexdigest()
+
+
+def store_photo(file, content_type, object_id, app, etapa, descripcion=''):
+    """
+    Crea una foto a partir de un archivo subido, evitando duplicados.
+
+    Returns:
+        tuple: ``(photo, created)``. ``created`` es False si la misma imagen
+        ya existía para el registro y etapa indicados.
+    """
+    digest = compute_digest(file)
+    lookup = {
+        'content_type': content_type,
+        'object_id': object_id,
+        'etapa': etapa,
+        'digest': digest,
+    }
+
+    existing = Photos.objects.filter(**lookup).first()
+    if existing:
+        return existing, False
+
+    photo = Photos(app=app, descripcion=descripcion, **lookup)
+
+    # Si otra foto ya tiene estos bytes, reutilizar su archivo y sus versiones
+    sibling = Photos.objects.filter(digest=digest).exclude(imagen='').only(
+        'imagen', 'file_digest', 'renditions', 'processing_state', 'taken_at', 'latitude', 'longitude',
+        'phash', 'width', 'height',
+    ).first()
+    if sibling and sibling.imagen.storage.exists(sibling.imagen.name):
+        photo.imagen = sibling.imagen.name
+        # Mismo archivo, misma versión de URL (puede estar ya normalizado)
+        photo.file_digest = sibling.file_digest
+        # El archivo compartido ya puede estar sin EXIF: copiar sus metadatos
+        photo.taken_at = sibling.taken_at
+        photo.latitude = sibling.latitude
+        photo.longitude = sibling.longitude
+        photo.phash = sibling.phash
+        photo.width = sibling.width
+        photo.height = sibling.height
+        if sibling.processing_state == Photos.PROCESSING_READY:
+            photo.renditions = dict(sibling.renditions or {})
+            photo.processing_state = Photos.PROCESSING_READY
+    else:
+        field = Photos._meta.get_field('imagen')
+        name = field.generate_filename(photo, file.name)
+        storage = field.storage
+        if storage.exists(name):
+            # Archivo huérfano con el mismo contenido: no volver a escribirlo
+            photo.imagen = name
+        else:
+            photo.imagen = file
+
+    try:
+        with transaction.atomic():
+            photo.save()
+    except IntegrityError:
+        # Otra petición concurrente guardó la misma imagen
+        existing = Photos.objects.filter(**lookup).first()
+        if existing is None:
+            raise
+        return existing, False
+    return photo, True
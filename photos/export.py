@@ -0,0 +1,125 @@
+"""
+Exportación de fotos como ZIP en streaming.
+
+El ZIP se genera mientras se envía: ``zipfile`` escribe sobre un buffer
+sin ``seek`` (usa descriptores de datos) y cada bloque escrito se entrega
+de inmediato a ``StreamingHttpResponse``. La memoria usada es constante
+sin importar cuántas fotos tenga el archivo.
+"""
+
+import os
+import zipfile
+from collections import Counter
+
+from registros import registry
+
+from .models import Photos, photos_q_for_registro
+
+# Tamaño de lectura de cada archivo
+READ_SIZE = 64 * 1024
+
+
+class _StreamBuffer:
+    """Buffer de solo escritura que ``zipfile`` usa como archivo de salida."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def _extension(name):
+    ext = os.path.splitext(name)[1].lower()
+    return ext or '.jpg'
+
+
+def iter_zip(entries):
+    """
+    Genera los bytes de un ZIP a partir de ``(nombre, Photos)``.
+
+    Las fotos ya están comprimidas (JPEG), por lo que se guardan sin
+    compresión (``ZIP_STORED``): no tiene sentido gastar CPU en ellas.
+    """
+    buffer = _StreamBuffer()
+    with zipfile.ZipFile(buffer, mode='w', compression=zipfile.ZIP_STORED, allowZip64=True) as zf:
+        for arcname, photo in entries:
+            try:
+                source = photo.imagen.storage.open(photo.imagen.name, 'rb')
+            except (FileNotFoundError, OSError):
+                # Archivo faltante en disco: se omite sin cortar la descarga
+                continue
+            with source:
+                info = zipfile.ZipInfo(arcname, date_time=photo.created_at.timetuple()[:6])
+                info.compress_type = zipfile.ZIP_STORED
+                with zf.open(info, mode='w', force_zip64=True) as dest:
+                    for chunk in iter(lambda: source.read(READ_SIZE), b''):
+                        dest.write(chunk)
+                        yield buffer.drain()
+            yield buffer.drain()
+    yield buffer.drain()
+
+
+def _unique(name, used):
+    """Evita nombres repetidos dentro del ZIP (p. ej. varias fotos con orden 0)."""
+    if name not in used:
+        used.add(name)
+        return name
+    root, ext = os.path.splitext(name)
+    n = 2
+    while f'{root}-{n}{ext}' in used:
+        n += 1
+    name = f'{root}-{n}{ext}'
+    used.add(name)
+    return name
+
+
+def registro_prefix(registro):
+    """
+    Carpeta del registro en el ZIP: el código PTI (o nombre) del sitio, o
+    ``registro_<id>`` si el registro no tiene sitio.
+    """
+    sitio = registro.sitio
+    if sitio is None:
+        return f'registro_{registro.pk}'
+    return sitio.pti_cell_id or sitio.name
+
+
+def registro_entries(registro, etapa=None, prefix=None):
+    """
+    Entradas del ZIP para un registro: ``<pti_cell_id>/<etapa>/<orden>.jpg``.
+    """
+    base = prefix or registro_prefix(registro)
+    used = set()
+    photos = Photos.objects.filter(photos_q_for_registro(registro, etapa)).only(
+        'id', 'imagen', 'etapa', 'orden', 'created_at'
+    ).order_by('etapa', 'orden', 'id')
+    for photo in photos.iterator():
+        name = f'{base}/{photo.etapa}/{photo.orden:03d}{_extension(photo.imagen.name)}'
+        yield _unique(name, used), photo
+
+
+def site_entries(site):
+    """
+    Entradas del ZIP para todas las fotos de un sitio, en todos sus
+    registros: ``<pti_cell_id>/<app>_<fecha>/<etapa>/<orden>.jpg``.
+    """
+    base = site.pti_cell_id or site.name
+    for namespace, model in registry.get_registro_models().items():
+        registros = list(model.objects.filter(sitio=site).select_related('sitio').order_by('fecha', 'id'))
+        fechas = Counter(registro.fecha for registro in registros)
+        for registro in registros:
+            prefix = f'{base}/{namespace}_{registro.fecha:%Y-%m-%d}'
+            if fechas[registro.fecha] > 1:
+                # Varios registros el mismo día (distintos usuarios)
+                prefix = f'{prefix}_{registro.pk}'
+            yield from registro_entries(registro, prefix=prefix)
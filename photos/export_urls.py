@@ -0,0 +1,9 @@
+from django.urls import path
+from .views import download_registro_photos_zip, download_site_photos_zip
+
+app_name = "photos_export"
+
+urlpatterns = [
+    path("sitio/<int:site_id>/zip/", download_site_photos_zip, name="site_zip"),
+    path("<str:app_label>/<int:registro_id>/zip/", download_registro_photos_zip, name="registro_zip"),
+]
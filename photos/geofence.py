@@ -0,0 +1,140 @@
+"""
+Verificación en lote de la ubicación de las fotos respecto a su sitio.
+
+Compara las coordenadas GPS extraídas del EXIF (``Photos.latitude`` /
+``Photos.longitude``) con ``Site.lat_base`` / ``Site.lon_base`` del sitio al
+que pertenece cada foto. Las distancias se calculan en una sola pasada
+vectorizada (``calcular_distancias_haversine``), por lo que se pueden revisar
+decenas de miles de fotos en segundos.
+"""
+
+import numpy as np
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db.models import Q
+
+from core.utils.coordenadas import calcular_distancias_haversine
+from registros.models.base import RegistroBase
+
+from .models import Photos, photos_q_for_registro
+
+
+def _sitio_path(model):
+    """
+    Ruta ORM hasta el sitio de un modelo con fotos.
+
+    Las fotos pueden estar asociadas al registro (``sitio``) o al objeto de un
+    paso que apunta al registro (``registro__sitio``).
+    """
+    if model is None:
+        return None
+    if issubclass(model, RegistroBase):
+        return 'sitio'
+    try:
+        field = model._meta.get_field('registro')
+    except Exception:
+        return None
+    if field.related_model and issubclass(field.related_model, RegistroBase):
+        return 'registro__sitio'
+    return None
+
+
+def site_coordinates(queryset, content_type_ids):
+    """
+    Obtiene el sitio y sus coordenadas para cada objeto con fotos.
+
+    Hace una consulta por tipo de objeto (no una por foto); los IDs se
+    filtran con una subconsulta sobre las mismas fotos.
+
+    Returns:
+        dict: ``{(content_type_id, object_id): (site_id, lat, lon)}``
+    """
+    coordinates = {}
+    for ct_id in content_type_ids:
+        model = ContentType.objects.get_for_id(ct_id).model_class()
+        path = _sitio_path(model)
+        if path is None:
+            continue
+        object_ids = queryset.filter(content_type_id=ct_id).order_by().values('object_id')
+        values = model._base_manager.filter(pk__in=object_ids).values_list(
+            'pk', f'{path}__id', f'{path}__lat_base', f'{path}__lon_base'
+        )
+        for pk, site_id, lat, lon in values:
+            coordinates[(ct_id, pk)] = (site_id, lat, lon)
+    return coordinates
+
+
+def geofence_queryset(registro=None, desde=None, hasta=None):
+    """
+    Fotos a revisar: las de un registro y/o las tomadas en un rango de fechas.
+    Si la foto no tiene fecha de captura se usa la fecha de subida.
+    """
+    queryset = Photos.objects.all()
+    if registro is not None:
+        queryset = queryset.filter(photos_q_for_registro(registro))
+    if desde:
+        queryset = queryset.filter(
+            Q(taken_at__date__gte=desde) | Q(taken_at__isnull=True, created_at__date__gte=desde)
+        )
+    if hasta:
+        queryset = queryset.filter(
+            Q(taken_at__date__lte=hasta) | Q(taken_at__isnull=True, created_at__date__lte=hasta)
+        )
+    return queryset
+
+
+def check_geofence(queryset=None, max_distance=None):
+    """
+    Calcula la distancia de cada foto con GPS a su sitio.
+
+    Args:
+        queryset: Fotos a revisar (por defecto todas)
+        max_distance (float, optional): Distancia máxima en metros
+            (por defecto ``settings.PHOTOS_GEOFENCE_METERS``)
+
+    Returns:
+        dict: ``checked`` (fotos comparadas), ``without_site`` (fotos con GPS
+        cuyo sitio no tiene coordenadas) y ``flagged``: lista de
+        ``{'photo_id', 'site_id', 'distance'}`` de las fotos fuera del radio,
+        ordenada de mayor a menor distancia
+    """
+    if max_distance is None:
+        max_distance = getattr(settings, 'PHOTOS_GEOFENCE_METERS', 500)
+    if queryset is None:
+        queryset = Photos.objects.all()
+
+    queryset = queryset.filter(latitude__isnull=False, longitude__isnull=False)
+    rows = list(
+        queryset.order_by().values_list('id', 'content_type_id', 'object_id', 'latitude', 'longitude')
+    )
+    if not rows:
+        return {'checked': 0, 'without_site': 0, 'flagged': []}
+
+    coordinates = site_coordinates(queryset, {row[1] for row in rows})
+    missing = (None, None, None)
+
+    photo_ids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+    photo_lat = np.fromiter((row[3] for row in rows), dtype=np.float64, count=len(rows))
+    photo_lon = np.fromiter((row[4] for row in rows), dtype=np.float64, count=len(rows))
+    sites = [coordinates.get((row[1], row[2]), missing) for row in rows]
+    site_ids = np.fromiter((s[0] or 0 for s in sites), dtype=np.int64, count=len(rows))
+    site_lat = np.array([s[1] for s in sites], dtype=np.float64)
+    site_lon = np.array([s[2] for s in sites], dtype=np.float64)
+
+    # Los valores None se convierten en NaN y quedan fuera de la comparación
+    distances = calcular_distancias_haversine(photo_lat, photo_lon, site_lat, site_lon)
+    valid = ~np.isnan(distances)
+    far = valid & (distances > max_distance)
+
+    order = np.argsort(-distances[far], kind='stable')
+    flagged = [
+        {'photo_id': int(photo_id), 'site_id': int(site_id), 'distance': round(float(distance))}
+        for photo_id, site_id, distance in zip(
+            photo_ids[far][order], site_ids[far][order], distances[far][order]
+        )
+    ]
+    return {
+        'checked': int(valid.sum()),
+        'without_site': int((~valid).sum()),
+        'flagged': flagged,
+    }
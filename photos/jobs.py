@@ -0,0 +1,89 @@
+"""
+Cola de trabajos para el procesamiento de fotos fuera del request.
+
+Las vistas de subida solo guardan el archivo original y encolan un
+``PhotoJob``; el proceso ``manage.py run_photo_worker`` toma los trabajos
+pendientes y ejecuta el procesamiento (versiones derivadas, etc.) y la
+limpieza de archivos de fotos eliminadas.
+"""
+
+import logging
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import Photos, PhotoJob
+from .bulk import cleanup_photo_files
+from .metadata import normalize_photo
+from .metrics import elapsed_ms, record_processing
+from .renditions import generate_renditions
+from .similarity import compute_photo_hash
+
+logger = logging.getLogger(__name__)
+
+# Reintentos antes de marcar un trabajo como fallido
+MAX_ATTEMPTS = 3
+# Trabajos en ejecución más antiguos que esto se consideran abandonados
+STALE_AFTER = timedelta(minutes=10)
+
+
+def _set_processing_state(photo, state):
+    # update() no modifica auto_now; la sincronización móvil depende de updated_at
+    photo.processing_state = state
+    photo.updated_at = timezone.now()
+    Photos.objects.filter(pk=photo.pk).update(processing_state=state, updated_at=photo.updated_at)
+
+
+def process_photo(photo):
+    """
+    Ejecuta todo el procesamiento posterior a la subida de una foto.
+    """
+    _set_processing_state(photo, Photos.PROCESSING_RUNNING)
+    try:
+        start = time.perf_counter()
+        normalize_photo(photo)
+        decode_ms = elapsed_ms(start)
+        start = time.perf_counter()
+        generate_renditions(photo)
+        renditions_ms = elapsed_ms(start)
+        if not photo.phash:
+            compute_photo_hash(photo)
+    except Exception:
+        _set_processing_state(photo, Photos.PROCESSING_ERROR)
+        raise
+    _set_processing_state(photo, Photos.PROCESSING_READY)
+    record_processing(photo, decode_ms, renditions_ms)
+
+
+def enqueue_photo_processing(photo):
+    """Encola el procesamiento de una foto recién subida."""
+    return PhotoJob.objects.create(photo=photo, kind=PhotoJob.KIND_PROCESS)
+
+
+def schedule_photo_processing(photo):
+    """
+    Programa el procesamiento de una foto recién subida.
+
+    Si ``PHOTOS_BACKGROUND_PROCESSING`` está desactivado (por ejemplo en
+    desarrollo, sin worker), la foto se procesa dentro del request.
+    """
+    if getattr(settings, 'PHOTOS_BACKGROUND_PROCESSING', True):
+        return enqueue_photo_processing(photo)
+    try:
+        process_photo(photo)
+    except Exception as e:
+        logger.warning("No se pudo procesar la foto %s: %s", photo.pk, e)
+    return None
+
+
+def handle_job(job):
+    """Ejecuta un ``PhotoJob`` tomado por el worker (ver ``core.jobs.run``)."""
+    if job.kind == PhotoJob.KIND_PROCESS:
+        if job.photo_id:
+            process_photo(job.photo)
+    elif job.kind == PhotoJob.KIND_CLEANUP:
+        cleanup_photo_files(job.payload.get('files', {}))
+    else:
+        raise ValueError(f"Tipo de trabajo desconocido: {job.kind}")
@@ -0,0 +1,53 @@
+import time
+from datetime import date
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from photos.geofence import check_geofence, geofence_queryset
+from registros.registry import get_registro
+
+
+class Command(BaseCommand):
+    help = 'Lista las fotos cuyo GPS está a más de la distancia permitida de su sitio'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--app',
+            type=str,
+            help='Aplicación del registro (ej. reg_construccion). Requerido con --registro'
+        )
+        parser.add_argument('--registro', type=int, help='Revisar solo las fotos de este registro')
+        parser.add_argument('--desde', type=date.fromisoformat, help='Fecha inicial (AAAA-MM-DD)')
+        parser.add_argument('--hasta', type=date.fromisoformat, help='Fecha final (AAAA-MM-DD)')
+        parser.add_argument(
+            '--max-distance',
+            type=float,
+            default=None,
+            help=f'Distancia máxima en metros (por defecto {settings.PHOTOS_GEOFENCE_METERS})'
+        )
+
+    def handle(self, *args, **options):
+        registro = None
+        if options['registro']:
+            if not options['app']:
+                raise CommandError('--registro requiere --app')
+            registro = get_registro(options['app'], options['registro'])
+            if registro is None:
+                raise CommandError(f"No existe el registro {options['app']}/{options['registro']}")
+
+        queryset = geofence_queryset(registro, options['desde'], options['hasta'])
+        if options['app'] and registro is None:
+            queryset = queryset.filter(app=options['app'])
+
+        inicio = time.monotonic()
+        result = check_geofence(queryset, options['max_distance'])
+        duracion = time.monotonic() - inicio
+
+        for item in result['flagged']:
+            self.stdout.write(
+                f"Foto {item['photo_id']}: {item['distance']} m del sitio {item['site_id']}"
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f"Fotos revisadas: {result['checked']}, fuera de rango: {len(result['flagged'])}, "
+            f"sin coordenadas de sitio: {result['without_site']} ({duracion:.2f} s)"
+        ))
@@ -0,0 +1,46 @@
+import hashlib
+
+from django.core.management.base import BaseCommand
+from django.db import IntegrityError, transaction
+from photos.models import Photos
+
+
+class Command(BaseCommand):
+    help = 'Calcula el hash SHA-256 de las fotos existentes que aún no lo tienen'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=200,
+            help='Cantidad de fotos leídas por consulta (por defecto 200)'
+        )
+
+    def handle(self, *args, **options):
+        queryset = Photos.objects.filter(digest='').only('id', 'imagen').order_by('id')
+        total = queryset.count()
+        self.stdout.write(f'Calculando hash de {total} fotos...')
+
+        calculadas = 0
+        duplicadas = 0
+        errores = 0
+        for photo in queryset.iterator(chunk_size=options['batch_size']):
+            try:
+                sha = hashlib.sha256()
+                with photo.imagen.storage.open(photo.imagen.name, 'rb') as f:
+                    for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                        sha.update(chunk)
+                with transaction.atomic():
+                    Photos.objects.filter(pk=photo.pk).update(digest=sha.hexdigest())
+                calculadas += 1
+            except IntegrityError:
+                # Ya existe la misma imagen en el mismo registro y etapa
+                duplicadas += 1
+                self.stdout.write(self.style.WARNING(f'Foto {photo.id}: duplicada, se deja sin hash'))
+            except Exception as e:
+                errores += 1
+                self.stdout.write(self.style.WARNING(f'Foto {photo.id}: {e}'))
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Hash calculado: {calculadas} fotos, {duplicadas} duplicadas, {errores} con errores'
+        ))
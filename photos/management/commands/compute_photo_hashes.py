@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+from photos.models import Photos
+from photos.similarity import compute_photo_hash
+
+
+class Command(BaseCommand):
+    help = 'Calcula el hash perceptual de las fotos existentes que aún no lo tienen'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=200,
+            help='Cantidad de fotos leídas por consulta (por defecto 200)'
+        )
+
+    def handle(self, *args, **options):
+        queryset = Photos.objects.filter(phash='').exclude(imagen='').only('id', 'imagen', 'phash').order_by('id')
+        total = queryset.count()
+        self.stdout.write(f'Calculando hash perceptual de {total} fotos...')
+
+        vistos = set()
+        errores = 0
+        for photo in queryset.iterator(chunk_size=options['batch_size']):
+            # Las fotos que comparten archivo se actualizan juntas
+            if photo.imagen.name in vistos:
+                continue
+            vistos.add(photo.imagen.name)
+            try:
+                compute_photo_hash(photo)
+            except Exception as e:
+                errores += 1
+                self.stdout.write(self.style.WARNING(f'Foto {photo.id}: {e}'))
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Hash calculado: {len(vistos) - errores} archivos, {errores} con errores'
+        ))
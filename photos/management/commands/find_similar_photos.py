@@ -0,0 +1,36 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from core.models.sites import Site
+from photos.similarity import DEFAULT_MAX_DISTANCE, find_similar_photos
+
+
+class Command(BaseCommand):
+    help = 'Lista las fotos casi duplicadas entre registros distintos de un sitio'
+
+    def add_arguments(self, parser):
+        parser.add_argument('site_id', type=int, help='ID del sitio')
+        parser.add_argument(
+            '--max-distance',
+            type=int,
+            default=DEFAULT_MAX_DISTANCE,
+            help=f'Bits distintos permitidos entre hashes (por defecto {DEFAULT_MAX_DISTANCE})'
+        )
+
+    def handle(self, *args, **options):
+        site = Site.objects.filter(pk=options['site_id']).first()
+        if site is None:
+            raise CommandError(f"No existe el sitio {options['site_id']}")
+
+        inicio = time.monotonic()
+        pairs = find_similar_photos(site, options['max_distance'])
+        duracion = time.monotonic() - inicio
+
+        for pair in pairs:
+            self.stdout.write(
+                f"Fotos {pair['photo_a']} y {pair['photo_b']}: distancia {pair['distance']} "
+                f"(registros {pair['registro_a'][1]} y {pair['registro_b'][1]})"
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(pairs)} pares de fotos similares en {site} ({duracion:.2f} s)'
+        ))
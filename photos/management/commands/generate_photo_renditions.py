@@ -0,0 +1,57 @@
+from django.core.management.base import BaseCommand
+from photos.models import Photos
+from photos.renditions import RENDITIONS, generate_renditions
+
+
+class Command(BaseCommand):
+    help = 'Genera las versiones derivadas (miniatura, media, impresión) de las fotos existentes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--app',
+            type=str,
+            help='Procesar solo las fotos de esta aplicación (ej. reg_construccion)'
+        )
+        parser.add_argument(
+            '--size',
+            action='append',
+            choices=list(RENDITIONS),
+            help='Versión a generar (puede repetirse). Por defecto todas'
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Regenerar las versiones aunque ya existan',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=200,
+            help='Cantidad de fotos leídas por consulta (por defecto 200)'
+        )
+
+    def handle(self, *args, **options):
+        queryset = Photos.objects.only('id', 'imagen', 'renditions').order_by('id')
+        if options['app']:
+            queryset = queryset.filter(app=options['app'])
+
+        total = queryset.count()
+        self.stdout.write(f'Procesando {total} fotos...')
+
+        procesadas = 0
+        errores = 0
+        for photo in queryset.iterator(chunk_size=options['batch_size']):
+            try:
+                generate_renditions(photo, sizes=options['size'], force=options['force'])
+                Photos.objects.filter(pk=photo.pk).update(processing_state=Photos.PROCESSING_READY)
+                procesadas += 1
+            except Exception as e:
+                errores += 1
+                self.stdout.write(self.style.WARNING(f'Foto {photo.id}: {e}'))
+
+            if (procesadas + errores) % options['batch_size'] == 0:
+                self.stdout.write(f'  {procesadas + errores}/{total}')
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Versiones generadas: {procesadas} fotos, {errores} con errores')
+        )
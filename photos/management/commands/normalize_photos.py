@@ -0,0 +1,51 @@
+from django.core.management.base import BaseCommand
+from photos.metadata import normalize_photo
+from photos.models import Photos
+
+
+class Command(BaseCommand):
+    help = (
+        'Aplica la orientación EXIF, elimina los metadatos y guarda fecha de captura '
+        'y GPS de las fotos existentes'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--app',
+            type=str,
+            help='Procesar solo las fotos de esta aplicación (ej. reg_construccion)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=200,
+            help='Cantidad de fotos leídas por consulta (por defecto 200)'
+        )
+
+    def handle(self, *args, **options):
+        # Fotos nunca normalizadas: todas las procesadas tienen dimensiones
+        queryset = Photos.objects.filter(width__isnull=True).exclude(imagen='').only('id', 'imagen').order_by('id')
+        if options['app']:
+            queryset = queryset.filter(app=options['app'])
+
+        total = queryset.count()
+        self.stdout.write(f'Normalizando {total} fotos...')
+
+        vistos = set()
+        reescritas = 0
+        errores = 0
+        for photo in queryset.iterator(chunk_size=options['batch_size']):
+            # Varias fotos pueden compartir el mismo archivo
+            if photo.imagen.name in vistos:
+                continue
+            vistos.add(photo.imagen.name)
+            try:
+                if normalize_photo(photo):
+                    reescritas += 1
+            except Exception as e:
+                errores += 1
+                self.stdout.write(self.style.WARNING(f'Foto {photo.id}: {e}'))
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Archivos revisados: {len(vistos)}, reescritos: {reescritas}, con errores: {errores}'
+        ))
@@ -0,0 +1,20 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from photos.chunked_upload import purge_stale_sessions
+
+
+class Command(BaseCommand):
+    help = 'Elimina las subidas por partes abandonadas y sus archivos temporales'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--hours',
+            type=int,
+            default=24,
+            help='Antigüedad mínima (sin actividad) de las subidas a eliminar (por defecto 24)'
+        )
+
+    def handle(self, *args, **options):
+        total = purge_stale_sessions(timedelta(hours=options['hours']))
+        self.stdout.write(self.style.SUCCESS(f'Subidas eliminadas: {total}'))
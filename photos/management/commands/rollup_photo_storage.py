@@ -0,0 +1,40 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from photos.metrics import rebuild_storage_usage
+from photos.models import PhotoUploadMetric
+
+
+class Command(BaseCommand):
+    help = (
+        'Recalcula el almacenamiento usado por las fotos (por aplicación, etapa, sitio y mes) '
+        'y elimina las métricas de subida antiguas'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--keep-days',
+            type=int,
+            default=90,
+            help='Días de métricas de subida que se conservan (por defecto 90, 0 para no borrar)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Cantidad de fotos leídas por consulta (por defecto 1000)'
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write('Recalculando el almacenamiento usado por las fotos...')
+        result = rebuild_storage_usage(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Archivos contabilizados: {result['files']}, no encontrados: {result['missing']}"
+        ))
+
+        if options['keep_days'] > 0:
+            limite = timezone.now() - timedelta(days=options['keep_days'])
+            borradas, _ = PhotoUploadMetric.objects.filter(created_at__lt=limite).delete()
+            self.stdout.write(f'Métricas de subida eliminadas: {borradas}')
@@ -0,0 +1,12 @@
+from core.management.worker import WorkerCommand
+from photos.jobs import MAX_ATTEMPTS, STALE_AFTER, handle_job
+from photos.models import PhotoJob
+
+
+class Command(WorkerCommand):
+    help = 'Ejecuta el worker que procesa las fotos subidas (versiones derivadas, etc.)'
+    label = 'fotos'
+    job_model = PhotoJob
+    handler = staticmethod(handle_job)
+    max_attempts = MAX_ATTEMPTS
+    stale_after = STALE_AFTER
@@ -0,0 +1,247 @@
+"""
+Normalización de los originales y lectura de metadatos EXIF.
+
+Las fotos tomadas con el teléfono llegan con la rotación indicada en el EXIF
+(``Orientation``), miniaturas incrustadas y bloques de metadatos grandes.
+Al procesar la foto se aplica la rotación una sola vez, se eliminan los
+metadatos y se guardan en columnas de ``Photos`` los datos que sí interesan
+(fecha de captura y coordenadas GPS), para poder consultarlos sin volver a
+abrir los archivos.
+
+El original se reescribe con el mismo nombre; su nuevo hash se guarda en
+``Photos.file_digest`` para que las URLs versionadas (caché inmutable)
+cambien y ningún cliente conserve la versión sin rotar o con GPS.
+"""
+
+import hashlib
+import io
+import os
+import tempfile
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.core.files.base import ContentFile
+from django.utils import timezone
+from PIL import ExifTags, Image, ImageOps
+
+# Etiquetas EXIF utilizadas
+TAG_ORIENTATION = 0x0112
+TAG_DATETIME = 0x0132
+TAG_DATETIME_ORIGINAL = 0x9003
+TAG_OFFSET_TIME_ORIGINAL = 0x9011
+
+# Calidad JPEG al recodificar un original rotado
+NORMALIZED_QUALITY = 92
+
+# Segmentos JPEG que se conservan al limpiar: JFIF (APP0), perfil de color
+# ICC (APP2) y Adobe (APP14, necesario para decodificar bien CMYK)
+_KEEP_APP_MARKERS = {0xE0, 0xE2, 0xEE}
+# Marcadores sin longitud (SOI, EOI, RSTn, TEM)
+_STANDALONE_MARKERS = {0xD8, 0xD9, 0x01} | set(range(0xD0, 0xD8))
+
+
+def _parse_datetime(value, offset=None):
+    """Convierte una fecha EXIF (``AAAA:MM:DD HH:MM:SS``) en datetime con zona."""
+    if not value:
+        return None
+    if isinstance(value, bytes):
+        value = value.decode('ascii', 'ignore')
+    try:
+        value = datetime.strptime(value.strip('\x00 ')[:19], '%Y:%m:%d %H:%M:%S')
+    except ValueError:
+        return None
+    if offset:
+        try:
+            sign = -1 if offset.startswith('-') else 1
+            hours, minutes = offset.lstrip('+-').split(':')
+            tz = dt_timezone(sign * timedelta(hours=int(hours), minutes=int(minutes)))
+            return value.replace(tzinfo=tz)
+        except ValueError:
+            pass
+    # Sin zona horaria en el EXIF: se asume la zona configurada
+    return timezone.make_aware(value)
+
+
+def _gps_to_degrees(value, ref):
+    """Convierte grados/minutos/segundos EXIF a grados decimales."""
+    try:
+        degrees, minutes, seconds = (float(v) for v in value)
+    except (TypeError, ValueError, ZeroDivisionError):
+        return None
+    result = degrees + minutes / 60 + seconds / 3600
+    if isinstance(ref, bytes):
+        ref = ref.decode('ascii', 'ignore')
+    if ref in ('S', 'W'):
+        result = -result
+    return result
+
+
+def read_metadata(image):
+    """
+    Lee la fecha de captura y las coordenadas GPS de una imagen PIL.
+
+    Returns:
+        dict: ``{'taken_at': datetime|None, 'latitude': float|None, 'longitude': float|None}``
+    """
+    metadata = {'taken_at': None, 'latitude': None, 'longitude': None}
+    exif = image.getexif()
+    if not exif:
+        return metadata
+
+    exif_ifd = exif.get_ifd(ExifTags.IFD.Exif)
+    metadata['taken_at'] = _parse_datetime(
+        exif_ifd.get(TAG_DATETIME_ORIGINAL) or exif.get(TAG_DATETIME),
+        exif_ifd.get(TAG_OFFSET_TIME_ORIGINAL),
+    )
+
+    gps = exif.get_ifd(ExifTags.IFD.GPSInfo)
+    if gps:
+        latitude = _gps_to_degrees(gps.get(2), gps.get(1))
+        longitude = _gps_to_degrees(gps.get(4), gps.get(3))
+        # (0, 0) es el valor que escriben algunos equipos sin señal GPS
+        if (latitude is not None and longitude is not None
+                and -90 <= latitude <= 90 and -180 <= longitude <= 180
+                and (latitude, longitude) != (0.0, 0.0)):
+            metadata['latitude'] = round(latitude, 7)
+            metadata['longitude'] = round(longitude, 7)
+    return metadata
+
+
+def strip_jpeg_metadata(data):
+    """
+    Elimina los segmentos de metadatos (EXIF, XMP, IPTC, comentarios) de un
+    JPEG sin recodificar la imagen.
+
+    Returns:
+        bytes: JPEG limpio, o ``None`` si no había nada que eliminar o el
+        archivo no es un JPEG válido
+    """
+    if data[:2] != b'\xff\xd8':
+        return None
+    out = [data[:2]]
+    pos = 2
+    removed = False
+    while pos + 4 <= len(data):
+        if data[pos] != 0xFF:
+            return None
+        marker = data[pos + 1]
+        if marker == 0xFF:
+            # Relleno entre marcadores
+            pos += 1
+            continue
+        if marker in _STANDALONE_MARKERS:
+            out.append(data[pos:pos + 2])
+            pos += 2
+            continue
+        length = int.from_bytes(data[pos + 2:pos + 4], 'big')
+        end = pos + 2 + length
+        if marker == 0xDA:
+            # Inicio de los datos de la imagen: el resto se copia tal cual
+            out.append(data[pos:])
+            break
+        if (0xE0 <= marker <= 0xEF and marker not in _KEEP_APP_MARKERS) or marker == 0xFE:
+            removed = True
+        else:
+            out.append(data[pos:end])
+        pos = end
+    else:
+        return None
+    return b''.join(out) if removed else None
+
+
+def _replace_file(storage, name, data):
+    """
+    Reemplaza el contenido de un archivo del almacenamiento conservando el nombre.
+    En almacenamiento local se escribe a un temporal y se renombra (atómico).
+    """
+    try:
+        path = storage.path(name)
+    except NotImplementedError:
+        storage.delete(name)
+        storage.save(name, ContentFile(data))
+        return
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.normalize-')
+    try:
+        with os.fdopen(fd, 'wb') as tmp:
+            tmp.write(data)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def normalize_image(data):
+    """
+    Aplica la orientación EXIF y elimina los metadatos de una imagen.
+
+    Si la imagen no necesita rotación, los metadatos se eliminan sin
+    recodificar (sin pérdida). Solo las imágenes rotadas se recodifican.
+
+    Returns:
+        tuple: ``(bytes normalizados o None si no hubo cambios, metadatos)``.
+        Los metadatos incluyen además ``width`` y ``height`` ya rotados.
+    """
+    image = Image.open(io.BytesIO(data))
+    metadata = read_metadata(image)
+    orientation = image.getexif().get(TAG_ORIENTATION, 1)
+    width, height = image.size
+    if orientation in (5, 6, 7, 8):
+        # Rotaciones de 90°: ancho y alto se intercambian
+        width, height = height, width
+    metadata['width'], metadata['height'] = width, height
+
+    if image.format != 'JPEG':
+        return None, metadata
+    if orientation in (None, 1):
+        return strip_jpeg_metadata(data), metadata
+
+    icc_profile = image.info.get('icc_profile')
+    image = ImageOps.exif_transpose(image)
+    buffer = io.BytesIO()
+    save_kwargs = {'quality': NORMALIZED_QUALITY, 'optimize': True}
+    if icc_profile:
+        save_kwargs['icc_profile'] = icc_profile
+    image.save(buffer, format='JPEG', **save_kwargs)
+    return buffer.getvalue(), metadata
+
+
+def normalize_photo(photo):
+    """
+    Normaliza el original de una foto y guarda sus metadatos en la base.
+
+    Varias fotos pueden compartir el mismo archivo (ver ``photos.dedup``),
+    por lo que los metadatos se copian a todas ellas: una vez limpio el
+    archivo ya no es posible volver a leerlos.
+
+    Returns:
+        bool: True si el archivo fue reescrito
+    """
+    if not photo.imagen:
+        return False
+
+    storage = photo.imagen.storage
+    with storage.open(photo.imagen.name, 'rb') as f:
+        data = f.read()
+
+    normalized, metadata = normalize_image(data)
+    file_fields = {'width': metadata.pop('width'), 'height': metadata.pop('height')}
+    if normalized is not None:
+        _replace_file(storage, photo.imagen.name, normalized)
+        # Los bytes cambiaron: la URL versionada también debe cambiar
+        file_fields['file_digest'] = hashlib.sha256(normalized).hexdigest()
+
+    # update() no dispara señales de guardado; updated_at se fija a mano para
+    # que la sincronización móvil vea las dimensiones y metadatos
+    now = timezone.now()
+    type(photo).objects.filter(imagen=photo.imagen.name).update(**file_fields, updated_at=now)
+    if any(value is not None for value in metadata.values()):
+        type(photo).objects.filter(
+            imagen=photo.imagen.name,
+            taken_at__isnull=True,
+            latitude__isnull=True,
+        ).update(**metadata, updated_at=now)
+    for field, value in {**metadata, **file_fields}.items():
+        if value is not None:
+            setattr(photo, field, value)
+    return normalized is not None
@@ -0,0 +1,315 @@
+"""
+Métricas de subida y de almacenamiento de las fotos.
+
+Por cada foto subida se guarda un ``PhotoUploadMetric`` con el tiempo de
+cada etapa:
+
+- ``receive_ms``: recepción del archivo en el request (multipart).
+- ``storage_ms``: hash del contenido y escritura en el almacenamiento.
+- ``decode_ms``: lectura, rotación y metadatos del original (worker).
+- ``renditions_ms``: generación de las versiones derivadas (worker).
+
+Además se mantiene ``PhotoStorageUsage`` con los bytes ocupados por
+aplicación, etapa, sitio y mes, para planificar la capacidad de disco.
+"""
+
+import logging
+import time
+from collections import defaultdict
+
+import numpy as np
+from django.core.files.uploadhandler import FileUploadHandler
+from django.db import IntegrityError, transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from .geofence import site_coordinates
+from .models import Photos, PhotoStorageUsage, PhotoUploadMetric
+
+logger = logging.getLogger(__name__)
+
+# Etapas medidas, en el orden en que ocurren
+TIMING_FIELDS = ['receive_ms', 'storage_ms', 'decode_ms', 'renditions_ms']
+
+
+def elapsed_ms(start):
+    """Milisegundos transcurridos desde ``start`` (``time.perf_counter()``)."""
+    return (time.perf_counter() - start) * 1000
+
+
+class UploadTimingHandler(FileUploadHandler):
+    """
+    Mide cuánto tarda en recibirse cada archivo de un request multipart.
+
+    No guarda datos: solo toma el tiempo entre el inicio y el fin de cada
+    archivo y deja que los manejadores siguientes lo almacenen.
+    """
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.timings = defaultdict(list)
+        self._start = None
+
+    def new_file(self, field_name, *args, **kwargs):
+        super().new_file(field_name, *args, **kwargs)
+        self._start = time.perf_counter()
+
+    def receive_data_chunk(self, raw_data, start):
+        return raw_data
+
+    def file_complete(self, file_size):
+        if self._start is not None:
+            self.timings[self.field_name].append(elapsed_ms(self._start))
+            self._start = None
+        return None
+
+    def receive_ms(self, field_name, index):
+        """Tiempo de recepción del archivo ``index`` del campo ``field_name``."""
+        values = self.timings.get(field_name, [])
+        return values[index] if index < len(values) else None
+
+
+def track_upload_timings(request):
+    """
+    Agrega ``UploadTimingHandler`` a un request antes de leer los archivos.
+
+    Acepta tanto un ``HttpRequest`` como un ``Request`` de DRF.
+    """
+    request = getattr(request, '_request', request)
+    handler = UploadTimingHandler(request)
+    try:
+        request.upload_handlers.insert(0, handler)
+    except AttributeError:
+        # Los archivos ya se leyeron: la recepción queda sin medir
+        pass
+    return handler
+
+
+def _month(value):
+    """Primer día del mes (hora local) de una fecha."""
+    return timezone.localdate(value).replace(day=1)
+
+
+def _owns_file(photo):
+    """True si la foto es la primera que usa su archivo (la que lo cuenta)."""
+    if photo.digest:
+        others = Photos.objects.filter(digest=photo.digest)
+    else:
+        others = Photos.objects.filter(imagen=photo.imagen.name)
+    return not others.filter(pk__lt=photo.pk).exists()
+
+
+def _renditions_size(photo):
+    storage = photo.imagen.storage
+    total = 0
+    for name in (photo.renditions or {}).values():
+        if not name:
+            continue
+        try:
+            total += storage.size(name)
+        except OSError:
+            continue
+    return total
+
+
+def add_storage_usage(app, etapa, site_id, month, files=0, original_bytes=0, renditions_bytes=0):
+    """Suma archivos y bytes al acumulado de un grupo, creándolo si no existe."""
+    lookup = {'app': app, 'etapa': etapa, 'site_id': site_id, 'month': month}
+    changes = {
+        'files': F('files') + files,
+        'original_bytes': F('original_bytes') + original_bytes,
+        'renditions_bytes': F('renditions_bytes') + renditions_bytes,
+        'updated_at': timezone.now(),
+    }
+    if PhotoStorageUsage.objects.filter(**lookup).update(**changes):
+        return
+    try:
+        with transaction.atomic():
+            PhotoStorageUsage.objects.create(
+                files=files, original_bytes=original_bytes, renditions_bytes=renditions_bytes, **lookup
+            )
+    except IntegrityError:
+        # Creado por otra subida concurrente
+        PhotoStorageUsage.objects.filter(**lookup).update(**changes)
+
+
+def record_upload(photo, created, source, registro, size, receive_ms=None, storage_ms=None):
+    """
+    Registra la subida de una foto y suma su archivo al almacenamiento usado.
+
+    Las métricas nunca interrumpen la subida: los errores solo se registran
+    en el log.
+    """
+    site_id = getattr(registro, 'sitio_id', None)
+    try:
+        PhotoUploadMetric.objects.create(
+            photo=photo,
+            source=source,
+            app=photo.app,
+            etapa=photo.etapa,
+            site_id=site_id,
+            size=size or 0,
+            duplicate=not created,
+            receive_ms=receive_ms,
+            storage_ms=storage_ms,
+        )
+        if created and _owns_file(photo):
+            add_storage_usage(
+                photo.app, photo.etapa, site_id, _month(photo.created_at),
+                files=1, original_bytes=size or 0,
+            )
+    except Exception as e:
+        logger.warning("No se pudo registrar la métrica de la foto %s: %s", photo.pk, e)
+
+
+def record_processing(photo, decode_ms, renditions_ms):
+    """
+    Completa la métrica de subida con los tiempos del worker y suma el
+    tamaño de las versiones derivadas al almacenamiento usado.
+    """
+    try:
+        metric = PhotoUploadMetric.objects.filter(photo=photo, duplicate=False).order_by('id').first()
+        if metric is None or metric.decode_ms is not None:
+            # Foto sin métrica (anterior) o ya procesada: se corrige con rollup_photo_storage
+            return
+        PhotoUploadMetric.objects.filter(pk=metric.pk).update(decode_ms=decode_ms, renditions_ms=renditions_ms)
+        if _owns_file(photo):
+            add_storage_usage(
+                photo.app, photo.etapa, metric.site_id, _month(photo.created_at),
+                renditions_bytes=_renditions_size(photo),
+            )
+    except Exception as e:
+        logger.warning("No se pudo registrar el procesamiento de la foto %s: %s", photo.pk, e)
+
+
+def rebuild_storage_usage(batch_size=1000):
+    """
+    Recalcula ``PhotoStorageUsage`` a partir de los archivos en disco.
+
+    Corrige lo que no siguen los contadores incrementales (fotos borradas,
+    fotos anteriores a las métricas, archivos reescritos al normalizar).
+
+    Returns:
+        dict: ``{'files': ..., 'missing': ...}``
+    """
+    queryset = Photos.objects.exclude(imagen='').order_by('id')
+    content_type_ids = queryset.order_by().values_list('content_type_id', flat=True).distinct()
+    coordinates = site_coordinates(queryset, list(content_type_ids))
+    storage = Photos._meta.get_field('imagen').storage
+
+    buckets = defaultdict(lambda: [0, 0, 0])
+    vistos = set()
+    missing = 0
+    rows = queryset.values_list(
+        'imagen', 'renditions', 'app', 'etapa', 'content_type_id', 'object_id', 'created_at'
+    )
+    for name, renditions, app, etapa, ct_id, object_id, created_at in rows.iterator(chunk_size=batch_size):
+        if name in vistos:
+            continue
+        vistos.add(name)
+        try:
+            original = storage.size(name)
+        except OSError:
+            missing += 1
+            continue
+        site_id = coordinates.get((ct_id, object_id), (None,))[0]
+        bucket = buckets[(app, etapa, site_id, _month(created_at))]
+        bucket[0] += 1
+        bucket[1] += original
+        for rendition in (renditions or {}).values():
+            if not rendition:
+                continue
+            try:
+                bucket[2] += storage.size(rendition)
+            except OSError:
+                continue
+
+    with transaction.atomic():
+        PhotoStorageUsage.objects.all().delete()
+        PhotoStorageUsage.objects.bulk_create([
+            PhotoStorageUsage(
+                app=app, etapa=etapa, site_id=site_id, month=month,
+                files=files, original_bytes=original_bytes, renditions_bytes=renditions_bytes,
+            )
+            for (app, etapa, site_id, month), (files, original_bytes, renditions_bytes) in buckets.items()
+        ], batch_size=batch_size)
+    return {'files': len(vistos) - missing, 'missing': missing}
+
+
+def upload_timing_summary(desde=None):
+    """
+    Tiempos de subida por origen: cantidad, promedio, p50, p95 y máximo por etapa.
+    """
+    queryset = PhotoUploadMetric.objects.filter(duplicate=False)
+    if desde:
+        queryset = queryset.filter(created_at__gte=desde)
+
+    summary = {}
+    for source, label in PhotoUploadMetric.SOURCE_CHOICES:
+        rows = list(queryset.filter(source=source).values_list('size', *TIMING_FIELDS))
+        if not rows:
+            continue
+        # Una sola matriz por origen; NaN donde la etapa no se midió
+        values = np.array(rows, dtype=float)
+        steps = {}
+        for index, field in enumerate(TIMING_FIELDS, start=1):
+            column = values[:, index]
+            column = column[~np.isnan(column)]
+            if not column.size:
+                continue
+            p50, p95 = np.percentile(column, [50, 95])
+            steps[field] = {
+                'label': str(PhotoUploadMetric._meta.get_field(field).verbose_name),
+                'count': int(column.size),
+                'avg': round(float(column.mean()), 1),
+                'p50': round(float(p50), 1),
+                'p95': round(float(p95), 1),
+                'max': round(float(column.max()), 1),
+            }
+        summary[source] = {
+            'label': label,
+            'uploads': len(rows),
+            'bytes': int(np.nansum(values[:, 0])),
+            'steps': steps,
+        }
+    return summary
+
+
+def storage_usage_summary(site_limit=50):
+    """
+    Almacenamiento usado agrupado por aplicación/etapa, sitio y mes.
+    """
+    sums = {
+        'sum_files': Sum('files'),
+        'sum_original': Sum('original_bytes'),
+        'sum_renditions': Sum('renditions_bytes'),
+    }
+    queryset = PhotoStorageUsage.objects.order_by()
+
+    def _totals(row):
+        files = row.pop('sum_files') or 0
+        original = row.pop('sum_original') or 0
+        renditions = row.pop('sum_renditions') or 0
+        row.update(
+            files=files,
+            original_bytes=original,
+            renditions_bytes=renditions,
+            total_bytes=original + renditions,
+        )
+        return row
+
+    def _rows(values, order):
+        return [_totals(row) for row in queryset.values(*values).annotate(**sums).order_by(*order)]
+
+    by_site = _rows(['site_id', 'site__name'], ['-sum_original'])[:site_limit]
+    for row in by_site:
+        row['site'] = row.pop('site__name')
+    by_month = _rows(['month'], ['month'])
+    for row in by_month:
+        row['month'] = row['month'].strftime('%Y-%m')
+    return {
+        'total': _totals(queryset.aggregate(**sums)),
+        'by_app': _rows(['app', 'etapa'], ['app', 'etapa']),
+        'by_site': by_site,
+        'by_month': by_month,
+    }
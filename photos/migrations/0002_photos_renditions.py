@@ -0,0 +1,18 @@
+# Generated by Django 5.2.3 on 2026-10-17 17:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('photos', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='photos',
+            name='renditions',
+            field=models.JSONField(blank=True, default=dict, verbose_name='Versiones derivadas'),
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.3 on 2026-10-17 17:33
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('photos', '0002_photos_renditions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='photos',
+            name='processing_state',
+            field=models.CharField(choices=[('pending', 'Pendiente'), ('processing', 'Procesando'), ('ready', 'Lista'), ('error', 'Error')], db_index=True, default='ready', max_length=20, verbose_name='Estado de procesamiento'),
+        ),
+        # Las fotos existentes quedan como 'ready'; las nuevas nacen 'pending'
+        migrations.AlterField(
+            model_name='photos',
+            name='processing_state',
+            field=models.CharField(choices=[('pending', 'Pendiente'), ('processing', 'Procesando'), ('ready', 'Lista'), ('error', 'Error')], db_index=True, default='pending', max_length=20, verbose_name='Estado de procesamiento'),
+        ),
+        migrations.CreateModel(
+            name='PhotoJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('process', 'Procesar foto')], default='process', max_length=20, verbose_name='Tipo')),
+                ('payload', models.JSONField(blank=True, default=dict, verbose_name='Datos')),
+                ('status', models.CharField(choices=[('pending', 'Pendiente'), ('running', 'En ejecución'), ('done', 'Terminado'), ('failed', 'Fallido')], default='pending', max_length=20, verbose_name='Estado')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='Intentos')),
+                ('error', models.TextField(blank=True, default='', verbose_name='Error')),
+                ('run_after', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Ejecutar después de')),
+                ('locked_at', models.DateTimeField(blank=True, null=True, verbose_name='Tomado en')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('photo', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='jobs', to='photos.photos', verbose_name='Foto')),
+            ],
+            options={
+                'verbose_name': 'Trabajo de foto',
+                'verbose_name_plural': 'Trabajos de fotos',
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['status', 'run_after'], name='photojob_status_run_after_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.3 on 2026-10-17 17:36
+
+import photos.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('photos', '0003_photo_jobs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='photos',
+            name='digest',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=64, verbose_name='Hash SHA-256'),
+        ),
+        migrations.AlterField(
+            model_name='photos',
+            name='imagen',
+            field=models.ImageField(upload_to=photos.models.photo_upload_to),
+        ),
+        migrations.AddConstraint(
+            model_name='photos',
+            constraint=models.UniqueConstraint(condition=models.Q(('digest', ''), _negated=True), fields=('content_type', 'object_id', 'etapa', 'digest'), name='photos_unique_digest_per_etapa'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.3 on 2026-10-17 17:39
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('photos', '0004_photos_digest'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PhotoUploadSession',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('object_id', models.PositiveIntegerField()),
+                ('app', models.CharField(max_length=100, verbose_name='Aplicación')),
+                ('etapa', models.CharField(max_length=255)),
+                ('filename', models.CharField(max_length=255, verbose_name='Nombre de archivo')),
+                ('mime_type', models.CharField(default='image/jpeg', max_length=100, verbose_name='Tipo de contenido')),
+                ('descripcion', models.CharField(blank=True, default='', max_length=128)),
+                ('total_size', models.PositiveBigIntegerField(verbose_name='Tamaño total')),
+                ('received_size', models.PositiveBigIntegerField(default=0, verbose_name='Bytes recibidos')),
+                ('sha256', models.CharField(blank=True, default='', max_length=64, verbose_name='SHA-256 esperado')),
+                ('status', models.CharField(choices=[('active', 'En curso'), ('completed', 'Completada')], default='active', max_length=20, verbose_name='Estado')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('content_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='contenttypes.contenttype')),
+                ('photo', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='photos.photos', verbose_name='Foto creada')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='photo_upload_sessions', to=settings.AUTH_USER_MODEL, verbose_name='Usuario')),
+            ],
+            options={
+                'verbose_name': 'Subida por partes',
+                'verbose_name_plural': 'Subidas por partes',
+            },
+        ),
+    ]
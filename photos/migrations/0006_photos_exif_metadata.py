@@ -0,0 +1,33 @@
+# Generated by Django 5.2.3 on 2026-10-17 17:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('photos', '0005_photo_upload_session'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='photos',
+            name='latitude',
+            field=models.FloatField(blank=True, null=True, verbose_name='Latitud'),
+        ),
+        migrations.AddField(
+            model_name='photos',
+            name='longitude',
+            field=models.FloatField(blank=True, null=True, verbose_name='Longitud'),
+        ),
+        migrations.AddField(
+            model_name='photos',
+            name='taken_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True, verbose_name='Fecha de captura'),
+        ),
+        migrations.AddIndex(
+            model_name='photos',
+            index=models.Index(fields=['latitude', 'longitude'], name='photos_lat_lon_idx'),
+        ),
+    ]
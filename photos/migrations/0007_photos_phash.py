@@ -0,0 +1,18 @@
+# Generated by Django 5.2.3 on 2026-10-17 17:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('photos', '0006_photos_exif_metadata'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='photos',
+            name='phash',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=16, verbose_name='Hash perceptual'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.3 on 2026-10-17 17:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('photos', '0007_photos_phash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='photos',
+            name='height',
+            field=models.PositiveIntegerField(blank=True, null=True, verbose_name='Alto'),
+        ),
+        migrations.AddField(
+            model_name='photos',
+            name='width',
+            field=models.PositiveIntegerField(blank=True, null=True, verbose_name='Ancho'),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.3 on 2026-10-17 18:01
+
+import core.storage
+import photos.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('photos', '0008_photos_dimensions'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='photos',
+            name='imagen',
+            field=models.ImageField(storage=core.storage.get_media_storage, upload_to=photos.models.photo_upload_to),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.3 on 2026-10-17 18:04
+
+import core.storage
+import photos.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('photos', '0009_sharded_media_storage'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='photos',
+            name='imagen',
+            field=models.ImageField(max_length=255, storage=core.storage.get_media_storage, upload_to=photos.models.photo_upload_to),
+        ),
+    ]
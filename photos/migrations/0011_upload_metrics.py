@@ -0,0 +1,58 @@
+# Generated by Django 5.2.3 on 2026-10-17 18:08
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_imagen_max_length'),
+        ('photos', '0010_imagen_max_length'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PhotoUploadMetric',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(choices=[('web', 'Web'), ('mobile', 'API móvil')], max_length=20, verbose_name='Origen')),
+                ('app', models.CharField(max_length=100, verbose_name='Aplicación')),
+                ('etapa', models.CharField(max_length=255)),
+                ('size', models.PositiveBigIntegerField(default=0, verbose_name='Tamaño (bytes)')),
+                ('duplicate', models.BooleanField(default=False, verbose_name='Duplicada')),
+                ('receive_ms', models.FloatField(blank=True, null=True, verbose_name='Recepción (ms)')),
+                ('storage_ms', models.FloatField(blank=True, null=True, verbose_name='Guardado (ms)')),
+                ('decode_ms', models.FloatField(blank=True, null=True, verbose_name='Decodificación (ms)')),
+                ('renditions_ms', models.FloatField(blank=True, null=True, verbose_name='Versiones derivadas (ms)')),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('photo', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='upload_metrics', to='photos.photos', verbose_name='Foto')),
+                ('site', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='core.site', verbose_name='Sitio')),
+            ],
+            options={
+                'verbose_name': 'Métrica de subida',
+                'verbose_name_plural': 'Métricas de subida',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='PhotoStorageUsage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('app', models.CharField(max_length=100, verbose_name='Aplicación')),
+                ('etapa', models.CharField(max_length=255)),
+                ('month', models.DateField(verbose_name='Mes')),
+                ('files', models.PositiveIntegerField(default=0, verbose_name='Archivos')),
+                ('original_bytes', models.PositiveBigIntegerField(default=0, verbose_name='Originales (bytes)')),
+                ('renditions_bytes', models.PositiveBigIntegerField(default=0, verbose_name='Versiones (bytes)')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('site', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.site', verbose_name='Sitio')),
+            ],
+            options={
+                'verbose_name': 'Uso de almacenamiento',
+                'verbose_name_plural': 'Uso de almacenamiento',
+                'ordering': ['-month', 'app', 'etapa'],
+                'constraints': [models.UniqueConstraint(fields=('app', 'etapa', 'site', 'month'), name='photostorageusage_unique_bucket')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.3 on 2026-10-17 18:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('photos', '0011_upload_metrics'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='photojob',
+            name='kind',
+            field=models.CharField(choices=[('process', 'Procesar foto'), ('cleanup', 'Eliminar archivos')], default='process', max_length=20, verbose_name='Tipo'),
+        ),
+    ]
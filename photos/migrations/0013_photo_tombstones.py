@@ -0,0 +1,33 @@
+# Generated by Django 5.2.3 on 2026-10-17 18:37
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('photos', '0012_photojob_cleanup_kind'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PhotoTombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('photo_id', models.BigIntegerField(verbose_name='Foto')),
+                ('object_id', models.PositiveIntegerField()),
+                ('etapa', models.CharField(max_length=255)),
+                ('deleted_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Fecha de eliminación')),
+                ('content_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='contenttypes.contenttype')),
+            ],
+            options={
+                'verbose_name': 'Foto eliminada',
+                'verbose_name_plural': 'Fotos eliminadas',
+                'ordering': ['deleted_at', 'id'],
+                'indexes': [models.Index(fields=['content_type', 'object_id', 'etapa', 'deleted_at'], name='phototombstone_scope_idx')],
+            },
+        ),
+    ]
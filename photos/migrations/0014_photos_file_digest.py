@@ -0,0 +1,18 @@
+# Generated by Django 5.2.3 on 2026-10-17 18:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('photos', '0013_photo_tombstones'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='photos',
+            name='file_digest',
+            field=models.CharField(blank=True, default='', max_length=64, verbose_name='Hash del archivo'),
+        ),
+    ]
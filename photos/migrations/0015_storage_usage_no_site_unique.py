@@ -0,0 +1,41 @@
+# Generated by Django 5.2.3 on 2026-10-17 18:43
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def merge_duplicate_buckets(apps, schema_editor):
+    """Une los grupos sin sitio duplicados antes de crear la restricción."""
+    PhotoStorageUsage = apps.get_model('photos', 'PhotoStorageUsage')
+    duplicates = (
+        PhotoStorageUsage.objects.filter(site__isnull=True)
+        .values('app', 'etapa', 'month')
+        .annotate(total=Count('id'))
+        .filter(total__gt=1)
+    )
+    for bucket in duplicates:
+        rows = PhotoStorageUsage.objects.filter(
+            site__isnull=True, app=bucket['app'], etapa=bucket['etapa'], month=bucket['month']
+        ).order_by('id')
+        totals = rows.aggregate(
+            files=Sum('files'), original_bytes=Sum('original_bytes'), renditions_bytes=Sum('renditions_bytes')
+        )
+        keep = rows.first()
+        rows.exclude(pk=keep.pk).delete()
+        PhotoStorageUsage.objects.filter(pk=keep.pk).update(**totals)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_imagen_max_length'),
+        ('photos', '0014_photos_file_digest'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_buckets, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='photostorageusage',
+            constraint=models.UniqueConstraint(condition=models.Q(('site__isnull', True)), fields=('app', 'etapa', 'month'), name='photostorageusage_unique_bucket_no_site'),
+        ),
+    ]
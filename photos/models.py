@@ -1,9 +1,77 @@
 from django.db import models
+from django.db.models import Count, Q
 from core.models import BaseModel
 from django.contrib.contenttypes.models import ContentType
 from django.contrib.contenttypes.fields import GenericForeignKey
+from registros.models.paso import PasoBase
+from core.storage import dated_path, get_media_storage
+from core.utils.media import versioned_media_url
+from django.conf import settings
+from django.utils import timezone
+import os
+import uuid
+
+
+def photo_upload_to(instance, filename):
+    """
+    Ruta direccionada por contenido: ``photos/<app>/<año>/<mes>/<sha256>.<ext>``.
+
+    Dos subidas con los mismos bytes apuntan al mismo archivo, por lo que
+    un reintento no escribe una copia nueva en disco. El almacenamiento
+    (``core.storage``) agrega el subdirectorio con el prefijo del hash.
+    """
+    if instance.digest:
+        _root, ext = os.path.splitext(filename)
+        filename = f"{instance.digest}{ext.lower() or '.jpg'}"
+    return dated_path('photos', filename, instance.app or None, instance.created_at)
+
+
+def photos_q_for_registro(registro, etapa=None):
+    """
+    Filtro de todas las fotos de un registro.
+
+    Las fotos pueden estar asociadas al registro o al objeto de un paso
+    (``RSitio``, ``RAcceso``, ...) que apunta al registro con un campo
+    ``registro``.
+    """
+    q = Q(content_type=ContentType.objects.get_for_model(registro), object_id=registro.pk)
+    for rel in registro._meta.related_objects:
+        paso_model = rel.related_model
+        if rel.field.name != 'registro' or not issubclass(paso_model, PasoBase):
+            continue
+        # Subconsulta: no agrega una consulta por paso
+        q |= Q(
+            content_type=ContentType.objects.get_for_model(paso_model),
+            object_id__in=paso_model.objects.filter(registro=registro).values('id')
+        )
+    if etapa:
+        q &= Q(etapa=etapa)
+    return q
+
+
+def photo_media_version(file_digest, digest, updated_at):
+    """
+    Versión de los archivos de una foto para URLs con caché inmutable.
+
+    El original se reescribe al normalizarlo (ver ``photos.metadata``): desde
+    entonces la versión es el hash del archivo guardado y no el de la subida.
+    """
+    return file_digest or digest or updated_at
+
 
 class Photos(BaseModel):
+    # Estados del procesamiento posterior a la subida (versiones derivadas, etc.)
+    PROCESSING_PENDING = 'pending'
+    PROCESSING_RUNNING = 'processing'
+    PROCESSING_READY = 'ready'
+    PROCESSING_ERROR = 'error'
+    PROCESSING_STATE_CHOICES = [
+        (PROCESSING_PENDING, 'Pendiente'),
+        (PROCESSING_RUNNING, 'Procesando'),
+        (PROCESSING_READY, 'Lista'),
+        (PROCESSING_ERROR, 'Error'),
+    ]
+
     # Referencia genérica al modelo de Registro (puede ser de cualquier app)
     content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
     object_id = models.PositiveIntegerField()
@@ -12,9 +80,31 @@ class Photos(BaseModel):
     # Campo para identificar la aplicación
     app = models.CharField(max_length=100, verbose_name='Aplicación')
     etapa = models.CharField(max_length=255)
-    imagen = models.ImageField(upload_to='photos/')
+    imagen = models.ImageField(upload_to=photo_upload_to, storage=get_media_storage, max_length=255)
+    # SHA-256 del archivo original, usado para deduplicar subidas repetidas
+    digest = models.CharField(max_length=64, blank=True, default='', db_index=True, verbose_name='Hash SHA-256')
+    # SHA-256 del archivo guardado, si se reescribió al normalizarlo
+    file_digest = models.CharField(max_length=64, blank=True, default='', verbose_name='Hash del archivo')
     descripcion = models.CharField(max_length=128, blank=True, null=True)
     orden = models.IntegerField(default=0)
+    # Versiones derivadas (miniatura, media, impresión) generadas al subir
+    renditions = models.JSONField(default=dict, blank=True, verbose_name='Versiones derivadas')
+    processing_state = models.CharField(
+        max_length=20,
+        choices=PROCESSING_STATE_CHOICES,
+        default=PROCESSING_PENDING,
+        db_index=True,
+        verbose_name='Estado de procesamiento'
+    )
+    # Metadatos EXIF extraídos al procesar la foto (ver ``photos.metadata``)
+    taken_at = models.DateTimeField(null=True, blank=True, db_index=True, verbose_name='Fecha de captura')
+    latitude = models.FloatField(null=True, blank=True, verbose_name='Latitud')
+    longitude = models.FloatField(null=True, blank=True, verbose_name='Longitud')
+    # Dimensiones del original ya rotado (ver ``photos.metadata``)
+    width = models.PositiveIntegerField(null=True, blank=True, verbose_name='Ancho')
+    height = models.PositiveIntegerField(null=True, blank=True, verbose_name='Alto')
+    # Hash perceptual (dHash de 64 bits, hexadecimal) para detectar fotos casi duplicadas
+    phash = models.CharField(max_length=16, blank=True, default='', db_index=True, verbose_name='Hash perceptual')
 
     def __str__(self):
         return f"{self.registro} - {self.created_at.strftime('%d/%m/%Y %H:%M')}"
@@ -23,6 +113,59 @@ class Photos(BaseModel):
         verbose_name = 'Foto'
         verbose_name_plural = 'Fotos'
         ordering = ['orden', '-created_at']
+        constraints = [
+            # Una misma imagen solo puede estar una vez por registro y etapa
+            models.UniqueConstraint(
+                fields=['content_type', 'object_id', 'etapa', 'digest'],
+                condition=~models.Q(digest=''),
+                name='photos_unique_digest_per_etapa',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['latitude', 'longitude'], name='photos_lat_lon_idx'),
+        ]
+
+    @property
+    def media_version(self):
+        """Versión de los archivos de la foto para URLs con caché inmutable."""
+        return photo_media_version(self.file_digest, self.digest, self.updated_at)
+
+    def get_rendition_url(self, size, versioned=True):
+        """
+        Devuelve la URL de una versión derivada de la foto.
+        Si la versión aún no existe, devuelve la URL del original.
+        """
+        name = (self.renditions or {}).get(size) or (self.imagen.name if self.imagen else None)
+        if not name:
+            return None
+        if versioned:
+            return versioned_media_url(name, self.media_version, self.imagen.storage)
+        return self.imagen.storage.url(name)
+
+    @property
+    def image_url(self):
+        """URL versionada del archivo original."""
+        if not self.imagen:
+            return None
+        return versioned_media_url(self.imagen.name, self.media_version, self.imagen.storage)
+
+    @property
+    def thumbnail_url(self):
+        """URL de la miniatura para galerías y listados."""
+        return self.get_rendition_url('thumb')
+
+    @property
+    def medium_url(self):
+        """URL de la versión media para visualización en pantalla."""
+        return self.get_rendition_url('medium')
+
+    @property
+    def print_url(self):
+        """
+        URL de la versión para impresión en reportes PDF.
+        Sin versión: WeasyPrint la descarga sin sesión de usuario.
+        """
+        return self.get_rendition_url('print', versioned=False)
 
     @staticmethod
     def count_photos(registro_id, etapa, app_name=None, content_type=None):
@@ -53,6 +196,24 @@ class Photos(BaseModel):
             
         return Photos.objects.filter(**filters).count()
 
+    @staticmethod
+    def count_photos_for_registro(registro, app_name=None):
+        """
+        Cuenta las fotos de todas las etapas de un registro con una sola consulta.
+
+        Args:
+            registro: Registro (RegTxtss, RegConstruccion, ...)
+            app_name (str, optional): Nombre de la aplicación
+
+        Returns:
+            dict: ``{(content_type_id, etapa): cantidad}``
+        """
+        queryset = Photos.objects.filter(photos_q_for_registro(registro))
+        if app_name:
+            queryset = queryset.filter(app=app_name)
+        rows = queryset.values('content_type', 'etapa').annotate(total=Count('id')).order_by()
+        return {(row['content_type'], row['etapa']): row['total'] for row in rows}
+
     @staticmethod
     def get_photo_count_and_color(registro_id, etapa, app_name=None, content_type=None):
         """
@@ -70,3 +231,238 @@ class Photos(BaseModel):
         return Photos.count_photos(registro_id, etapa, app_name, content_type)
 
 
+class PhotoTombstone(models.Model):
+    """
+    Registro de una foto que dejó de estar en su registro y etapa (eliminada o
+    movida a otra etapa). La sincronización incremental lo usa para informar a
+    los clientes qué fotos deben quitar.
+    """
+    photo_id = models.BigIntegerField(verbose_name='Foto')
+    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
+    object_id = models.PositiveIntegerField()
+    etapa = models.CharField(max_length=255)
+    deleted_at = models.DateTimeField(default=timezone.now, verbose_name='Fecha de eliminación')
+
+    class Meta:
+        verbose_name = 'Foto eliminada'
+        verbose_name_plural = 'Fotos eliminadas'
+        ordering = ['deleted_at', 'id']
+        indexes = [
+            models.Index(
+                fields=['content_type', 'object_id', 'etapa', 'deleted_at'],
+                name='phototombstone_scope_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f"Foto #{self.photo_id} ({self.etapa})"
+
+
+class PhotoJob(models.Model):
+    """
+    Cola de trabajos en base de datos para el procesamiento de fotos.
+    Los trabajos los ejecuta el proceso ``manage.py run_photo_worker``.
+    """
+    KIND_PROCESS = 'process'
+    KIND_CLEANUP = 'cleanup'
+    KIND_CHOICES = [
+        (KIND_PROCESS, 'Procesar foto'),
+        (KIND_CLEANUP, 'Eliminar archivos'),
+    ]
+
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pendiente'),
+        (STATUS_RUNNING, 'En ejecución'),
+        (STATUS_DONE, 'Terminado'),
+        (STATUS_FAILED, 'Fallido'),
+    ]
+
+    photo = models.ForeignKey(
+        Photos,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='jobs',
+        verbose_name='Foto'
+    )
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES, default=KIND_PROCESS, verbose_name='Tipo')
+    payload = models.JSONField(default=dict, blank=True, verbose_name='Datos')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING, verbose_name='Estado')
+    attempts = models.PositiveSmallIntegerField(default=0, verbose_name='Intentos')
+    error = models.TextField(blank=True, default='', verbose_name='Error')
+    run_after = models.DateTimeField(default=timezone.now, verbose_name='Ejecutar después de')
+    locked_at = models.DateTimeField(null=True, blank=True, verbose_name='Tomado en')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Trabajo de foto'
+        verbose_name_plural = 'Trabajos de fotos'
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['status', 'run_after'], name='photojob_status_run_after_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} #{self.id} ({self.get_status_display()})"
+
+
+class PhotoUploadSession(models.Model):
+    """
+    Subida de una imagen por partes (API móvil).
+
+    Los bytes recibidos se acumulan en un archivo temporal; al completar la
+    subida se crea la foto con el flujo normal (``store_photo``). Si la
+    conexión se corta, el cliente consulta ``received_size`` y continúa
+    desde ese punto sin volver a enviar lo ya recibido.
+    """
+    STATUS_ACTIVE = 'active'
+    STATUS_COMPLETED = 'completed'
+    STATUS_CHOICES = [
+        (STATUS_ACTIVE, 'En curso'),
+        (STATUS_COMPLETED, 'Completada'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='photo_upload_sessions',
+        verbose_name='Usuario'
+    )
+    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
+    object_id = models.PositiveIntegerField()
+    app = models.CharField(max_length=100, verbose_name='Aplicación')
+    etapa = models.CharField(max_length=255)
+    filename = models.CharField(max_length=255, verbose_name='Nombre de archivo')
+    mime_type = models.CharField(max_length=100, default='image/jpeg', verbose_name='Tipo de contenido')
+    descripcion = models.CharField(max_length=128, blank=True, default='')
+    total_size = models.PositiveBigIntegerField(verbose_name='Tamaño total')
+    received_size = models.PositiveBigIntegerField(default=0, verbose_name='Bytes recibidos')
+    sha256 = models.CharField(max_length=64, blank=True, default='', verbose_name='SHA-256 esperado')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_ACTIVE, verbose_name='Estado')
+    photo = models.ForeignKey(
+        Photos,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+',
+        verbose_name='Foto creada'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Subida por partes'
+        verbose_name_plural = 'Subidas por partes'
+
+    def __str__(self):
+        return f"{self.filename} ({self.received_size}/{self.total_size})"
+
+    @property
+    def is_complete(self):
+        return self.received_size >= self.total_size
+
+
+class PhotoUploadMetric(models.Model):
+    """
+    Tiempos de una subida de foto, por etapa del proceso.
+
+    Las vistas de subida registran la recepción y el guardado; el worker
+    completa la decodificación y la generación de versiones al procesarla
+    (ver ``photos.metrics``). Los tiempos están en milisegundos.
+    """
+    SOURCE_WEB = 'web'
+    SOURCE_MOBILE = 'mobile'
+    SOURCE_CHOICES = [
+        (SOURCE_WEB, 'Web'),
+        (SOURCE_MOBILE, 'API móvil'),
+    ]
+
+    photo = models.ForeignKey(
+        Photos,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='upload_metrics',
+        verbose_name='Foto'
+    )
+    source = models.CharField(max_length=20, choices=SOURCE_CHOICES, verbose_name='Origen')
+    app = models.CharField(max_length=100, verbose_name='Aplicación')
+    etapa = models.CharField(max_length=255)
+    site = models.ForeignKey(
+        'core.Site',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+',
+        verbose_name='Sitio'
+    )
+    size = models.PositiveBigIntegerField(default=0, verbose_name='Tamaño (bytes)')
+    duplicate = models.BooleanField(default=False, verbose_name='Duplicada')
+    receive_ms = models.FloatField(null=True, blank=True, verbose_name='Recepción (ms)')
+    storage_ms = models.FloatField(null=True, blank=True, verbose_name='Guardado (ms)')
+    decode_ms = models.FloatField(null=True, blank=True, verbose_name='Decodificación (ms)')
+    renditions_ms = models.FloatField(null=True, blank=True, verbose_name='Versiones derivadas (ms)')
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        verbose_name = 'Métrica de subida'
+        verbose_name_plural = 'Métricas de subida'
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.app}/{self.etapa} #{self.photo_id} ({self.created_at:%d/%m/%Y %H:%M})"
+
+
+class PhotoStorageUsage(models.Model):
+    """
+    Espacio ocupado por las fotos, agregado por aplicación, etapa, sitio y mes.
+
+    Se incrementa al subir y procesar cada foto, y se recalcula completo con
+    ``manage.py rollup_photo_storage``. Un archivo compartido por varias
+    fotos (ver ``photos.dedup``) se cuenta una sola vez, en la primera.
+    """
+    app = models.CharField(max_length=100, verbose_name='Aplicación')
+    etapa = models.CharField(max_length=255)
+    site = models.ForeignKey(
+        'core.Site',
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='+',
+        verbose_name='Sitio'
+    )
+    month = models.DateField(verbose_name='Mes')
+    files = models.PositiveIntegerField(default=0, verbose_name='Archivos')
+    original_bytes = models.PositiveBigIntegerField(default=0, verbose_name='Originales (bytes)')
+    renditions_bytes = models.PositiveBigIntegerField(default=0, verbose_name='Versiones (bytes)')
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Uso de almacenamiento'
+        verbose_name_plural = 'Uso de almacenamiento'
+        ordering = ['-month', 'app', 'etapa']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['app', 'etapa', 'site', 'month'],
+                name='photostorageusage_unique_bucket',
+            ),
+            # Los NULL no chocan entre sí: los grupos sin sitio necesitan su propia restricción
+            models.UniqueConstraint(
+                fields=['app', 'etapa', 'month'],
+                condition=models.Q(site__isnull=True),
+                name='photostorageusage_unique_bucket_no_site',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.app}/{self.etapa} {self.month:%m/%Y}"
+
+    @property
+    def total_bytes(self):
+        return self.original_bytes + self.renditions_bytes
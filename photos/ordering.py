@@ -0,0 +1,89 @@
+"""
+Orden de las fotos de una etapa.
+
+El reordenamiento se guarda con un único ``UPDATE ... CASE`` dentro de una
+transacción. Para no pisar cambios de otro usuario se usa un token de
+versión (hash de los pares ``id:orden`` de la etapa): el cliente envía la
+versión que conoce y, si no coincide con la actual, el cambio se rechaza.
+"""
+
+import hashlib
+
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.db.models import Case, IntegerField, Q, Value, When
+from django.utils import timezone
+
+from .models import Photos
+
+
+class OrderConflict(Exception):
+    """La versión enviada por el cliente no coincide con la actual."""
+
+    def __init__(self, version):
+        super().__init__('Las fotos fueron modificadas por otro usuario')
+        self.version = version
+
+
+def etapa_photos(registro, model_class, object_id, etapa):
+    """
+    Fotos de una etapa: las asociadas al objeto de la etapa y, por
+    compatibilidad con fotos antiguas, las asociadas al registro principal.
+    """
+    q = Q(content_type=ContentType.objects.get_for_model(model_class), object_id=object_id)
+    if model_class is not type(registro):
+        q |= Q(content_type=ContentType.objects.get_for_model(type(registro)), object_id=registro.id)
+    return Photos.objects.filter(q, app=registro._meta.app_label, etapa=etapa)
+
+
+def ordering_version(pairs):
+    """Token de versión a partir de pares ``(id, orden)``."""
+    payload = ','.join(f'{pk}:{orden}' for pk, orden in sorted(pairs))
+    return hashlib.sha1(payload.encode()).hexdigest()[:16]
+
+
+def get_ordering_version(queryset):
+    """Versión actual del orden de un conjunto de fotos."""
+    return ordering_version(queryset.values_list('id', 'orden'))
+
+
+def reorder_photos(queryset, orden, version=None):
+    """
+    Asigna ``orden`` = posición en la lista a cada foto con un solo UPDATE.
+
+    Args:
+        queryset: Fotos de la etapa (limita qué IDs se pueden modificar)
+        orden (list): IDs de las fotos en el nuevo orden
+        version (str, optional): Versión conocida por el cliente
+
+    Returns:
+        str: Nueva versión del orden
+
+    Raises:
+        OrderConflict: Si ``version`` no coincide con la versión actual
+    """
+    ids = [int(pk) for pk in orden]
+    with transaction.atomic():
+        # Bloquear las filas para que la verificación y el UPDATE sean atómicos
+        current = list(queryset.select_for_update().values_list('id', 'orden'))
+        current_version = ordering_version(current)
+        if version and version != current_version:
+            raise OrderConflict(current_version)
+
+        # Solo las fotos que cambian de posición (y de updated_at)
+        existing = dict(current)
+        positions = {
+            pk: index for index, pk in enumerate(ids) if pk in existing and existing[pk] != index
+        }
+        if positions:
+            queryset.filter(id__in=positions).update(
+                orden=Case(
+                    *[When(id=pk, then=Value(index)) for pk, index in positions.items()],
+                    output_field=IntegerField(),
+                ),
+                # update() no modifica auto_now; la sincronización móvil depende de él
+                updated_at=timezone.now(),
+            )
+
+        new_pairs = [(pk, positions.get(pk, orden_actual)) for pk, orden_actual in current]
+    return ordering_version(new_pairs)
@@ -0,0 +1,163 @@
+"""
+Generación de versiones derivadas (renditions) de las fotos.
+
+Cada foto subida conserva el original en ``Photos.imagen`` y, junto a él,
+se guardan versiones reducidas con dimensiones y calidad fijas:
+
+- ``thumb``: miniaturas para galerías y listados.
+- ``medium``: visualización a pantalla completa en la web.
+- ``print``: imágenes para los reportes PDF.
+
+Las versiones para la web (``medium`` y ``thumb``) se generan además en WebP
+y, si Pillow lo soporta, en AVIF; ``serve_media`` entrega el formato que
+acepte el navegador. ``print`` queda solo en JPEG para los reportes PDF.
+
+Los nombres de archivo de cada versión se guardan en ``Photos.renditions``
+(``thumb``, ``thumb.webp``, ``thumb.avif``, ...).
+"""
+
+import io
+import os
+
+from django.core.files.base import ContentFile
+from django.utils import timezone
+from PIL import Image, ImageOps, features
+
+# Tamaños máximos (ancho, alto) y calidad JPEG de cada versión.
+# Ordenadas de mayor a menor: cada versión se reduce a partir de la anterior.
+RENDITIONS = {
+    'print': {'max_size': (2000, 2000), 'quality': 85},
+    'medium': {'max_size': (1280, 1280), 'quality': 80, 'web': True},
+    'thumb': {'max_size': (480, 480), 'quality': 70, 'web': True},
+}
+
+# Formatos adicionales de las versiones web y sus opciones de codificación
+WEB_FORMATS = {
+    'avif': {'format': 'AVIF', 'quality': 55, 'speed': 6},
+    'webp': {'format': 'WEBP', 'quality': 75, 'method': 4},
+}
+
+
+def available_web_formats():
+    """Formatos web que la instalación de Pillow puede codificar."""
+    return [fmt for fmt in WEB_FORMATS if features.check(fmt)]
+
+
+def rendition_keys(size):
+    """Claves de ``Photos.renditions`` de una versión (JPEG y formatos web)."""
+    keys = [size]
+    if RENDITIONS.get(size, {}).get('web'):
+        keys.extend(f'{size}.{fmt}' for fmt in available_web_formats())
+    return keys
+
+
+def rendition_name(original_name, size):
+    """
+    Devuelve el nombre de archivo de una versión, junto al original.
+
+    Ejemplo: ``photos/IMG_0001.jpg`` -> ``photos/IMG_0001_thumb.jpg``
+    (``thumb.webp`` -> ``photos/IMG_0001_thumb.webp``)
+    """
+    root, _ext = os.path.splitext(original_name)
+    size, _dot, fmt = size.partition('.')
+    return f"{root}_{size}.{fmt or 'jpg'}"
+
+
+def _encode_jpeg(image, quality):
+    """Codifica una imagen PIL como JPEG y devuelve los bytes."""
+    buffer = io.BytesIO()
+    image.save(buffer, format='JPEG', quality=quality, optimize=True, progressive=True)
+    return buffer.getvalue()
+
+
+def _encode_web(image, fmt):
+    """Codifica una imagen PIL en un formato web (WebP, AVIF)."""
+    options = dict(WEB_FORMATS[fmt])
+    buffer = io.BytesIO()
+    image.save(buffer, **options)
+    return buffer.getvalue()
+
+
+def _open_for_renditions(imagen, max_size):
+    """
+    Abre el original y lo prepara para generar las versiones.
+
+    Para JPEG se usa ``draft`` para que el decodificador reduzca la imagen
+    al decodificar (mucho más rápido y con menos memoria que decodificar
+    los 12 MP completos).
+    """
+    imagen.open('rb')
+    try:
+        image = Image.open(imagen)
+        image.draft('RGB', max_size)
+        image = ImageOps.exif_transpose(image)
+        if image.mode != 'RGB':
+            image = image.convert('RGB')
+        image.load()
+    finally:
+        imagen.close()
+    return image
+
+
+def generate_renditions(photo, sizes=None, force=False):
+    """
+    Genera las versiones derivadas de una foto y las guarda junto al original.
+
+    Args:
+        photo (Photos): Foto a procesar
+        sizes (list, optional): Versiones a generar (por defecto todas)
+        force (bool): Regenerar aunque la versión ya exista
+
+    Returns:
+        dict: Mapa ``{versión: nombre de archivo}`` actualizado
+    """
+    if not photo.imagen:
+        return {}
+
+    storage = photo.imagen.storage
+    renditions = dict(photo.renditions or {})
+    pending = [
+        size for size in RENDITIONS
+        if (sizes is None or size in sizes)
+        and (force or any(key not in renditions for key in rendition_keys(size)))
+    ]
+    if not pending:
+        return renditions
+
+    largest = RENDITIONS[pending[0]]['max_size']
+    image = _open_for_renditions(photo.imagen, largest)
+
+    for size in pending:
+        spec = RENDITIONS[size]
+        # Reducir a partir de la versión anterior (ya más pequeña)
+        image.thumbnail(spec['max_size'], Image.LANCZOS)
+        jpeg_size = None
+        for key in rendition_keys(size):
+            fmt = key.partition('.')[2]
+            data = _encode_web(image, fmt) if fmt else _encode_jpeg(image, spec['quality'])
+            name = rendition_name(photo.imagen.name, key)
+            if not fmt:
+                jpeg_size = len(data)
+            elif len(data) >= jpeg_size:
+                # No es más liviano que el JPEG: no se guarda y se entrega el JPEG
+                if storage.exists(name):
+                    storage.delete(name)
+                renditions[key] = None
+                continue
+            if storage.exists(name):
+                storage.delete(name)
+            renditions[key] = storage.save(name, ContentFile(data))
+
+    # update() no dispara señales de guardado; updated_at se fija a mano para
+    # que la sincronización móvil vea la miniatura nueva
+    type(photo).objects.filter(pk=photo.pk).update(renditions=renditions, updated_at=timezone.now())
+    photo.renditions = renditions
+    return renditions
+
+
+def delete_renditions(photo):
+    """Elimina del almacenamiento los archivos de las versiones de una foto."""
+    storage = photo.imagen.storage
+    for name in (photo.renditions or {}).values():
+        if name and storage.exists(name):
+            storage.delete(name)
@@ -0,0 +1,256 @@
+"""
+Detección de fotos casi duplicadas mediante hash perceptual.
+
+Cada foto guarda un dHash de 64 bits (``Photos.phash``): dos fotos de la
+misma escena, aunque hayan sido recomprimidas, redimensionadas o tengan
+pequeñas diferencias de exposición, producen hashes a pocos bits de
+distancia (distancia de Hamming). Para buscar casi duplicados en el
+historial de un sitio no se comparan imágenes ni todos los pares de hashes:
+los hashes de sus fotos se cargan en un arreglo NumPy y se indexan por bandas
+de bits (multi-index hashing, ``near_pairs``); solo se verifican los pares
+que coinciden en alguna banda.
+"""
+
+from itertools import combinations
+from math import comb
+
+import numpy as np
+from django.contrib.contenttypes.models import ContentType
+from django.db.models import Q
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from registros.models.base import RegistroBase
+from registros.models.paso import PasoBase
+from registros.registry import get_registro_models
+
+from .models import Photos
+
+# Tamaño del dHash: (HASH_SIZE + 1) x HASH_SIZE píxeles -> 64 bits
+HASH_SIZE = 8
+HASH_BITS = HASH_SIZE * HASH_SIZE
+# Distancia de Hamming máxima por defecto para considerar dos fotos similares
+DEFAULT_MAX_DISTANCE = 8
+# Bandas del índice como máximo: bandas de menos de 8 bits agrupan demasiados hashes
+MAX_BANDS = 8
+# Bandas de hasta este ancho se indexan con una tabla por valor (2**bits entradas)
+MAX_TABLE_BITS = 22
+
+
+def dhash(image):
+    """
+    Calcula el dHash de una imagen PIL como entero de 64 bits.
+
+    Se reduce la imagen a 9x8 en escala de grises y cada bit indica si un
+    píxel es más claro que su vecino de la derecha.
+    """
+    image = image.convert('L').resize((HASH_SIZE + 1, HASH_SIZE), Image.LANCZOS)
+    pixels = image.tobytes()
+    value = 0
+    for row in range(HASH_SIZE):
+        offset = row * (HASH_SIZE + 1)
+        for col in range(HASH_SIZE):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+
+def compute_photo_hash(photo):
+    """
+    Calcula y guarda el hash perceptual de una foto.
+
+    Returns:
+        str: Hash en hexadecimal (16 caracteres), o '' si no hay imagen
+    """
+    if not photo.imagen:
+        return ''
+    photo.imagen.open('rb')
+    try:
+        image = Image.open(photo.imagen)
+        # Decodificar a baja resolución: el hash solo usa 9x8 píxeles
+        image.draft('L', (64, 64))
+        image = ImageOps.exif_transpose(image)
+        value = f'{dhash(image):016x}'
+    finally:
+        photo.imagen.close()
+    # update() no dispara señales de guardado; updated_at se fija a mano para
+    # la sincronización móvil
+    type(photo).objects.filter(imagen=photo.imagen.name, phash='').update(phash=value, updated_at=timezone.now())
+    photo.phash = value
+    return value
+
+
+def _band_widths(max_distance, total):
+    """
+    Ancho en bits de cada banda del índice.
+
+    Más bandas significa bandas más angostas (buckets con más hashes) pero
+    un radio de búsqueda menor en cada una. Se elige el número de bandas con
+    menor costo estimado: variantes a buscar más candidatos a verificar.
+    """
+    def widths(bands):
+        return [HASH_BITS // bands + (band < HASH_BITS % bands) for band in range(bands)]
+
+    def cost(bands):
+        radius = max_distance // bands
+        return sum(
+            comb(bits, count) * (total + 1) * (1 + total / 2 ** bits)
+            for bits in widths(bands)
+            for count in range(radius + 1)
+        )
+
+    return widths(min(range(1, MAX_BANDS + 1), key=cost))
+
+
+def _flip_masks(bits, radius):
+    """Máscaras con hasta ``radius`` bits encendidos dentro de una banda de ``bits``."""
+    masks = [0]
+    for count in range(1, radius + 1):
+        masks.extend(sum(1 << bit for bit in combo) for combo in combinations(range(bits), count))
+    return np.array(masks, dtype=np.uint64)
+
+
+def near_pairs(values, max_distance):
+    """
+    Busca los pares de hashes a ``max_distance`` bits o menos.
+
+    Multi-index hashing: los 64 bits se dividen en ``m`` bandas y, si dos
+    hashes difieren en ``max_distance`` bits o menos, en alguna banda
+    difieren en ``max_distance // m`` bits o menos. Por cada banda los
+    hashes se agrupan por su valor (los buckets) y cada hash busca las
+    variantes de su banda dentro de ese radio. Solo los candidatos
+    encontrados se verifican con XOR y conteo de bits, en lugar de comparar
+    todos los pares.
+
+    Args:
+        values (numpy.ndarray): Hashes (``uint64``)
+        max_distance (int): Bits distintos permitidos
+
+    Returns:
+        tuple: ``(i, j, distancias)``, arreglos con los índices ``i < j`` de
+        cada par y su distancia
+    """
+    total = len(values)
+    found = [np.empty(0, dtype=np.int64)]
+    widths = _band_widths(max_distance, total)
+    radius = max_distance // len(widths)
+    indexes = np.arange(total)
+    shift = 0
+    for bits in widths:
+        keys = (values >> np.uint64(shift)) & np.uint64((1 << bits) - 1)
+        shift += bits
+        order = np.argsort(keys, kind='stable')
+        sorted_keys = keys[order]
+        if bits <= MAX_TABLE_BITS:
+            # Bandas angostas: inicio y tamaño de cada bucket en una tabla
+            sizes = np.bincount(keys.astype(np.int64), minlength=1 << bits)
+            starts = np.cumsum(sizes) - sizes
+        for flip in _flip_masks(bits, radius):
+            probes = keys ^ flip
+            if bits <= MAX_TABLE_BITS:
+                lo = starts[probes.astype(np.int64)]
+                counts = sizes[probes.astype(np.int64)]
+            else:
+                lo = np.searchsorted(sorted_keys, probes, side='left')
+                counts = np.searchsorted(sorted_keys, probes, side='right') - lo
+            matches = int(counts.sum())
+            if not matches:
+                continue
+            # Un par (i, j) por cada hash j del bucket que busca i
+            i = np.repeat(indexes, counts)
+            offsets = np.arange(matches) - np.repeat(np.cumsum(counts) - counts, counts)
+            j = order[np.repeat(lo, counts) + offsets]
+            keep = i < j
+            i, j = i[keep], j[keep]
+            keep = np.bitwise_count(values[i] ^ values[j]) <= max_distance
+            # Un par puede aparecer en varias bandas: se codifica para quitar repetidos
+            found.append(i[keep] * total + j[keep])
+
+    pairs = np.unique(np.concatenate(found))
+    i, j = np.divmod(pairs, total)
+    return i, j, np.bitwise_count(values[i] ^ values[j])
+
+
+def _site_photo_sources(site):
+    """
+    Fuentes de fotos de un sitio: ``[(content_type, objetos, ruta al registro)]``.
+
+    Las fotos pueden estar asociadas al registro o al objeto de un paso que
+    apunta al registro con un campo ``registro``.
+    """
+    sources = []
+    for registro_model in get_registro_models().values():
+        sources.append((
+            ContentType.objects.get_for_model(registro_model),
+            registro_model.objects.filter(sitio=site),
+            'pk',
+        ))
+        for rel in registro_model._meta.related_objects:
+            paso_model = rel.related_model
+            if rel.field.name != 'registro' or not issubclass(paso_model, PasoBase):
+                continue
+            sources.append((
+                ContentType.objects.get_for_model(paso_model),
+                paso_model.objects.filter(registro__sitio=site),
+                'registro_id',
+            ))
+    return sources
+
+
+def find_similar_photos(site, max_distance=DEFAULT_MAX_DISTANCE):
+    """
+    Busca fotos casi duplicadas entre registros distintos de un sitio.
+
+    Returns:
+        list: ``[{'distance', 'photo_a', 'photo_b', 'registro_a', 'registro_b'}, ...]``
+        ordenada por distancia. ``registro_*`` son tuplas ``(content_type_id, id)``
+        del registro al que pertenece cada foto.
+    """
+    sources = _site_photo_sources(site)
+
+    # Registro al que pertenece cada objeto con fotos (una consulta por modelo)
+    owners = {}
+    q = Q()
+    for content_type, objects, registro_path in sources:
+        model = content_type.model_class()
+        if issubclass(model, RegistroBase):
+            registro_ct = content_type.id
+        else:
+            registro_ct = ContentType.objects.get_for_model(
+                model._meta.get_field('registro').related_model
+            ).id
+        for object_id, registro_id in objects.values_list('pk', registro_path):
+            owners[(content_type.id, object_id)] = (registro_ct, registro_id)
+        q |= Q(content_type=content_type, object_id__in=objects.values('pk'))
+
+    if not owners:
+        return []
+
+    rows = list(
+        Photos.objects.filter(q).exclude(phash='').order_by().values_list(
+            'id', 'content_type_id', 'object_id', 'phash'
+        )
+    )
+    if not rows:
+        return []
+
+    photo_ids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+    values = np.fromiter((int(row[3], 16) for row in rows), dtype=np.uint64, count=len(rows))
+    registros = [owners[(row[1], row[2])] for row in rows]
+    # Código entero por registro para descartar pares del mismo registro
+    codes = {registro: code for code, registro in enumerate(set(registros))}
+    registro_codes = np.fromiter((codes[r] for r in registros), dtype=np.int64, count=len(rows))
+
+    i, j, distances = near_pairs(values, max_distance)
+    other = registro_codes[i] != registro_codes[j]
+    pairs = [
+        {
+            'distance': int(distance),
+            'photo_a': int(photo_ids[a]),
+            'photo_b': int(photo_ids[b]),
+            'registro_a': registros[a],
+            'registro_b': registros[b],
+        }
+        for a, b, distance in zip(i[other], j[other], distances[other])
+    ]
+    pairs.sort(key=lambda pair: (pair['distance'], pair['photo_a'], pair['photo_b']))
+    return pairs
@@ -0,0 +1,256 @@
+import hashlib
+import io
+import json
+import shutil
+import tempfile
+
+import numpy as np
+from django.contrib.contenttypes.models import ContentType
+from django.test import Client, TestCase, override_settings
+from PIL import Image
+
+from core import jobs
+from core.models.sites import Site
+from reg_construccion.models import RegConstruccion
+from users.models import User
+
+from .chunked_upload import ChunkUploadError, append_chunk, complete_upload, start_upload
+from .jobs import MAX_ATTEMPTS, handle_job
+from .models import PhotoJob, Photos
+from .ordering import OrderConflict, get_ordering_version, reorder_photos
+from .similarity import near_pairs
+
+
+def _jpeg(color=(200, 10, 10)):
+    buffer = io.BytesIO()
+    Image.new('RGB', (64, 48), color).save(buffer, 'JPEG')
+    return buffer.getvalue()
+
+
+def _sha256(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+class MediaTestCase(TestCase):
+    """Archivos de MEDIA y temporales en un directorio propio de la prueba."""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        settings_override = override_settings(
+            MEDIA_ROOT=self.media_root,
+            PHOTOS_UPLOAD_TMP_DIR=f'{self.media_root}/uploads',
+            PHOTOS_BACKGROUND_PROCESSING=True,
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='fotos')
+        sitio = Site.objects.create(name='Sitio Fotos', pti_cell_id='PTI-F')
+        cls.registro = RegConstruccion.objects.create(sitio=sitio, user=cls.user, title='Fotos')
+
+
+class ChunkedUploadTests(MediaTestCase):
+    def setUp(self):
+        super().setUp()
+        self.data = _jpeg()
+        self.chunks = [self.data[:100], self.data[100:]]
+        self.session = start_upload(
+            self.user, self.registro, 'imagenes', 'foto.jpg', len(self.data), sha256=_sha256(self.data)
+        )
+
+    def _append(self, index):
+        offset = sum(len(chunk) for chunk in self.chunks[:index])
+        chunk = self.chunks[index]
+        return append_chunk(self.session.pk, offset, chunk, _sha256(chunk))
+
+    def test_reenviar_un_bloque_recibido_no_tiene_efecto(self):
+        self._append(0)
+        session = self._append(0)
+        self.assertEqual(session.received_size, 100)
+
+        self._append(1)
+        photo, created = complete_upload(self.session.pk)
+        self.assertTrue(created)
+        with photo.imagen.open('rb') as f:
+            self.assertEqual(f.read(), self.data)
+
+    def test_offset_inesperado_informa_desde_donde_seguir(self):
+        self._append(0)
+        chunk = self.chunks[1]
+        with self.assertRaises(ChunkUploadError) as error:
+            append_chunk(self.session.pk, 150, chunk, _sha256(chunk))
+        self.assertEqual(error.exception.received_size, 100)
+
+    def test_checksum_del_bloque_incorrecto(self):
+        with self.assertRaises(ChunkUploadError):
+            append_chunk(self.session.pk, 0, self.chunks[0], _sha256(b'otro'))
+        self.session.refresh_from_db()
+        self.assertEqual(self.session.received_size, 0)
+
+    def test_completar_con_bloques_faltantes(self):
+        self._append(0)
+        with self.assertRaises(ChunkUploadError) as error:
+            complete_upload(self.session.pk)
+        self.assertEqual(error.exception.received_size, 100)
+
+    def test_reintentar_completar_devuelve_la_misma_foto(self):
+        self._append(0)
+        self._append(1)
+        photo, created = complete_upload(self.session.pk)
+        again, created_again = complete_upload(self.session.pk)
+
+        self.assertTrue(created)
+        self.assertFalse(created_again)
+        self.assertEqual(again.pk, photo.pk)
+        self.assertEqual(Photos.objects.filter(digest=_sha256(self.data)).count(), 1)
+
+
+class ReorderPhotosTests(MediaTestCase):
+    def setUp(self):
+        super().setUp()
+        content_type = ContentType.objects.get_for_model(self.registro)
+        self.photos = [
+            Photos.objects.create(
+                content_type=content_type, object_id=self.registro.pk, app='reg_construccion',
+                etapa='imagenes', imagen=f'photos/test/{index}.jpg', orden=index,
+            )
+            for index in range(3)
+        ]
+        self.queryset = Photos.objects.filter(pk__in=[photo.pk for photo in self.photos])
+
+    def _orden(self):
+        return list(self.queryset.order_by('orden').values_list('id', flat=True))
+
+    def test_reordenar_con_la_version_actual(self):
+        version = get_ordering_version(self.queryset)
+        nuevo = [self.photos[2].pk, self.photos[0].pk, self.photos[1].pk]
+
+        new_version = reorder_photos(self.queryset, nuevo, version)
+
+        self.assertEqual(self._orden(), nuevo)
+        self.assertEqual(new_version, get_ordering_version(self.queryset))
+        self.assertNotEqual(new_version, version)
+
+    def test_version_desactualizada_se_rechaza(self):
+        version = get_ordering_version(self.queryset)
+        # Otro usuario reordena primero
+        reorder_photos(self.queryset, [self.photos[1].pk, self.photos[0].pk, self.photos[2].pk], version)
+        antes = self._orden()
+
+        with self.assertRaises(OrderConflict) as conflict:
+            reorder_photos(self.queryset, [self.photos[2].pk, self.photos[1].pk, self.photos[0].pk], version)
+
+        self.assertEqual(conflict.exception.version, get_ordering_version(self.queryset))
+        self.assertEqual(self._orden(), antes)
+
+    def test_solo_se_actualizan_las_fotos_que_cambian_de_posicion(self):
+        antes = dict(self.queryset.values_list('id', 'updated_at'))
+
+        reorder_photos(self.queryset, [self.photos[0].pk, self.photos[2].pk, self.photos[1].pk])
+
+        despues = dict(self.queryset.values_list('id', 'updated_at'))
+        self.assertEqual(despues[self.photos[0].pk], antes[self.photos[0].pk])
+        self.assertGreater(despues[self.photos[2].pk], antes[self.photos[2].pk])
+
+
+class BulkPhotosViewTests(MediaTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.user)
+        content_type = ContentType.objects.get_for_model(self.registro)
+        self.photo = Photos.objects.create(
+            content_type=content_type, object_id=self.registro.pk, app='reg_construccion',
+            etapa='sitio', imagen='photos/test/bulk.jpg',
+        )
+        self.url = f'/reg_construccion/{self.registro.pk}/sitio/photos/bulk/'
+
+    def _post(self, data, client=None, **kwargs):
+        kwargs.setdefault('content_type', 'application/json')
+        return (client or self.client).post(self.url, json.dumps(data), **kwargs)
+
+    def test_requiere_token_csrf(self):
+        client = Client(enforce_csrf_checks=True)
+        client.force_login(self.user)
+        response = self._post({'action': 'delete', 'ids': [self.photo.pk]}, client=client)
+        self.assertEqual(response.status_code, 403)
+        self.assertTrue(Photos.objects.filter(pk=self.photo.pk).exists())
+
+    def test_requiere_json(self):
+        response = self._post({'action': 'delete', 'ids': [self.photo.pk]}, content_type='text/plain')
+        self.assertEqual(response.status_code, 415)
+        self.assertTrue(Photos.objects.filter(pk=self.photo.pk).exists())
+
+    def test_usuario_sin_permisos_sobre_el_registro(self):
+        self.client.force_login(User.objects.create(username='otro'))
+        response = self._post({'action': 'delete', 'ids': [self.photo.pk]})
+        self.assertEqual(response.status_code, 403)
+        self.assertTrue(Photos.objects.filter(pk=self.photo.pk).exists())
+
+    def test_no_mueve_a_un_registro_ajeno(self):
+        ajeno = RegConstruccion.objects.create(
+            sitio=self.registro.sitio, user=User.objects.create(username='ajeno'), title='Ajeno'
+        )
+        response = self._post({
+            'action': 'move', 'ids': [self.photo.pk],
+            'target': {'registro_id': ajeno.pk, 'step_name': 'sitio'},
+        })
+        self.assertEqual(response.status_code, 403)
+        self.photo.refresh_from_db()
+        self.assertEqual(self.photo.object_id, self.registro.pk)
+
+    def test_el_dueno_elimina_fotos(self):
+        response = self._post({'action': 'delete', 'ids': [self.photo.pk]})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['deleted'], [self.photo.pk])
+        self.assertFalse(Photos.objects.filter(pk=self.photo.pk).exists())
+
+
+class PhotoJobQueueTests(TestCase):
+    def test_trabajo_terminado(self):
+        job = PhotoJob.objects.create(kind=PhotoJob.KIND_CLEANUP, payload={'files': {}})
+
+        claimed = jobs.claim_next(PhotoJob)
+        self.assertEqual(claimed.pk, job.pk)
+        self.assertIsNone(jobs.claim_next(PhotoJob))
+        self.assertTrue(jobs.run(claimed, handle_job, MAX_ATTEMPTS))
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts, job.error), (PhotoJob.STATUS_DONE, 1, ''))
+
+    def test_reintentos_hasta_fallar(self):
+        job = PhotoJob.objects.create(kind='desconocido')
+
+        for intento in range(1, MAX_ATTEMPTS + 1):
+            PhotoJob.objects.filter(pk=job.pk).update(run_after=job.created_at)
+            claimed = jobs.claim_next(PhotoJob)
+            with self.assertLogs('core.jobs', 'WARNING'):
+                self.assertFalse(jobs.run(claimed, handle_job, MAX_ATTEMPTS))
+            job.refresh_from_db()
+            self.assertEqual(job.attempts, intento)
+
+        self.assertEqual(job.status, PhotoJob.STATUS_FAILED)
+        self.assertIn('Tipo de trabajo desconocido', job.error)
+
+
+class NearPairsTests(TestCase):
+    def test_igual_que_comparar_todos_los_pares(self):
+        rng = np.random.default_rng(7)
+        base = rng.integers(0, 2 ** 63, size=300, dtype=np.uint64)
+        flips = rng.integers(0, 64, size=(300, 6))
+        # Variantes de cada hash a 1..6 bits, más duplicados exactos
+        variants = [base ^ np.bitwise_or.reduce(np.uint64(1) << flips[:, :k].astype(np.uint64), axis=1) for k in (1, 3, 6)]
+        values = np.concatenate([base, *variants, base[:30]])
+        distances = np.bitwise_count(values[:, None] ^ values[None, :])
+
+        for max_distance in (0, 2, 5, 8, 12):
+            i, j, found = near_pairs(values, max_distance)
+            expected = np.argwhere(np.triu(distances <= max_distance, 1))
+            self.assertEqual(sorted(zip(i.tolist(), j.tolist())), sorted(map(tuple, expected.tolist())))
+            self.assertEqual(found.tolist(), distances[i, j].tolist())
+
+    def test_sin_hashes(self):
+        i, j, distances = near_pairs(np.empty(0, dtype=np.uint64), 8)
+        self.assertEqual((len(i), len(j), len(distances)), (0, 0, 0))
@@ -1,5 +1,5 @@
 from django.urls import path, include
-from .views import ListPhotosView, UploadPhotosView, UpdatePhotoView, ReorderPhotosView, DeletePhotoView
+from .views import ListPhotosView, UploadPhotosView, UpdatePhotoView, ReorderPhotosView, DeletePhotoView, BulkPhotosView
 
 app_name = "photos"
 
@@ -9,4 +9,5 @@ urlpatterns = [
     path("update/", UpdatePhotoView.as_view(), name="update"),
     path("reorder/", ReorderPhotosView.as_view(), name="reorder"),
     path("delete/<int:photo_id>/", DeletePhotoView.as_view(), name="delete"),
+    path("bulk/", BulkPhotosView.as_view(), name="bulk"),
 ]
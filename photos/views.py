@@ -1,5 +1,6 @@
 from django.views.generic import ListView
-from django.http import JsonResponse
+from django.http import JsonResponse, StreamingHttpResponse
+from django.contrib.auth.decorators import login_required
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
 from django.views import View
@@ -7,9 +8,18 @@ from django.shortcuts import get_object_or_404
 from core.utils.breadcrumbs import BreadcrumbsMixin
 from django.contrib.contenttypes.models import ContentType
 import json
-from .models import Photos
+from .models import Photos, PhotoUploadMetric
+from .jobs import schedule_photo_processing
+from .dedup import store_photo
+from .metrics import elapsed_ms, record_upload, track_upload_timings
+from .bulk import BulkPhotoError, bulk_delete_photos, bulk_move_photos, delete_photo
+from .ordering import OrderConflict, etapa_photos, get_ordering_version, reorder_photos
+from .export import iter_zip, registro_entries, registro_prefix, site_entries
+from core.models.sites import Site
+from registros import registry
 from django.apps import apps
 from django.http import Http404
+import time
 
 # Diccionario global para almacenar templates personalizados
 PHOTOS_TEMPLATES = {}
@@ -38,54 +48,31 @@ def set_photos_template_for_step(step_name, template_name):
     # Usar un patrón que funcione para cualquier app_name
     PHOTOS_TEMPLATES[f"*_{step_name}"] = template_name
 
-def get_registro_from_id(registro_id):
+def get_registro_from_id(registro_id, app_name=None):
     """
     Función helper para obtener el registro basado en el ID.
-    Intenta encontrar el registro en diferentes aplicaciones.
+
+    Con ``app_name`` (namespace de la aplicación, p. ej. ``reg_construccion``)
+    el modelo se resuelve en el registro de tipos y se hace una sola
+    consulta. Sin él, se prueba cada tipo de registro en orden.
     """
-    # Intentar con reg_txtss
-    try:
-        from reg_txtss.models import RegTxtss
-        return RegTxtss.objects.get(id=registro_id)
-    except:
-        pass
-    
-    # Intentar con reg_construccion
-    try:
-        from reg_construccion.models import RegConstruccion
-        return RegConstruccion.objects.get(id=registro_id)
-    except:
-        pass
-    
-    # Intentar con registros_test (comentado temporalmente)
-    # try:
-    #     from registros_test.models import Registros
-    #     return Registros.objects.get(id=registro_id)
-    # except:
-    #     pass
-    
+    if app_name:
+        return registry.get_registro(app_name, registro_id)
+
+    for namespace in registry.get_registro_models():
+        registro = registry.get_registro(namespace, registro_id)
+        if registro:
+            return registro
     return None
 
 
 def get_app_name_from_registro(registro):
     """
-    Función helper para determinar el app_name basado en el tipo de registro.
+    Función helper para determinar el app_name (namespace) de un registro.
     """
     if not registro:
         return None
-    
-    app_label = registro._meta.app_label
-    
-    # Mapeo de app_label a app_name
-    app_mapping = {
-        'reg_txtss': 'txtss',
-        'registros_txtss': 'txtss',  # Mantener compatibilidad
-        'reg_construccion': 'construccion',
-        'registros_test': 'test',
-        # Agregar más mapeos según sea necesario
-    }
-    
-    return app_mapping.get(app_label)
+    return registry.get_namespace(registro)
 
 
 def get_app_name_from_registro_id(registro_id):
@@ -103,14 +90,17 @@ def get_app_name_from_request(request, registro):
         app_name = resolved_url.kwargs.get('app_name')
         if app_name:
             return app_name
-    
-    # Si no se encuentra en la URL, usar get_reg_app_name del registro
-    if registro and hasattr(registro, 'get_reg_app_name'):
-        return registro.get_reg_app_name()
-    
-    # Si no se puede detectar desde la URL, obtenerlo del registro como fallback
+
+    # Si no se encuentra en la URL, usar el namespace del registro
     return get_app_name_from_registro(registro)
 
+def get_app_name_from_path(request):
+    """Detecta el app_name a partir del primer segmento de la URL (/reg_txtss/...)."""
+    namespace = request.path.strip('/').split('/')[0]
+    if registry.get_registro_model(namespace):
+        return namespace
+    return None
+
 def get_url_params_from_request(request):
     """Obtiene los parámetros de URL desde la request, incluyendo los de la URL padre."""
     resolved_url = request.resolver_match
@@ -120,10 +110,9 @@ def get_url_params_from_request(request):
         
         # Si no tenemos app_name, intentar obtenerlo de la URL padre
         if 'app_name' not in params:
-            if request.path.startswith('/reg_construccion/'):
-                params['app_name'] = 'reg_construccion'
-            elif request.path.startswith('/reg_txtss/'):
-                params['app_name'] = 'reg_txtss'
+            app_name = get_app_name_from_path(request)
+            if app_name:
+                params['app_name'] = app_name
         
         return params
     
@@ -153,22 +142,13 @@ def get_params_from_request(request, **kwargs):
     if not step_name:
         step_name = paso_nombre
     
-    # Si no tenemos app_name, obtenerlo del registro usando get_reg_app_name
-    if not app_name and registro_id:
-        try:
-            # Intentar obtener el registro y usar get_reg_app_name
-            registro = get_registro_from_id(registro_id)
-            if registro and hasattr(registro, 'get_reg_app_name'):
-                app_name = registro.get_reg_app_name()
-        except Exception:
-            pass
-    
-    # Si aún no tenemos app_name, detectarlo desde la URL como fallback
+    # Si no tenemos app_name, detectarlo desde la URL
     if not app_name:
-        if request.path.startswith('/reg_construccion/'):
-            app_name = 'reg_construccion'
-        elif request.path.startswith('/reg_txtss/'):
-            app_name = 'reg_txtss'
+        app_name = get_app_name_from_path(request)
+
+    # Como último recurso, obtenerlo del registro
+    if not app_name and registro_id:
+        app_name = get_app_name_from_registro(get_registro_from_id(registro_id))
     
     return {
         'registro_id': registro_id,
@@ -207,8 +187,8 @@ class ListPhotosView(BreadcrumbsMixin, ListView):
         # Si no hay template personalizado, usar el por defecto
         return [self.template_name]
 
-    def get_queryset(self):
-        # Obtener parámetros desde la request
+    def _get_url_params(self):
+        """Obtiene registro_id, app_name y step_name desde la URL."""
         params = get_url_params_from_request(self.request)
         app_name = params.get('app_name') or self.kwargs.get('app_name')
         step_name = params.get('step_name') or self.kwargs.get('step_name')
@@ -221,31 +201,28 @@ class ListPhotosView(BreadcrumbsMixin, ListView):
                 registro_id = resolved_url.kwargs.get('registro_id')
                 paso_nombre = resolved_url.kwargs.get('paso_nombre')
 
-        # Determinar app_name dinámicamente si no está
-        if not app_name:
-            # Intentar obtener el registro y usar get_reg_app_name
-            try:
-                registro = get_registro_from_id(registro_id)
-                if registro and hasattr(registro, 'get_reg_app_name'):
-                    app_name = registro.get_reg_app_name()
-                else:
-                    app_name = get_app_name_from_registro_id(registro_id)
-            except Exception:
-                app_name = get_app_name_from_registro_id(registro_id)
-            
-            if not app_name:
-                raise Http404("No se pudo determinar la aplicación")
-
-        # Determinar step_name dinámicamente si no está
         if not step_name:
             step_name = paso_nombre
-        if not step_name:
-            raise Http404("No se pudo determinar la etapa")
+        return registro_id, app_name, step_name
+
+    def get_registro(self):
+        """Obtiene el registro una sola vez por request."""
+        if not hasattr(self, '_registro'):
+            registro_id, app_name, _step_name = self._get_url_params()
+            self._registro = get_registro_from_id(registro_id, app_name) if registro_id else None
+        return self._registro
+
+    def get_queryset(self):
+        registro_id, app_name, step_name = self._get_url_params()
 
-        registro = get_registro_from_id(registro_id)
+        registro = self.get_registro()
         if not registro:
             raise Http404("Registro no encontrado")
 
+        # Determinar step_name dinámicamente si no está
+        if not step_name:
+            raise Http404("No se pudo determinar la etapa")
+
         if step_name == 'sitio':
             model_class = type(registro)
             object_id = registro.id
@@ -275,6 +252,9 @@ class ListPhotosView(BreadcrumbsMixin, ListView):
             # porque las fotos están asociadas al objeto de la etapa específica
             return Photos.objects.none()
 
+        # Alcance usado para la versión del orden (ver ReorderPhotosView)
+        self._orden_scope = etapa_photos(registro, model_class, object_id, etapa)
+
         # Buscar fotos asociadas al modelo específico de la etapa
         queryset = Photos.objects.filter(
             app=registro._meta.app_label,
@@ -311,14 +291,14 @@ class ListPhotosView(BreadcrumbsMixin, ListView):
         ]
         registro_id = self.kwargs.get('registro_id')
         if registro_id:
-            registro = get_registro_from_id(registro_id)
+            registro = self.get_registro()
             if registro:
                 try:
                     sitio_cod = registro.sitio.pti_cell_id
                 except Exception:
                     sitio_cod = getattr(registro.sitio, 'operator_id', 'Sitio')
-                app_namespace = registro._meta.app_label  # namespace real
-                app_label = get_app_name_from_registro(registro) or app_namespace
+                app_namespace = get_app_name_from_registro(registro)
+                app_label = app_namespace.replace('reg_', '', 1)
                 breadcrumbs.append({'label': app_label.upper() if app_label else 'Registro', 'url_name': f'{app_namespace}:list'})
                 breadcrumbs.append({
                     'label': sitio_cod,
@@ -334,42 +314,22 @@ class ListPhotosView(BreadcrumbsMixin, ListView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        # Obtener parámetros desde la request
-        params = get_url_params_from_request(self.request)
-        app_name = params.get('app_name') or self.kwargs.get('app_name')
-        step_name = params.get('step_name') or self.kwargs.get('step_name')
-        paso_nombre = params.get('paso_nombre') or self.kwargs.get('paso_nombre')
-        registro_id = params.get('registro_id') or self.kwargs.get('registro_id')
-        
-        if not registro_id:
-            resolved_url = self.request.resolver_match
-            if resolved_url and hasattr(resolved_url, 'kwargs'):
-                registro_id = resolved_url.kwargs.get('registro_id')
-                paso_nombre = resolved_url.kwargs.get('paso_nombre')
+        registro_id, app_name, step_name = self._get_url_params()
         context['registro_id'] = registro_id
+        registro = self.get_registro()
         if not app_name:
-            # Intentar obtener el registro y usar get_reg_app_name
-            try:
-                registro = get_registro_from_id(registro_id)
-                if registro and hasattr(registro, 'get_reg_app_name'):
-                    app_name = registro.get_reg_app_name()
-                else:
-                    app_name = get_app_name_from_registro_id(registro_id)
-            except Exception:
-                app_name = get_app_name_from_registro_id(registro_id)
-            
+            app_name = get_app_name_from_registro(registro)
             if not app_name:
                 raise Http404("No se pudo determinar la aplicación")
-        if not step_name:
-            step_name = paso_nombre
         context['app_name'] = app_name
         context['step_name'] = step_name
+        orden_scope = getattr(self, '_orden_scope', None)
+        context['orden_version'] = get_ordering_version(orden_scope) if orden_scope is not None else ''
         title = self.kwargs.get('title')
         if not title:
             title = step_name or 'sitio'
         context['title'] = title
         if registro_id:
-            registro = get_registro_from_id(registro_id)
             if registro:
                 context['registro_txtss'] = registro
                 context['sitio'] = registro.sitio
@@ -396,8 +356,10 @@ class UploadPhotosView(View):
                 paso_nombre = resolved_url.kwargs.get('paso_nombre')
         if not step_name:
             step_name = paso_nombre
+        # Debe agregarse antes de leer request.FILES
+        upload_timer = track_upload_timings(request)
         try:
-            registro = get_registro_from_id(registro_id)
+            registro = get_registro_from_id(registro_id, app_name)
             if not registro:
                 return JsonResponse({
                     'success': False,
@@ -441,19 +403,31 @@ class UploadPhotosView(View):
             if not app_name:
                 app_name = get_app_name_from_request(request, registro)
             photos_creadas = []
-            for file in files:
+            for index, file in enumerate(files):
                 if file.content_type.startswith('image/'):
-                    photo = Photos.objects.create(
-                        imagen=file,
-                        descripcion=descripcion,
-                        app=registro._meta.app_label,  # Usar el app_label real del registro
+                    # Una imagen repetida (mismo contenido) devuelve la foto existente
+                    start = time.perf_counter()
+                    photo, created = store_photo(
+                        file,
                         content_type=content_type,
                         object_id=object_id,
-                        etapa=step_name
+                        app=registro._meta.app_label,  # Usar el app_label real del registro
+                        etapa=step_name,
+                        descripcion=descripcion
+                    )
+                    record_upload(
+                        photo, created, PhotoUploadMetric.SOURCE_WEB, registro, file.size,
+                        receive_ms=upload_timer.receive_ms('photos', index),
+                        storage_ms=elapsed_ms(start),
                     )
+                    if created and photo.processing_state != Photos.PROCESSING_READY:
+                        schedule_photo_processing(photo)
                     photos_creadas.append({
                         'id': photo.id,
-                        'url': photo.imagen.url,
+                        'url': photo.image_url,
+                        'thumbnail_url': photo.thumbnail_url,
+                        'processing_state': photo.processing_state,
+                        'duplicada': not created,
                         'descripcion': photo.descripcion,
                         'created_at': photo.created_at.strftime('%d/%m/%Y %H:%M')
                     })
@@ -465,6 +439,9 @@ class UploadPhotosView(View):
             return JsonResponse({
                 'success': True,
                 'photos': photos_creadas,
+                'version': get_ordering_version(
+                    etapa_photos(registro, model_class, object_id, step_name)
+                ),
                 'message': f'Se subieron {len(photos_creadas)} fotos correctamente'
             })
         except Exception as e:
@@ -490,7 +467,7 @@ class UpdatePhotoView(View):
             data = json.loads(request.body)
             photo_id = data.get('photo_id')
             descripcion = data.get('descripcion', '')
-            registro = get_registro_from_id(registro_id)
+            registro = get_registro_from_id(registro_id, app_name)
             if not registro:
                 return JsonResponse({'success': False, 'message': 'Registro no encontrado'}, status=404)
             if not app_name:
@@ -544,7 +521,7 @@ class ReorderPhotosView(View):
         try:
             data = json.loads(request.body)
             orden = data.get('orden', [])
-            registro = get_registro_from_id(registro_id)
+            registro = get_registro_from_id(registro_id, app_name)
             if not registro:
                 return JsonResponse({'success': False, 'message': 'Registro no encontrado'}, status=404)
             if not app_name:
@@ -567,17 +544,16 @@ class ReorderPhotosView(View):
                     model_class = type(registro)
                     etapa = step_name
                     object_id = registro.id
-            from django.contrib.contenttypes.models import ContentType
-            content_type = ContentType.objects.get_for_model(model_class)
-            for index, photo_id in enumerate(orden):
-                # Intentar actualizar en el modelo específico de la etapa
-                updated = Photos.objects.filter(id=photo_id, app=registro._meta.app_label, object_id=object_id, etapa=etapa).update(orden=index)
-                
-                # Si no se actualizó, intentar en el registro principal (compatibilidad con fotos existentes)
-                if updated == 0 and step_name != 'sitio':
-                    registro_content_type = ContentType.objects.get_for_model(type(registro))
-                    Photos.objects.filter(id=photo_id, app=registro._meta.app_label, object_id=registro.id, etapa=etapa, content_type=registro_content_type).update(orden=index)
-            return JsonResponse({'success': True, 'message': 'Orden actualizado correctamente'})
+            # Un solo UPDATE con CASE para toda la etapa
+            try:
+                version = reorder_photos(
+                    etapa_photos(registro, model_class, object_id, etapa),
+                    orden,
+                    data.get('version')
+                )
+            except OrderConflict as e:
+                return JsonResponse({'success': False, 'message': str(e), 'version': e.version}, status=409)
+            return JsonResponse({'success': True, 'message': 'Orden actualizado correctamente', 'version': version})
         except Exception as e:
             return JsonResponse({'success': False, 'message': f'Error al reordenar: {str(e)}'}, status=400)
 
@@ -592,16 +568,12 @@ class DeletePhotoView(View):
                 paso_nombre = resolved_url.kwargs.get('paso_nombre')
         if not step_name:
             step_name = paso_nombre
-        if not app_name:
-            registro = get_registro_from_id(registro_id)
-            if registro:
-                app_name = get_app_name_from_registro(registro)
-            if not app_name:
-                app_name = None
         try:
-            registro = get_registro_from_id(registro_id)
+            registro = get_registro_from_id(registro_id, app_name)
             if not registro:
                 return JsonResponse({'success': False, 'message': 'Registro no encontrado'}, status=404)
+            if not app_name:
+                app_name = get_app_name_from_registro(registro)
             if step_name == 'sitio':
                 model_class = type(registro)
                 etapa = 'sitio'
@@ -634,9 +606,154 @@ class DeletePhotoView(View):
                         return JsonResponse({'success': False, 'message': 'Foto no encontrada'}, status=404)
                 else:
                     return JsonResponse({'success': False, 'message': 'Foto no encontrada'}, status=404)
-            photo.delete()
-            return JsonResponse({'success': True, 'message': 'Foto eliminada correctamente'})
+            delete_photo(photo)
+            return JsonResponse({
+                'success': True,
+                'message': 'Foto eliminada correctamente',
+                'version': get_ordering_version(etapa_photos(registro, model_class, object_id, etapa))
+            })
         except Exception as e:
             return JsonResponse({'success': False, 'message': f'Error al eliminar: {str(e)}'}, status=400)
 
 
+def resolve_etapa(registro, step_name):
+    """
+    Modelo, objeto y nombre de etapa al que se asocian las fotos de un paso.
+
+    Returns:
+        tuple: ``(model_class, object_id, etapa)`` o None si el paso tiene
+        modelo propio y su registro aún no existe.
+    """
+    if step_name == 'sitio':
+        return type(registro), registro.id, 'sitio'
+    try:
+        model_class = apps.get_model(registro._meta.app_label, f"R{step_name.capitalize()}")
+    except LookupError:
+        # Pasos sin modelo propio: las fotos se asocian al registro principal
+        return type(registro), registro.id, step_name
+    etapa_obj = model_class.objects.filter(registro_id=registro.id).only('id').first()
+    if etapa_obj is None:
+        return None
+    return model_class, etapa_obj.id, model_class.get_etapa()
+
+
+def can_edit_registro(user, registro):
+    """
+    Indica si el usuario puede modificar las fotos del registro: su dueño,
+    el personal (staff) o quien tenga el permiso ``change`` del modelo.
+    """
+    if user.is_superuser or user.is_staff:
+        return True
+    if getattr(registro, 'user_id', None) == user.id:
+        return True
+    return user.has_perm(f'{registro._meta.app_label}.change_{registro._meta.model_name}')
+
+
+class BulkPhotosView(View):
+    """
+    Elimina o mueve varias fotos de una etapa en una sola petición.
+
+    Cuerpo JSON:
+        ``{"action": "delete", "ids": [1, 2]}``
+        ``{"action": "move", "ids": [1, 2], "target": {"registro_id": 5, "step_name": "acceso"}}``
+
+    El registro y la etapa se resuelven una sola vez; solo se consideran
+    las fotos de la etapa de origen. Requiere el token CSRF (cabecera
+    ``X-CSRFToken``) y permiso de edición sobre el registro de origen y el
+    de destino.
+    """
+
+    def post(self, request, registro_id=None, paso_nombre=None, app_name=None, step_name=None):
+        if not request.user.is_authenticated:
+            return JsonResponse({'success': False, 'message': 'Debes iniciar sesión'}, status=403)
+        if request.content_type != 'application/json':
+            return JsonResponse({'success': False, 'message': 'Se espera application/json'}, status=415)
+        params = get_params_from_request(request, registro_id=registro_id, paso_nombre=paso_nombre, app_name=app_name, step_name=step_name)
+        try:
+            data = json.loads(request.body)
+        except ValueError:
+            return JsonResponse({'success': False, 'message': 'JSON inválido'}, status=400)
+        if not isinstance(data, dict):
+            return JsonResponse({'success': False, 'message': 'JSON inválido'}, status=400)
+
+        registro = get_registro_from_id(params['registro_id'], params['app_name'])
+        if not registro:
+            return JsonResponse({'success': False, 'message': 'Registro no encontrado'}, status=404)
+        if not can_edit_registro(request.user, registro):
+            return JsonResponse({'success': False, 'message': 'No tienes permisos para modificar este registro'}, status=403)
+        origen = resolve_etapa(registro, params['step_name'])
+        if origen is None:
+            return JsonResponse({'success': False, 'message': 'Etapa no encontrada'}, status=404)
+        model_class, object_id, etapa = origen
+        queryset = etapa_photos(registro, model_class, object_id, etapa)
+
+        action = data.get('action')
+        try:
+            if action == 'delete':
+                result = {'deleted': bulk_delete_photos(queryset, data.get('ids'))}
+                message = f"Se eliminaron {len(result['deleted'])} fotos"
+            elif action == 'move':
+                target = data.get('target') or {}
+                destino_registro = registro
+                if target.get('registro_id') and str(target['registro_id']) != str(registro.id):
+                    # El destino debe ser un registro del mismo tipo
+                    destino_registro = type(registro).objects.filter(pk=target['registro_id']).first()
+                if destino_registro is None:
+                    return JsonResponse({'success': False, 'message': 'Registro destino no encontrado'}, status=404)
+                if not can_edit_registro(request.user, destino_registro):
+                    return JsonResponse({'success': False, 'message': 'No tienes permisos para modificar el registro destino'}, status=403)
+                destino = resolve_etapa(destino_registro, target.get('step_name') or params['step_name'])
+                if destino is None:
+                    return JsonResponse({'success': False, 'message': 'Etapa destino no encontrada'}, status=404)
+                destino_model, destino_id, destino_etapa = destino
+                result = bulk_move_photos(
+                    queryset,
+                    data.get('ids'),
+                    ContentType.objects.get_for_model(destino_model),
+                    destino_id,
+                    destino_etapa,
+                )
+                message = f"Se movieron {len(result['moved'])} fotos"
+                if result['skipped']:
+                    message += f" ({len(result['skipped'])} ya existían en el destino)"
+            else:
+                return JsonResponse({'success': False, 'message': 'Acción no válida'}, status=400)
+        except BulkPhotoError as e:
+            return JsonResponse({'success': False, 'message': str(e)}, status=400)
+
+        return JsonResponse({
+            'success': True,
+            'message': message,
+            'version': get_ordering_version(queryset),
+            **result,
+        })
+
+
+def _zip_response(entries, filename):
+    """Respuesta que envía el ZIP a medida que se genera."""
+    response = StreamingHttpResponse(iter_zip(entries), content_type='application/zip')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+@login_required
+def download_registro_photos_zip(request, app_label, registro_id):
+    """
+    Descarga en un ZIP todas las fotos de un registro.
+    Con ``?etapa=<nombre>`` se limita a las fotos de esa etapa.
+    """
+    registro = registry.get_registro(app_label, registro_id)
+    if registro is None:
+        raise Http404("Registro no encontrado")
+    etapa = request.GET.get('etapa') or None
+
+    codigo = registro_prefix(registro)
+    filename = f"{codigo}_{registro.fecha:%Y-%m-%d}{'_' + etapa if etapa else ''}.zip"
+    return _zip_response(registro_entries(registro, etapa), filename)
+
+
+@login_required
+def download_site_photos_zip(request, site_id):
+    """Descarga en un ZIP las fotos de todos los registros de un sitio."""
+    site = get_object_or_404(Site, id=site_id)
+    return _zip_response(site_entries(site), f"{site.pti_cell_id or site.name}_fotos.zip")
@@ -2,7 +2,8 @@
 Admin configuration for registros Reporte de construcción.
 """
 
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.conf import settings
 from django.utils.html import format_html
 from django.urls import reverse
 from django.utils.safestring import mark_safe
@@ -87,6 +88,48 @@ class RegConstruccionAdmin(admin.ModelAdmin):
 
     actions_links.short_description = 'Acciones'
 
+    actions = ['exportar_pdfs', 'exportar_pdfs_por_sitio']
+
+    def _exportar_pdfs(self, request, queryset, merge_by_site):
+        """
+        Encola la exportación en el worker de PDF: generar un lote dentro del
+        request supera el timeout de gunicorn.
+        """
+        from pdf_reports.jobs import enqueue_export_job
+
+        registro_ids = list(queryset.values_list('pk', flat=True))
+        if len(registro_ids) > settings.PDF_EXPORT_MAX_REGISTROS:
+            self.message_user(
+                request,
+                f"Se pueden exportar hasta {settings.PDF_EXPORT_MAX_REGISTROS} registros a la vez "
+                f"({len(registro_ids)} seleccionados). Para lotes mayores use 'manage.py export_reports'.",
+                level=messages.ERROR,
+            )
+            return None
+        job = enqueue_export_job(
+            'reg_construccion', registro_ids, merge_by_site=merge_by_site, user=request.user
+        )
+        self.message_user(
+            request,
+            format_html(
+                'Exportación de {} registros encolada. <a href="{}">Ver estado</a> · '
+                '<a href="{}">Descargar ZIP</a> (disponible al terminar).',
+                len(registro_ids),
+                reverse('pdf_reports:pdf_job_status', args=[job.id]),
+                reverse('pdf_reports:pdf_job_download', args=[job.id]),
+            ),
+            level=messages.SUCCESS,
+        )
+        return None
+
+    def exportar_pdfs(self, request, queryset):
+        return self._exportar_pdfs(request, queryset, merge_by_site=False)
+    exportar_pdfs.short_description = "Exportar PDF de los registros seleccionados (ZIP)"
+
+    def exportar_pdfs_por_sitio(self, request, queryset):
+        return self._exportar_pdfs(request, queryset, merge_by_site=True)
+    exportar_pdfs_por_sitio.short_description = "Exportar un PDF combinado por sitio (ZIP)"
+
     def get_queryset(self, request):
         return super().get_queryset(request).select_related('sitio', 'estructura', 'user')
 
@@ -0,0 +1,334 @@
+"""
+Cálculo del avance por componente de los registros de construcción.
+
+Es la única implementación de la tabla de ejecución (anterior, actual,
+acumulada y total ponderada por ``ComponenteGrupo.incidencia``) que usan el
+reporte PDF y las vistas de pasos.
+
+Para cada componente de la estructura se toma el ``AvanceComponente`` más
+reciente del registro:
+
+- ``ejec_actual``: ``porcentaje_actual`` del avance.
+- ``ejec_anterior``: ``porcentaje_acumulado - porcentaje_actual`` (mínimo 0).
+- ``ejec_acumulada``: ``ejec_anterior + ejec_actual``.
+- ``ejecucion_total``: ``incidencia / 100 * ejec_acumulada``.
+
+Los avances de todos los registros se leen en una sola consulta y los
+porcentajes se calculan como arreglos de NumPy. Los resultados son números
+(``int`` / ``float``); el formato (decimales, ``%``) queda en las plantillas.
+"""
+
+import logging
+
+import numpy as np
+
+from proyectos.models import ComponenteGrupo
+
+from .models import AvanceComponente, EjecucionPorcentajes, RegConstruccion
+
+logger = logging.getLogger(__name__)
+
+# Columnas de la consulta de avances
+_REGISTRO, _COMPONENTE, _ACTUAL, _ACUMULADO = range(4)
+
+
+def _empty_totals():
+    return {'ejec_anterior': 0.0, 'ejec_actual': 0.0, 'ejec_acumulada': 0.0, 'ejecucion_total': 0.0}
+
+
+def _avances_queryset(registros):
+    """Avances ordenados por registro, componente y fecha (el más reciente primero)."""
+    return AvanceComponente.objects.filter(registro_id__in=registros).order_by(
+        'registro_id', 'componente_id', '-fecha', '-created_at', '-id'
+    )
+
+
+def _fetch_avances(registro_ids):
+    """
+    Avances de los registros con los nombres de los componentes.
+
+    Returns:
+        tuple: ``(matriz de enteros, nombres de los componentes)``
+    """
+    rows = list(_avances_queryset(registro_ids).values_list(
+        'registro_id', 'componente_id', 'porcentaje_actual', 'porcentaje_acumulado', 'componente__nombre'
+    ))
+    nombres = {row[1]: row[4] for row in rows}
+    values = np.array([row[:4] for row in rows], dtype=np.int64).reshape(-1, 4)
+    return values, nombres
+
+
+def _latest(values):
+    """Filas del avance más reciente de cada par (registro, componente)."""
+    if not len(values):
+        return values
+    first = np.ones(len(values), dtype=bool)
+    first[1:] = (
+        (values[1:, _REGISTRO] != values[:-1, _REGISTRO])
+        | (values[1:, _COMPONENTE] != values[:-1, _COMPONENTE])
+    )
+    return values[first]
+
+
+def _block(values, registro_id):
+    """Filas de un registro (la matriz está ordenada por registro)."""
+    start, end = np.searchsorted(values[:, _REGISTRO], [registro_id, registro_id + 1])
+    return values[start:end]
+
+
+def _avance_estructura(latest, componentes):
+    """
+    Tabla de un registro con estructura.
+
+    Args:
+        latest: Avances más recientes del registro, ordenados por componente
+        componentes: Filas ``(componente_id, nombre, incidencia)`` de la estructura
+    """
+    if not componentes:
+        return {'estructura': True, 'rows': [], 'totals': _empty_totals()}
+
+    ids = np.array([row[0] for row in componentes], dtype=np.int64)
+    incidencia = np.array([float(row[2]) for row in componentes], dtype=float)
+
+    actual = np.zeros(len(ids), dtype=np.int64)
+    acumulado = np.zeros(len(ids), dtype=np.int64)
+    if len(latest):
+        pos = np.searchsorted(latest[:, _COMPONENTE], ids)
+        pos = np.minimum(pos, len(latest) - 1)
+        found = latest[pos, _COMPONENTE] == ids
+        actual = np.where(found, latest[pos, _ACTUAL], 0)
+        acumulado = np.where(found, latest[pos, _ACUMULADO], 0)
+
+    anterior = np.maximum(acumulado - actual, 0)
+    acumulada = anterior + actual
+    total = incidencia / 100 * acumulada
+
+    rows = [
+        {
+            'componente': nombre,
+            'componente_id': componente_id,
+            'incidencia': inc,
+            'ejec_anterior': ant,
+            'ejec_actual': act,
+            'ejec_acumulada': acum,
+            'ejecucion_total': tot,
+        }
+        for (componente_id, nombre, _incidencia), inc, ant, act, acum, tot in zip(
+            componentes, incidencia.tolist(), anterior.tolist(), actual.tolist(),
+            acumulada.tolist(), total.tolist(),
+        )
+    ]
+    totals = {
+        'ejec_anterior': float(anterior.sum()),
+        'ejec_actual': float(actual.sum()),
+        'ejec_acumulada': float(acumulada.sum()),
+        'ejecucion_total': float(total.sum()),
+    }
+    return {'estructura': True, 'rows': rows, 'totals': totals}
+
+
+def _avance_sin_estructura(block, nombres):
+    """
+    Tabla de un registro sin estructura: todos sus avances, sin incidencia
+    ni ejecución total.
+    """
+    rows = [
+        {
+            'componente': nombres[componente_id],
+            'componente_id': componente_id,
+            'incidencia': None,
+            'ejec_anterior': max(acumulado - actual, 0),
+            'ejec_actual': actual,
+            'ejec_acumulada': acumulado,
+            'ejecucion_total': None,
+        }
+        for _registro_id, componente_id, actual, acumulado in block.tolist()
+    ]
+    # Orden estable: dentro de cada componente se mantiene el más reciente primero
+    rows.sort(key=lambda row: row['componente'])
+    return {'estructura': False, 'rows': rows, 'totals': None}
+
+
+def avance_por_componente(registros):
+    """
+    Calcula la tabla de avance por componente de varios registros.
+
+    Args:
+        registros: ``RegConstruccion`` (lista o queryset)
+
+    Returns:
+        dict: ``{registro_id: {'estructura', 'rows', 'totals'}}``. Cada fila
+        tiene ``componente``, ``componente_id``, ``incidencia``,
+        ``ejec_anterior``, ``ejec_actual``, ``ejec_acumulada`` y
+        ``ejecucion_total``. Sin estructura, ``incidencia``,
+        ``ejecucion_total`` y ``totals`` son None.
+    """
+    registros = list(registros)
+    if not registros:
+        return {}
+
+    values, nombres = _fetch_avances([registro.pk for registro in registros])
+    latest = _latest(values)
+
+    estructuras = {}
+    estructura_ids = {registro.estructura_id for registro in registros if registro.estructura_id}
+    componentes = (
+        ComponenteGrupo.objects.filter(grupo_id__in=estructura_ids)
+        .order_by('grupo_id', 'orden', 'id')
+        .values_list('grupo_id', 'componente_id', 'componente__nombre', 'incidencia')
+    )
+    for grupo_id, componente_id, nombre, incidencia in componentes:
+        estructuras.setdefault(grupo_id, []).append((componente_id, nombre, incidencia))
+
+    result = {}
+    for registro in registros:
+        if registro.estructura_id:
+            result[registro.pk] = _avance_estructura(
+                _block(latest, registro.pk), estructuras.get(registro.estructura_id, [])
+            )
+        else:
+            result[registro.pk] = _avance_sin_estructura(_block(values, registro.pk), nombres)
+    return result
+
+
+def avance_registro(registro):
+    """Tabla de avance por componente de un registro."""
+    return avance_por_componente([registro])[registro.pk]
+
+
+def avance_ponderado(registros):
+    """
+    Avance físico ponderado (``Σ incidencia / 100 × ejec_acumulada``) de
+    muchos registros, sin recorrerlos uno por uno.
+
+    Se hacen tres consultas (los registros, sus avances y las incidencias de
+    sus estructuras) y el cruce se resuelve con NumPy.
+
+    Args:
+        registros: Queryset de ``RegConstruccion``
+
+    Returns:
+        dict: ``{registro_id: avance}``; None para registros sin estructura
+    """
+    snapshot = np.array(
+        list(registros.order_by('pk').values_list('pk', 'estructura_id')), dtype=float
+    ).reshape(-1, 2)
+    if not len(snapshot):
+        return {}
+    registro_ids = snapshot[:, 0].astype(np.int64)
+    has_estructura = ~np.isnan(snapshot[:, 1])
+    estructura_ids = np.nan_to_num(snapshot[:, 1]).astype(np.int64)
+
+    latest = _latest(np.array(
+        list(_avances_queryset(registros.values('pk')).values_list(
+            'registro_id', 'componente_id', 'porcentaje_actual', 'porcentaje_acumulado'
+        )),
+        dtype=np.int64,
+    ).reshape(-1, 4))
+
+    # Incidencia de cada (estructura, componente), con clave entera única
+    incidencias = np.array(
+        list(ComponenteGrupo.objects.filter(
+            grupo_id__in=np.unique(estructura_ids[has_estructura]).tolist()
+        ).values_list('grupo_id', 'componente_id', 'incidencia')),
+        dtype=float,
+    ).reshape(-1, 3)
+    claves = (incidencias[:, 0].astype(np.int64) << 32) | incidencias[:, 1].astype(np.int64)
+    orden = np.argsort(claves)
+    claves, incidencia = claves[orden], incidencias[orden, 2]
+
+    totales = np.zeros(len(registro_ids))
+    if len(latest) and len(claves):
+        fila = np.searchsorted(registro_ids, latest[:, _REGISTRO])
+        clave = (estructura_ids[fila] << 32) | latest[:, _COMPONENTE]
+        pos = np.minimum(np.searchsorted(claves, clave), len(claves) - 1)
+        found = (claves[pos] == clave) & has_estructura[fila]
+
+        actual = latest[:, _ACTUAL]
+        acumulada = np.maximum(latest[:, _ACUMULADO] - actual, 0) + actual
+        aporte = np.where(found, incidencia[pos] / 100 * acumulada, 0.0)
+        totales = np.bincount(fila, weights=aporte, minlength=len(registro_ids))
+
+    return {
+        registro_id: (total if estructura else None)
+        for registro_id, total, estructura in zip(
+            registro_ids.tolist(), totales.tolist(), has_estructura.tolist()
+        )
+    }
+
+
+def avance_por_sitio(registros):
+    """
+    Avance ponderado de cada sitio, según su registro más reciente.
+
+    Args:
+        registros: Queryset de ``RegConstruccion`` (ya filtrado)
+
+    Returns:
+        list: Una fila por sitio con los datos del sitio, del registro y su
+        ``avance`` (None si el registro no tiene estructura)
+    """
+    rows = list(
+        registros.filter(sitio__isnull=False)
+        .order_by('sitio_id', '-fecha', '-pk')
+        .values(
+            'pk', 'sitio_id', 'sitio__name', 'sitio__pti_cell_id', 'sitio__region',
+            'contratista__name', 'estructura__nombre', 'estado', 'fecha',
+        )
+    )
+    if not rows:
+        return []
+    sitios = np.array([row['sitio_id'] for row in rows], dtype=np.int64)
+    first = np.ones(len(sitios), dtype=bool)
+    first[1:] = sitios[1:] != sitios[:-1]
+    latest = [rows[index] for index in np.flatnonzero(first).tolist()]
+
+    avances = avance_ponderado(
+        RegConstruccion.objects.filter(pk__in=[row['pk'] for row in latest])
+    )
+    return [
+        {
+            'sitio_id': row['sitio_id'],
+            'sitio': row['sitio__name'],
+            'pti_cell_id': row['sitio__pti_cell_id'],
+            'region': row['sitio__region'],
+            'contratista': row['contratista__name'],
+            'estructura': row['estructura__nombre'],
+            'registro_id': row['pk'],
+            'fecha': row['fecha'],
+            'estado': row['estado'],
+            'avance': avances.get(row['pk']),
+        }
+        for row in latest
+    ]
+
+
+def guardar_ejecucion_porcentajes(registro, avance):
+    """
+    Guarda en ``EjecucionPorcentajes`` los porcentajes calculados de un
+    registro. Solo se escriben los componentes cuyo valor cambió.
+    """
+    if not avance['estructura']:
+        return
+    guardados = {
+        componente_id: (float(actual), float(anterior))
+        for componente_id, actual, anterior in EjecucionPorcentajes.objects.filter(
+            registro=registro
+        ).values_list('componente_id', 'porcentaje_ejec_actual', 'porcentaje_ejec_anterior')
+    }
+    for row in avance['rows']:
+        valores = (float(row['ejec_actual']), float(row['ejec_anterior']))
+        if guardados.get(row['componente_id']) == valores:
+            continue
+        try:
+            EjecucionPorcentajes.objects.update_or_create(
+                registro=registro,
+                componente_id=row['componente_id'],
+                defaults={
+                    'porcentaje_ejec_actual': row['ejec_actual'],
+                    'porcentaje_ejec_anterior': row['ejec_anterior'],
+                }
+            )
+        except Exception as e:
+            # Si hay algún error al guardar, continuar sin interrumpir
+            logger.warning("Error al guardar porcentajes para componente %s: %s", row['componente'], e)
@@ -10,9 +10,14 @@ from .mobile_api_views import (
     llenar_avance,
     llenar_tabla,
     subir_imagenes,
+    iniciar_subida_imagen,
+    subida_imagen_parte,
+    completar_subida_imagen,
     obtener_imagenes,
+    listar_imagenes,
     editar_imagen,
     eliminar_imagen,
+    imagenes_lote,
     obtener_registro_completo,
     login,
     fechas_por_usuario,
@@ -42,11 +47,18 @@ urlpatterns = [
 
     path('subir-imagenes/', subir_imagenes, name='subir_imagenes'),
 
+    # Subida reanudable por partes
+    path('subir-imagen/iniciar/', iniciar_subida_imagen, name='iniciar_subida_imagen'),
+    path('subir-imagen/<uuid:upload_id>/', subida_imagen_parte, name='subida_imagen_parte'),
+    path('subir-imagen/<uuid:upload_id>/completar/', completar_subida_imagen, name='completar_subida_imagen'),
+
     path("editar-imagen/<int:imagen_id>/", editar_imagen, name="editar_imagen"),
 
     path("eliminar-imagen/<int:imagen_id>/", eliminar_imagen, name="eliminar_imagen"),
+    path("imagenes/lote/", imagenes_lote, name="imagenes_lote"),
 
     path('obtener-imagenes/<int:registro_id>/', obtener_imagenes, name='obtener_imagenes'),
+    path('imagenes/<int:registro_id>/', listar_imagenes, name='listar_imagenes'),
 
     path('registro-completo/<int:registro_id>/',
          obtener_registro_completo, name='registro_completo'),
@@ -4,10 +4,13 @@ Vistas específicas de la API para la aplicación móvil.
 
 from rest_framework import status, settings
 from rest_framework.decorators import api_view, permission_classes
+from rest_framework.pagination import CursorPagination
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.response import Response
 from django.shortcuts import get_object_or_404
 from django.contrib.contenttypes.models import ContentType
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from datetime import date, datetime
 from django.contrib.auth import authenticate
 
@@ -23,7 +26,18 @@ from .serializers import (
 from core.models.sites import Site
 from proyectos.models import Componente
 from photos.models import Photos
+from photos.jobs import schedule_photo_processing
+from photos.dedup import store_photo
+from photos.bulk import BulkPhotoError, bulk_delete_photos, bulk_move_photos, delete_photo
+from photos.models import PhotoTombstone, photo_media_version
+from photos.metrics import elapsed_ms, record_upload, track_upload_timings
+from photos.models import PhotoUploadSession, PhotoUploadMetric
+from core.utils.media import versioned_media_url
+from photos.chunked_upload import (
+    ChunkUploadError, CHUNK_SIZE, start_upload, append_chunk, complete_upload
+)
 import os
+import time
 import requests
 
 
@@ -395,6 +409,8 @@ def subir_imagenes(request):
 
     POST /api/v1/mobile/subir-imagenes/
     """
+    # Debe agregarse antes de leer request.data
+    upload_timer = track_upload_timings(request)
     try:
         # Validar datos requeridos
         if 'registro_id' not in request.data:
@@ -429,21 +445,33 @@ def subir_imagenes(request):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        for imagen in files:
-            # Crear el objeto Photos
-            photo = Photos.objects.create(
+        for index, imagen in enumerate(files):
+            # Crear el objeto Photos; un reintento con la misma imagen
+            # devuelve la foto ya guardada en lugar de duplicarla
+            start = time.perf_counter()
+            photo, created = store_photo(
+                imagen,
                 content_type=ContentType.objects.get_for_model(registro),
                 object_id=registro.id,
                 app='reg_construccion',
                 etapa='imagenes',
-                imagen=imagen,
                 descripcion=captions.pop(0) if captions else ''
             )
+            record_upload(
+                photo, created, PhotoUploadMetric.SOURCE_MOBILE, registro, imagen.size,
+                receive_ms=upload_timer.receive_ms('imagenes', index),
+                storage_ms=elapsed_ms(start),
+            )
+            if created and photo.processing_state != Photos.PROCESSING_READY:
+                schedule_photo_processing(photo)
             base_image_url = request.build_absolute_uri('/')[:-1]
-            final_image_url = base_image_url + photo.imagen.url
+            final_image_url = base_image_url + photo.image_url
             imagenes_subidas.append({
                 'id': photo.id,
                 'image_url': final_image_url,
+                'thumbnail_url': base_image_url + photo.thumbnail_url,
+                'processing_state': photo.processing_state,
+                'duplicada': not created,
                 'caption': photo.descripcion,
                 'uploaded_at': photo.created_at.isoformat()
             })
@@ -462,6 +490,151 @@ def subir_imagenes(request):
         )
 
 
+def _sesion_subida_data(session):
+    """Estado de una subida por partes para el cliente."""
+    return {
+        'upload_id': str(session.id),
+        'filename': session.filename,
+        'total_size': session.total_size,
+        'received_size': session.received_size,
+        'chunk_size': CHUNK_SIZE,
+        'status': session.status,
+    }
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def iniciar_subida_imagen(request):
+    """
+    6.1 API para iniciar la subida por partes de una imagen.
+
+    POST /api/v1/mobile/subir-imagen/iniciar/
+    """
+    try:
+        required_fields = ['registro_id', 'filename', 'size']
+        for field in required_fields:
+            if field not in request.data:
+                return Response(
+                    {'error': f'El campo {field} es requerido'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+        try:
+            registro = RegConstruccion.objects.get(
+                id=request.data['registro_id'],
+                user=request.user,
+                is_active=True
+            )
+        except RegConstruccion.DoesNotExist:
+            return Response(
+                {'error': 'Registro no encontrado o no tienes permisos'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        session = start_upload(
+            user=request.user,
+            registro=registro,
+            etapa='imagenes',
+            filename=request.data['filename'],
+            total_size=int(request.data['size']),
+            sha256=request.data.get('sha256', ''),
+            mime_type=request.data.get('content_type', 'image/jpeg'),
+            descripcion=request.data.get('caption', '')
+        )
+        return Response(_sesion_subida_data(session), status=status.HTTP_201_CREATED)
+
+    except (ChunkUploadError, ValueError) as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    except Exception as e:
+        return Response(
+            {'error': f'Error al iniciar la subida: {str(e)}'},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+
+@api_view(['GET', 'PUT'])
+@permission_classes([IsAuthenticated])
+def subida_imagen_parte(request, upload_id):
+    """
+    6.2 API para consultar el estado de una subida (GET) o enviar un bloque (PUT).
+
+    GET /api/v1/mobile/subir-imagen/<upload_id>/
+    PUT /api/v1/mobile/subir-imagen/<upload_id>/
+
+    El bloque se envía como multipart con los campos ``offset``,
+    ``checksum`` (SHA-256 del bloque) y ``chunk`` (archivo).
+    """
+    session = get_object_or_404(PhotoUploadSession, id=upload_id, user=request.user)
+    if request.method == 'GET':
+        return Response(_sesion_subida_data(session), status=status.HTTP_200_OK)
+
+    try:
+        chunk = request.FILES.get('chunk')
+        if chunk is None or 'offset' not in request.data:
+            return Response(
+                {'error': 'Los campos offset y chunk son requeridos'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        session = append_chunk(
+            session.id,
+            offset=int(request.data['offset']),
+            data=chunk.read(),
+            checksum=request.data.get('checksum', '')
+        )
+        return Response(_sesion_subida_data(session), status=status.HTTP_200_OK)
+
+    except ChunkUploadError as e:
+        data = {'error': str(e)}
+        if e.received_size is not None:
+            data['received_size'] = e.received_size
+            return Response(data, status=status.HTTP_409_CONFLICT)
+        return Response(data, status=status.HTTP_400_BAD_REQUEST)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    except Exception as e:
+        return Response(
+            {'error': f'Error al recibir el bloque: {str(e)}'},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def completar_subida_imagen(request, upload_id):
+    """
+    6.3 API para completar una subida por partes y crear la imagen.
+
+    POST /api/v1/mobile/subir-imagen/<upload_id>/completar/
+    """
+    session = get_object_or_404(PhotoUploadSession, id=upload_id, user=request.user)
+    try:
+        photo, created = complete_upload(session.id)
+        base_image_url = request.build_absolute_uri('/')[:-1]
+        return Response({
+            'message': 'Imagen subida exitosamente',
+            'imagen': {
+                'id': photo.id,
+                'image_url': base_image_url + photo.image_url,
+                'thumbnail_url': base_image_url + photo.thumbnail_url,
+                'processing_state': photo.processing_state,
+                'duplicada': not created,
+                'caption': photo.descripcion,
+                'uploaded_at': photo.created_at.isoformat()
+            }
+        }, status=status.HTTP_200_OK)
+
+    except ChunkUploadError as e:
+        return Response(
+            {'error': str(e), 'received_size': e.received_size},
+            status=status.HTTP_409_CONFLICT
+        )
+    except Exception as e:
+        return Response(
+            {'error': f'Error al completar la subida: {str(e)}'},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+
 @api_view(["PUT"])
 def editar_imagen(request, imagen_id):
     """
@@ -486,7 +659,7 @@ def editar_imagen(request, imagen_id):
             'message': 'Imagen actualizada exitosamente',
             'imagen': {
                 'id': imagen.id,
-                'image_url': request.build_absolute_uri(imagen.imagen.url),
+                'image_url': request.build_absolute_uri(imagen.image_url),
                 'caption': imagen.descripcion,
                 'uploaded_at': imagen.created_at.isoformat()
             }
@@ -512,24 +685,23 @@ def obtener_imagenes(request, registro_id):
     Api para mostrar las imagenes de un registro.
     """
     try:
-        registro = RegConstruccion.objects.get(id=registro_id)
-        imagenes = Photos.objects.filter(
-            content_type=ContentType.objects.get_for_model(registro),
-            object_id=registro.id,
-            app='reg_construccion',
-            etapa='imagenes'
-        ).order_by('-created_at')
-        imagenes_list = []
-        for imagen in imagenes:
-            base_image_url = request.build_absolute_uri('/')[:-1]
-            final_image_url = base_image_url + imagen.imagen.url
-            imagenes_list.append({
-                'id': imagen.id,
-                'image_url': final_image_url,
-                'caption': imagen.descripcion,
-                'uploaded_at': imagen.created_at.isoformat()
-            })
-            print(imagenes_list)
+        registro = RegConstruccion.objects.only('id').get(id=registro_id)
+        imagenes = _imagenes_registro(registro).order_by('-created_at')
+        base_url = request.build_absolute_uri('/')[:-1]
+        storage = Photos._meta.get_field('imagen').storage
+        imagenes_list = [
+            {
+                'id': row['id'],
+                'image_url': base_url + versioned_media_url(
+                    row['imagen'], photo_media_version(row['file_digest'], row['digest'], row['updated_at']), storage
+                ),
+                'caption': row['descripcion'],
+                'uploaded_at': row['created_at'].isoformat()
+            }
+            for row in imagenes.values(
+                'id', 'imagen', 'digest', 'file_digest', 'descripcion', 'created_at', 'updated_at'
+            )
+        ]
         return Response(imagenes_list, status=status.HTTP_200_OK)
     except Exception as e:
         return Response(
@@ -538,13 +710,113 @@ def obtener_imagenes(request, registro_id):
         )
 
 
+def _imagenes_registro(registro):
+    """Fotos de la etapa de imágenes de un registro."""
+    return Photos.objects.filter(
+        content_type=ContentType.objects.get_for_model(registro),
+        object_id=registro.id,
+        app='reg_construccion',
+        etapa='imagenes'
+    )
+
+
+class ImagenesCursorPagination(CursorPagination):
+    """
+    Paginación por cursor para la sincronización de imágenes.
+
+    Ordena por fecha de modificación: una página no se desplaza aunque se
+    suban fotos nuevas mientras el cliente recorre el listado.
+    """
+    ordering = ('updated_at', 'id')
+    page_size = 50
+    page_size_query_param = 'limit'
+    max_page_size = 200
+
+
+# Campos leídos para el listado (sin instanciar modelos)
+IMAGENES_FIELDS = (
+    'id', 'imagen', 'renditions', 'digest', 'file_digest', 'width', 'height', 'descripcion',
+    'orden', 'processing_state', 'taken_at', 'created_at', 'updated_at',
+)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def listar_imagenes(request, registro_id):
+    """
+    Lista paginada (por cursor) de las imágenes de un registro.
+
+    GET /api/v1/mobile/imagenes/{registro_id}/?limit=50&since=<ISO 8601>
+
+    ``since`` devuelve solo las imágenes creadas o modificadas después de esa
+    fecha (sincronización incremental) y, en ``deleted``, los IDs de las
+    imágenes eliminadas o movidas a otro registro desde entonces. Para
+    continuar, seguir el enlace ``next`` de la respuesta.
+    """
+    registro = RegConstruccion.objects.filter(id=registro_id).only('id').first()
+    if registro is None:
+        return Response({'error': 'Registro no encontrado'}, status=status.HTTP_404_NOT_FOUND)
+
+    imagenes = _imagenes_registro(registro)
+    deleted = []
+    since = request.query_params.get('since')
+    if since:
+        since_dt = parse_datetime(since)
+        if since_dt is None:
+            return Response(
+                {'error': 'since debe ser una fecha ISO 8601'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if timezone.is_naive(since_dt):
+            since_dt = timezone.make_aware(since_dt)
+        # Una foto que volvió a la etapa después de salir no se informa como eliminada
+        deleted = list(
+            PhotoTombstone.objects.filter(
+                content_type=ContentType.objects.get_for_model(registro),
+                object_id=registro.id,
+                etapa='imagenes',
+                deleted_at__gt=since_dt,
+            ).exclude(photo_id__in=imagenes.values('id'))
+            .order_by('photo_id').values_list('photo_id', flat=True).distinct()
+        )
+        imagenes = imagenes.filter(updated_at__gt=since_dt)
+
+    paginator = ImagenesCursorPagination()
+    page = paginator.paginate_queryset(imagenes.values(*IMAGENES_FIELDS), request)
+
+    # La URL base se calcula una sola vez para toda la página
+    base_url = request.build_absolute_uri('/')[:-1]
+    storage = Photos._meta.get_field('imagen').storage
+    results = []
+    for row in page:
+        version = photo_media_version(row['file_digest'], row['digest'], row['updated_at'])
+        thumb = (row['renditions'] or {}).get('thumb') or row['imagen']
+        results.append({
+            'id': row['id'],
+            'image_url': base_url + versioned_media_url(row['imagen'], version, storage),
+            'thumbnail_url': base_url + versioned_media_url(thumb, version, storage),
+            'width': row['width'],
+            'height': row['height'],
+            'digest': row['digest'],
+            'caption': row['descripcion'],
+            'orden': row['orden'],
+            'processing_state': row['processing_state'],
+            'taken_at': row['taken_at'].isoformat() if row['taken_at'] else None,
+            'uploaded_at': row['created_at'].isoformat(),
+            'updated_at': row['updated_at'].isoformat(),
+        })
+    response = paginator.get_paginated_response(results)
+    response.data['deleted'] = deleted
+    return response
+
+
 # hacer la api para eliminar la imagen
 @api_view(["PUT"])
 @permission_classes([IsAuthenticated])
 def eliminar_imagen(request, imagen_id):
     try:
         imagen = get_object_or_404(Photos, id=imagen_id)
-        imagen.delete()
+        delete_photo(imagen)
 
         return Response({
             'message': 'Imagen eliminada exitosamente'
@@ -556,6 +828,77 @@ def eliminar_imagen(request, imagen_id):
         )
 
 
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def imagenes_lote(request):
+    """
+    API para eliminar o mover varias imágenes de un registro.
+
+    POST /api/v1/mobile/imagenes/lote/
+
+    ``accion`` es ``eliminar`` o ``mover``; para mover se indica
+    ``destino_registro_id`` (otro registro del mismo usuario).
+    """
+    try:
+        for field in ('registro_id', 'accion', 'imagen_ids'):
+            if field not in request.data:
+                return Response(
+                    {'error': f'El campo {field} es requerido'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+        # Una sola verificación de permisos para todo el lote
+        registros = RegConstruccion.objects.filter(user=request.user, is_active=True)
+        registro = registros.filter(id=request.data['registro_id']).first()
+        if registro is None:
+            return Response(
+                {'error': 'Registro no encontrado o no tienes permisos'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        queryset = _imagenes_registro(registro)
+
+        accion = request.data['accion']
+        if accion == 'eliminar':
+            eliminadas = bulk_delete_photos(queryset, request.data['imagen_ids'])
+            return Response({
+                'message': f'{len(eliminadas)} imágenes eliminadas exitosamente',
+                'eliminadas': eliminadas,
+            }, status=status.HTTP_200_OK)
+
+        if accion == 'mover':
+            destino = registros.filter(id=request.data.get('destino_registro_id')).first()
+            if destino is None:
+                return Response(
+                    {'error': 'Registro destino no encontrado o no tienes permisos'},
+                    status=status.HTTP_404_NOT_FOUND
+                )
+            result = bulk_move_photos(
+                queryset,
+                request.data['imagen_ids'],
+                ContentType.objects.get_for_model(destino),
+                destino.id,
+                'imagenes',
+            )
+            return Response({
+                'message': f"{len(result['moved'])} imágenes movidas exitosamente",
+                'movidas': result['moved'],
+                'omitidas': result['skipped'],
+            }, status=status.HTTP_200_OK)
+
+        return Response(
+            {'error': 'La acción debe ser eliminar o mover'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    except BulkPhotoError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    except Exception as e:
+        return Response(
+            {'error': f'Error al procesar las imágenes: {str(e)}'},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def obtener_registro_completo(request, registro_id):
@@ -11,6 +11,9 @@ from django.shortcuts import render
 from core.models.google_maps import GoogleMapsImage
 from django.contrib.contenttypes.models import ContentType
 from reg_construccion.config import PASOS_CONFIG
+from pdf_reports.cache import CachedPDFMixin
+from pdf_reports.images import print_image_url
+from reg_construccion.avance import avance_registro
 
 def convert_lat_to_dms(lat):
     if lat is None:
@@ -34,8 +37,9 @@ def convert_lon_to_dms(lon):
     seconds = round((minutes_full - minutes) * 60, 2)
     return f"{direction} {degrees}° {minutes}' {seconds}''"
 
-class RegConstruccionPDFView(WeasyTemplateView):
+class RegConstruccionPDFView(CachedPDFMixin, WeasyTemplateView):
     template_name = 'reportes_reg_construccion/reg_construccion.html'
+    registro_model = RegConstruccion
     pdf_options = {
         'default-font-family': 'Arial',
         'default-font-size': 12,
@@ -43,6 +47,21 @@ class RegConstruccionPDFView(WeasyTemplateView):
     }
     pdf_stylesheets = [str(Path(settings.BASE_DIR) / 'static/css/weasyprint.css')]
 
+    def get_fingerprint_extra(self, registro):
+        """Componentes de la tabla de avance (nombres e incidencias de la estructura)."""
+        from reg_construccion.models import AvanceComponente
+        from proyectos.models import ComponenteGrupo
+        extra = list(
+            AvanceComponente.objects.filter(registro=registro)
+            .order_by('pk').values_list('pk', 'componente__nombre')
+        )
+        if registro.estructura_id:
+            extra += list(
+                ComponenteGrupo.objects.filter(grupo_id=registro.estructura_id)
+                .order_by('pk').values_list('pk', 'componente_id', 'componente__nombre', 'incidencia', 'orden')
+            )
+        return extra
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         registro_id = self.kwargs.get('registro_id')
@@ -141,125 +160,20 @@ class RegConstruccionPDFView(WeasyTemplateView):
 
     def _add_avance_componente_table_data(self, context, registro):
         """Agrega los datos de la tabla de avance por componente al contexto."""
-        from reg_construccion.models import AvanceComponente
-        from proyectos.models import Componente, ComponenteGrupo
-        
-        # Obtener los componentes de la estructura seleccionada
-        if registro.estructura:
-            # Obtener todos los componentes activos de la estructura con su incidencia
-            componentes_estructura = ComponenteGrupo.objects.filter(
-                grupo=registro.estructura
-            ).select_related('componente').order_by('orden', 'id')
-            
-            # Obtener avances existentes para esta estructura
-            avances_existentes = AvanceComponente.objects.filter(
-                registro=registro,
-                componente__in=[gc.componente for gc in componentes_estructura]
-            ).order_by('componente__nombre', '-fecha', '-created_at')
-            
-            # Crear un diccionario de avances por componente
-            avances_por_componente = {}
-            for avance in avances_existentes:
-                if avance.componente_id not in avances_por_componente:
-                    avances_por_componente[avance.componente_id] = []
-                avances_por_componente[avance.componente_id].append(avance)
-            
-            # Generar datos de tabla
-            table_data = []
-            total_ejec_anterior = 0
-            total_ejec_actual = 0
-            total_ejec_acumulada = 0
-            total_ejecucion_total = 0
-            
-            for gc in componentes_estructura:
-                componente = gc.componente
-                avances_componente = avances_por_componente.get(componente.id, [])
-                
-                # Calcular porcentajes de ejecución
-                ejec_anterior = 0
-                ejec_actual = 0
-                
-                if avances_componente:
-                    # Obtener el avance más reciente
-                    ultimo_avance = avances_componente[0]
-                    ejec_actual = ultimo_avance.porcentaje_actual
-                    
-                    # Cada fecha es independiente - ejec_anterior es el valor guardado en esta fecha
-                    ejec_anterior = ultimo_avance.porcentaje_acumulado - ultimo_avance.porcentaje_actual
-                    
-                    # Asegurar que no sea negativo
-                    if ejec_anterior < 0:
-                        ejec_anterior = 0
-                else:
-                    # Sin avances, todos los valores son 0
-                    ejec_anterior = 0
-                    ejec_actual = 0
-                
-                # Calcular ejecución acumulada
-                ejec_acumulada = ejec_anterior + ejec_actual
-                
-                # Calcular ejecución total (incidencia × ejecución acumulada)
-                incidencia = float(gc.incidencia)
-                ejecucion_total = (incidencia / 100) * ejec_acumulada
-                
-                # Acumular totales
-                total_ejec_anterior += ejec_anterior
-                total_ejec_actual += ejec_actual
-                total_ejec_acumulada += ejec_acumulada
-                total_ejecucion_total += ejecucion_total
-                
-                row_data = {
-                    'componente': componente.nombre,
-                    'incidencia': f"{incidencia:.1f}%",
-                    'ejec_anterior': f"{ejec_anterior}%",
-                    'ejec_actual': f"{ejec_actual}%",
-                    'ejec_acumulada': f"{ejec_acumulada}%",
-                    'ejecucion_total': f"{ejecucion_total:.1f}%"
-                }
-                
-                table_data.append(row_data)
-            
-            # Agregar totales
-            context['avance_componente_table'] = {
-                'table_data': table_data,
-                'total_ejec_anterior': f"{total_ejec_anterior:.1f}%",
-                'total_ejec_actual': f"{total_ejec_actual:.1f}%",
-                'total_ejec_acumulada': f"{total_ejec_acumulada:.1f}%",
-                'total_ejecucion_total': f"{total_ejecucion_total:.1f}%"
-            }
-            
-            # Agregar datos para gráfico
+        avance = avance_registro(registro)
+        context['avance_componente_table'] = {
+            'table_data': avance['rows'],
+            'totals': avance['totals'],
+        }
+
+        # Agregar datos para gráfico
+        if avance['estructura']:
+            rows = avance['rows']
             context['avance_componente_chart'] = {
-                'componentes': [row['componente'] for row in table_data],
-                'ejecucion_total': [float(row['ejecucion_total'].replace('%', '')) for row in table_data],
-                'ejec_actual': [float(row['ejec_actual'].replace('%', '')) for row in table_data],
-                'ejec_anterior': [float(row['ejec_anterior'].replace('%', '')) for row in table_data]
-            }
-        else:
-            # Si no hay estructura seleccionada, mostrar todos los avances
-            avances_componente = AvanceComponente.objects.filter(
-                registro=registro
-            ).order_by('componente__nombre', '-fecha', '-created_at')
-            
-            # Convertir a formato de tabla
-            table_data = []
-            for avance in avances_componente:
-                row_data = {
-                    'componente': avance.componente.nombre,
-                    'incidencia': 'N/A',
-                    'ejec_anterior': f"{avance.porcentaje_actual}%",
-                    'ejec_actual': f"{avance.porcentaje_actual}%",
-                    'ejec_acumulada': f"{avance.porcentaje_acumulado}%",
-                    'ejecucion_total': 'N/A'
-                }
-                table_data.append(row_data)
-            
-            context['avance_componente_table'] = {
-                'table_data': table_data,
-                'total_ejec_anterior': 'N/A',
-                'total_ejec_actual': 'N/A',
-                'total_ejec_acumulada': 'N/A',
-                'total_ejecucion_total': 'N/A'
+                'componentes': [row['componente'] for row in rows],
+                'ejecucion_total': [row['ejecucion_total'] for row in rows],
+                'ejec_actual': [row['ejec_actual'] for row in rows],
+                'ejec_anterior': [row['ejec_anterior'] for row in rows],
             }
 
     def _get_photos(self, registro, etapa):
@@ -285,7 +199,7 @@ class RegConstruccionPDFView(WeasyTemplateView):
         fotos_list = []
         for foto in fotos:
             fotos_list.append({
-                'src': foto.imagen.url,
+                'src': print_image_url(foto),
                 'alt': foto.descripcion or f'Foto de {etapa} {registro.sitio.pti_cell_id}',
                 'descripcion': foto.descripcion,
                 'orden': foto.orden
@@ -0,0 +1,128 @@
+from datetime import date
+
+from django.test import TestCase
+
+from core.models.sites import Site
+from proyectos.models import Componente, ComponenteGrupo, GrupoComponentes
+
+from .avance import avance_ponderado, avance_por_componente, avance_registro
+from .models import AvanceComponente, RegConstruccion
+
+
+def _formula_anterior(avances, incidencias):
+    """
+    Cálculo de las vistas antes de ``reg_construccion.avance``: por
+    componente, el avance más reciente; ``incidencia / 100 × acumulada``.
+    """
+    total = 0.0
+    for componente_id, incidencia in incidencias.items():
+        del_componente = sorted(
+            (avance for avance in avances if avance.componente_id == componente_id),
+            key=lambda avance: avance.fecha,
+            reverse=True,
+        )
+        if not del_componente:
+            continue
+        ultimo = del_componente[0]
+        anterior = max(ultimo.porcentaje_acumulado - ultimo.porcentaje_actual, 0)
+        total += (float(incidencia) / 100) * (anterior + ultimo.porcentaje_actual)
+    return total
+
+
+class AvanceComponenteTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        sitio = Site.objects.create(name='Sitio Test', pti_cell_id='PTI-T', region='RM')
+        cls.losa, cls.torre, cls.cerco = (
+            Componente.objects.create(nombre=nombre) for nombre in ('Losa', 'Torre', 'Cerco')
+        )
+        cls.estructura = GrupoComponentes.objects.create(nombre='Estructura Test')
+        cls.incidencias = {}
+        for orden, (componente, incidencia) in enumerate(
+            [(cls.losa, '50.00'), (cls.torre, '30.50'), (cls.cerco, '19.50')]
+        ):
+            ComponenteGrupo.objects.create(
+                grupo=cls.estructura, componente=componente, incidencia=incidencia, orden=orden
+            )
+            cls.incidencias[componente.id] = incidencia
+
+        cls.registro = RegConstruccion.objects.create(sitio=sitio, title='Con estructura', estructura=cls.estructura)
+        cls.sin_estructura = RegConstruccion.objects.create(sitio=sitio, title='Sin estructura')
+
+        # bulk_create: sin el cálculo automático de AvanceComponente.save()
+        cls.avances = AvanceComponente.objects.bulk_create([
+            AvanceComponente(registro=cls.registro, componente=cls.losa, fecha=date(2026, 1, 1),
+                             porcentaje_actual=20, porcentaje_acumulado=20),
+            AvanceComponente(registro=cls.registro, componente=cls.losa, fecha=date(2026, 2, 1),
+                             porcentaje_actual=15, porcentaje_acumulado=35),
+            # Acumulado menor que el actual: ejec_anterior no puede ser negativo
+            AvanceComponente(registro=cls.registro, componente=cls.torre, fecha=date(2026, 2, 1),
+                             porcentaje_actual=10, porcentaje_acumulado=5),
+            AvanceComponente(registro=cls.sin_estructura, componente=cls.cerco, fecha=date(2026, 1, 1),
+                             porcentaje_actual=30, porcentaje_acumulado=40),
+            AvanceComponente(registro=cls.sin_estructura, componente=cls.losa, fecha=date(2026, 1, 1),
+                             porcentaje_actual=5, porcentaje_acumulado=5),
+        ])
+
+    def test_usa_el_avance_mas_reciente_de_cada_componente(self):
+        avance = avance_registro(self.registro)
+        rows = {row['componente']: row for row in avance['rows']}
+
+        self.assertTrue(avance['estructura'])
+        self.assertEqual(list(rows), ['Losa', 'Torre', 'Cerco'])
+        self.assertEqual(
+            (rows['Losa']['ejec_anterior'], rows['Losa']['ejec_actual'], rows['Losa']['ejec_acumulada']),
+            (20, 15, 35),
+        )
+        self.assertEqual(
+            (rows['Torre']['ejec_anterior'], rows['Torre']['ejec_actual'], rows['Torre']['ejec_acumulada']),
+            (0, 10, 10),
+        )
+        # Componente sin avances
+        self.assertEqual(rows['Cerco']['ejec_acumulada'], 0)
+        self.assertEqual(rows['Cerco']['ejecucion_total'], 0)
+
+    def test_total_ponderado_igual_a_la_formula_anterior(self):
+        esperado = _formula_anterior(
+            [avance for avance in self.avances if avance.registro_id == self.registro.pk],
+            self.incidencias,
+        )
+        avance = avance_registro(self.registro)
+
+        self.assertAlmostEqual(avance['totals']['ejecucion_total'], esperado)
+        self.assertAlmostEqual(esperado, 0.5 * 35 + 0.305 * 10)
+        self.assertAlmostEqual(
+            avance['totals']['ejecucion_total'],
+            sum(row['ejecucion_total'] for row in avance['rows']),
+        )
+
+    def test_registro_sin_estructura(self):
+        avance = avance_registro(self.sin_estructura)
+        rows = {row['componente']: row for row in avance['rows']}
+
+        self.assertFalse(avance['estructura'])
+        self.assertIsNone(avance['totals'])
+        self.assertEqual(list(rows), ['Cerco', 'Losa'])
+        self.assertIsNone(rows['Cerco']['incidencia'])
+        self.assertIsNone(rows['Cerco']['ejecucion_total'])
+        # ejec_anterior es acumulado - actual, como con estructura (las vistas
+        # anteriores repetían por error el porcentaje actual)
+        self.assertEqual(rows['Cerco']['ejec_anterior'], 10)
+        self.assertEqual(rows['Cerco']['ejec_actual'], 30)
+        self.assertEqual(rows['Cerco']['ejec_acumulada'], 40)
+
+    def test_varios_registros_en_una_llamada(self):
+        with self.assertNumQueries(2):
+            avances = avance_por_componente([self.registro, self.sin_estructura])
+        self.assertEqual(avances[self.registro.pk], avance_registro(self.registro))
+        self.assertEqual(avances[self.sin_estructura.pk], avance_registro(self.sin_estructura))
+
+    def test_avance_ponderado_igual_al_total_por_componente(self):
+        with self.assertNumQueries(3):
+            totales = avance_ponderado(RegConstruccion.objects.all())
+
+        self.assertAlmostEqual(
+            totales[self.registro.pk],
+            avance_registro(self.registro)['totals']['ejecucion_total'],
+        )
+        self.assertIsNone(totales[self.sin_estructura.pk])
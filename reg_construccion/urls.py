@@ -47,5 +47,5 @@ urlpatterns = [
     # path('actualizar-ejecucion/<int:registro_id>/', actualizar_ejecucion_ajax, name='actualizar_ejecucion_ajax'),  # NO USADO
     
     # URLs de photos específicas para reg_construccion
-    path('<int:registro_id>/<str:step_name>/photos/', include('photos.urls')),  # NO USADO
+    path('<int:registro_id>/<str:step_name>/photos/', include('photos.urls'), {'app_name': 'reg_construccion'}),
 ]
\ No newline at end of file
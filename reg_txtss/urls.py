@@ -31,5 +31,5 @@ urlpatterns = [
     path('preview/<int:registro_id>/', preview_reg_txtss_individual, name='preview'),
     
     # URLs de photos específicas para reg_txtss
-    path('<int:registro_id>/<str:step_name>/photos/', include('photos.urls')),
+    path('<int:registro_id>/<str:step_name>/photos/', include('photos.urls'), {'app_name': 'reg_txtss'}),
 ] 
\ No newline at end of file
@@ -9,6 +9,7 @@ from django.db import models
 from django.core.exceptions import ValidationError
 from django.db import transaction
 from registros.components.base import ElementoRegistro
+from registros.registry import register
 
 
 class SubElementoConfig:
@@ -124,6 +125,9 @@ class RegistroConfig:
         self.allow_multiple_per_site = allow_multiple_per_site
         self.project = project
 
+        # Registrar el tipo de registro para resolverlo por namespace
+        register(self)
+
 
 class ElementoGenerico(ElementoRegistro):
     """
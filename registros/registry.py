@@ -0,0 +1,79 @@
+"""
+Registro central de los tipos de registro (RegTxtss, RegConstruccion, ...).
+
+Asocia el namespace de cada aplicación (el mismo que se usa en las URLs,
+p. ej. ``reg_construccion``) con su modelo de registro, para resolver un
+registro a partir de ``(app, id)`` con una sola consulta.
+
+Los modelos se descubren automáticamente a partir de las subclases de
+``RegistroBase``; cada ``RegistroConfig`` además registra su
+``app_namespace`` al crearse.
+"""
+
+from django.apps import apps
+
+from registros.models.base import RegistroBase
+
+_models = {}
+_configs = {}
+_discovered = False
+
+
+def register(config):
+    """Registra la configuración de un tipo de registro."""
+    namespace = config.app_namespace or config.registro_model._meta.app_label
+    _configs[namespace] = config
+    _models[namespace] = config.registro_model
+
+
+def _discover():
+    global _discovered
+    if _discovered:
+        return
+    for model in apps.get_models():
+        if issubclass(model, RegistroBase):
+            _models.setdefault(model._meta.app_label, model)
+    _discovered = True
+
+
+def get_registro_models():
+    """Diccionario ``{namespace: modelo}`` de todos los tipos de registro."""
+    _discover()
+    return dict(_models)
+
+
+def get_registro_model(namespace):
+    """Modelo de registro de una aplicación, o None si no existe."""
+    _discover()
+    return _models.get(namespace)
+
+
+def get_registro_config(namespace):
+    """``RegistroConfig`` de una aplicación, si fue registrada."""
+    return _configs.get(namespace)
+
+
+def get_namespace(registro):
+    """Namespace de la aplicación a la que pertenece un registro."""
+    _discover()
+    model = type(registro)
+    for namespace, registered in _models.items():
+        if registered is model:
+            return namespace
+    return registro._meta.app_label
+
+
+def get_registro(namespace, registro_id, select_related=('sitio',)):
+    """
+    Obtiene un registro a partir del namespace de su aplicación y su ID.
+
+    Returns:
+        RegistroBase: El registro, o None si no existe
+    """
+    model = get_registro_model(namespace)
+    if model is None or registro_id in (None, ''):
+        return None
+    queryset = model.objects.all()
+    if select_related:
+        queryset = queryset.select_related(*select_related)
+    return queryset.filter(pk=registro_id).first()
@@ -16,7 +16,7 @@ from registros.components.registro_config import RegistroConfig, ElementoGeneric
 from registros.components.editable_table import EditableTableElemento
 from registros.forms.activar import create_activar_registro_form
 from registros.tables import create_registros_table
-from reg_construccion.models import EjecucionPorcentajes
+from reg_construccion.avance import avance_registro, guardar_ejecucion_porcentajes
 from typing import Dict, Any
 
 
@@ -457,6 +457,12 @@ class GenericRegistroStepsView(RegistroBreadcrumbsMixin, LoginRequiredMixin, Bre
     def _generate_steps_context(self, registro):
         """Genera el contexto para cada paso."""
         steps_context = []
+
+        # Conteo de fotos de todas las etapas en una sola consulta
+        from photos.models import Photos
+        photo_counts = Photos.count_photos_for_registro(
+            registro, app_name=self.registro_config.app_namespace
+        )
         
         for step_name, paso_config in self.registro_config.pasos.items():
             elemento_config = paso_config.elemento
@@ -488,7 +494,6 @@ class GenericRegistroStepsView(RegistroBreadcrumbsMixin, LoginRequiredMixin, Bre
             # Contar fotos si el paso las tiene
             photo_count = 0
             if has_photos:
-                from photos.models import Photos
                 from django.contrib.contenttypes.models import ContentType
                 
                 # Obtener configuración de fotos para determinar el modelo objetivo
@@ -499,39 +504,17 @@ class GenericRegistroStepsView(RegistroBreadcrumbsMixin, LoginRequiredMixin, Bre
                         break
                 
                 # Si se especifica un modelo objetivo, usarlo; si no, usar el registro principal
+                model_class = type(registro)
                 if target_model:
                     try:
                         from django.apps import apps
-                        app_label = registro._meta.app_label
-                        model_class = apps.get_model(app_label, target_model)
-                        content_type = ContentType.objects.get_for_model(model_class)
-                        
-                        # Buscar la instancia del modelo específico
-                        try:
-                            target_instance = model_class.objects.get(registro_id=registro.id)
-                            object_id = target_instance.id
-                        except model_class.DoesNotExist:
-                            object_id = None
+                        model_class = apps.get_model(registro._meta.app_label, target_model)
                     except LookupError:
-                        # Si no se encuentra el modelo, usar el registro principal
-                        content_type = ContentType.objects.get_for_model(type(registro))
-                        object_id = registro.id
-                else:
-                    # Usar el registro principal por defecto
-                    content_type = ContentType.objects.get_for_model(type(registro))
-                    object_id = registro.id
-                
-                # Determinar el nombre de la app para el filtro
-                app_filter = self.registro_config.app_namespace
+                        pass
                 
-                # Contar fotos para este registro, etapa y app
-                if object_id is not None:
-                    photo_count = Photos.count_photos(
-                        registro_id=object_id,
-                        etapa=step_name,
-                        app_name=app_filter,
-                        content_type=content_type
-                    )
+                # ContentType.get_for_model usa caché: no genera consultas
+                content_type = ContentType.objects.get_for_model(model_class)
+                photo_count = photo_counts.get((content_type.id, step_name), 0)
             
             # Procesar configuración de tabla si existe
             table_config = self._process_table_config(registro, elemento_config, instance, step_name)
@@ -633,135 +616,11 @@ class GenericRegistroStepsView(RegistroBreadcrumbsMixin, LoginRequiredMixin, Bre
         # Por ahora, retornar datos de ejemplo
         # En el futuro, esto se puede personalizar según el data_source
         if data_source == 'avance_componente_data':
-            # Obtener datos del modelo AvanceComponente filtrados por la estructura del registro
-            from reg_construccion.models import AvanceComponente
-            from proyectos.models import Componente, ComponenteGrupo
-            from datetime import datetime, timedelta
-            
-            # Obtener los componentes de la estructura seleccionada
-            if registro.estructura:
-                # Obtener todos los componentes activos de la estructura con su incidencia
-                componentes_estructura = ComponenteGrupo.objects.filter(
-                    grupo=registro.estructura
-                ).select_related('componente').order_by('orden', 'id')
-                
-                # Obtener avances existentes para esta estructura
-                avances_existentes = AvanceComponente.objects.filter(
-                    registro=registro,
-                    componente__in=[gc.componente for gc in componentes_estructura]
-                ).order_by('componente__nombre', '-fecha', '-created_at')
-                
-                # Crear un diccionario de avances por componente
-                avances_por_componente = {}
-                for avance in avances_existentes:
-                    if avance.componente_id not in avances_por_componente:
-                        avances_por_componente[avance.componente_id] = []
-                    avances_por_componente[avance.componente_id].append(avance)
-                
-                # Generar datos de tabla
-                table_data = []
-                total_ejec_anterior = 0
-                total_ejec_actual = 0
-                total_ejec_acumulada = 0
-                total_ejecucion_total = 0
-                
-                for gc in componentes_estructura:
-                    componente = gc.componente
-                    avances_componente = avances_por_componente.get(componente.id, [])
-                    
-                    # Calcular porcentajes de ejecución
-                    ejec_anterior = 0
-                    ejec_actual = 0
-                    
-                    if avances_componente:
-                        # Obtener el avance más reciente
-                        ultimo_avance = avances_componente[0]
-                        ejec_actual = ultimo_avance.porcentaje_actual
-                        
-                        # Cada fecha es independiente - ejec_anterior es el valor guardado en esta fecha
-                        # No depende de otras fechas
-                        ejec_anterior = ultimo_avance.porcentaje_acumulado - ultimo_avance.porcentaje_actual
-                        
-                        # Asegurar que no sea negativo
-                        if ejec_anterior < 0:
-                            ejec_anterior = 0
-                    else:
-                        # Sin avances, todos los valores son 0
-                        ejec_anterior = 0
-                        ejec_actual = 0
-                    
-                    # Calcular ejecución acumulada
-                    ejec_acumulada = ejec_anterior + ejec_actual
-                    
-                    # Calcular ejecución total (incidencia × ejecución acumulada)
-                    incidencia = float(gc.incidencia)
-                    ejecucion_total = (incidencia / 100) * ejec_acumulada
-                    
-                    # Acumular totales
-                    total_ejec_anterior += ejec_anterior
-                    total_ejec_actual += ejec_actual
-                    total_ejec_acumulada += ejec_acumulada
-                    total_ejecucion_total += ejecucion_total
-                    
-                    # Guardar los porcentajes calculados en el modelo EjecucionPorcentajes
-                    try:
-                        ejecucion_porcentaje, created = EjecucionPorcentajes.objects.update_or_create(
-                            registro=registro,
-                            componente=componente,
-                            defaults={
-                                'porcentaje_ejec_actual': ejec_actual,
-                                'porcentaje_ejec_anterior': ejec_anterior,
-                            }
-                        )
-                    except Exception as e:
-                        # Si hay algún error al guardar, continuar sin interrumpir
-                        print(f"Error al guardar porcentajes para componente {componente.nombre}: {e}")
-                    
-                    row_data = {
-                        'componente': componente.nombre,
-                        'componente_id': componente.id,
-                        'incidencia': f"{incidencia:.1f}%",
-                        'incidencia_valor': incidencia,
-                        'ejec_anterior': f"{ejec_anterior}%",
-                        'ejec_anterior_valor': ejec_anterior,
-                        'ejec_actual': f"{ejec_actual}%",
-                        'ejec_actual_valor': ejec_actual,
-                        'ejec_acumulada': f"{ejec_acumulada}%",
-                        'ejecucion_total': f"{ejecucion_total:.1f}%"
-                    }
-                    
-                    table_data.append(row_data)
-                
-                # Agregar totales al contexto
-                context = {
-                    'table_data': table_data,
-                    'total_ejec_anterior': f"{total_ejec_anterior:.1f}%",
-                    'total_ejec_actual': f"{total_ejec_actual:.1f}%",
-                    'total_ejec_acumulada': f"{total_ejec_acumulada:.1f}%",
-                    'total_ejecucion_total': f"{total_ejecucion_total:.1f}%"
-                }
-                
-                return table_data
-            else:
-                # Si no hay estructura seleccionada, mostrar todos los avances
-                avances_componente = AvanceComponente.objects.filter(
-                    registro=registro
-                ).order_by('componente__nombre', '-fecha', '-created_at')
-                
-                # Convertir a formato de tabla
-                table_data = []
-                for avance in avances_componente:
-                    row_data = {
-                        'componente': avance.componente.nombre,
-                        'incidencia': 'N/A',
-                        'ejec_anterior': f"{avance.porcentaje_actual}%",
-                        'ejec_actual': f"{avance.porcentaje_actual}%",
-                        'ejec_acumulada': f"{avance.porcentaje_acumulado}%",
-                        'ejecucion_total': 'N/A'
-                    }
-                    table_data.append(row_data)
-                
-                return table_data
+            # Tabla de avance por componente (ver reg_construccion.avance)
+            avance = avance_registro(registro)
+            # Guardar los porcentajes calculados en el modelo EjecucionPorcentajes
+            guardar_ejecucion_porcentajes(registro, avance)
+            return avance['rows']
         
         # Datos por defecto
         return [
@@ -795,18 +654,7 @@ class GenericRegistroStepsView(RegistroBreadcrumbsMixin, LoginRequiredMixin, Bre
         print(f"DEBUG: Datos de tabla encontrados: {table_count}")
         
         # Calcular porcentaje total de avance
-        total_ejecucion_total = 0.0
-        if table_data:
-            # Extraer el total de ejecución total de los datos de tabla
-            for item in table_data:
-                if 'ejecucion_total' in item:
-                    # Extraer el valor numérico del string "X.X%"
-                    ejecucion_str = item['ejecucion_total']
-                    try:
-                        ejecucion_valor = float(ejecucion_str.replace('%', ''))
-                        total_ejecucion_total += ejecucion_valor
-                    except (ValueError, AttributeError):
-                        pass
+        total_ejecucion_total = sum(item.get('ejecucion_total') or 0 for item in table_data)
         
         # Determinar color basado en si hay avances guardados
         # Verificar si hay avances para este registro
@@ -877,135 +725,11 @@ class GenericElementoView(RegistroBreadcrumbsMixin, LoginRequiredMixin, Breadcru
         # Por ahora, retornar datos de ejemplo
         # En el futuro, esto se puede personalizar según el data_source
         if data_source == 'avance_componente_data':
-            # Obtener datos del modelo AvanceComponente filtrados por la estructura del registro
-            from reg_construccion.models import AvanceComponente
-            from proyectos.models import Componente, ComponenteGrupo
-            from datetime import datetime, timedelta
-            
-            # Obtener los componentes de la estructura seleccionada
-            if registro.estructura:
-                # Obtener todos los componentes activos de la estructura con su incidencia
-                componentes_estructura = ComponenteGrupo.objects.filter(
-                    grupo=registro.estructura
-                ).select_related('componente').order_by('orden', 'id')
-                
-                # Obtener avances existentes para esta estructura
-                avances_existentes = AvanceComponente.objects.filter(
-                    registro=registro,
-                    componente__in=[gc.componente for gc in componentes_estructura]
-                ).order_by('componente__nombre', '-fecha', '-created_at')
-                
-                # Crear un diccionario de avances por componente
-                avances_por_componente = {}
-                for avance in avances_existentes:
-                    if avance.componente_id not in avances_por_componente:
-                        avances_por_componente[avance.componente_id] = []
-                    avances_por_componente[avance.componente_id].append(avance)
-                
-                # Generar datos de tabla
-                table_data = []
-                total_ejec_anterior = 0
-                total_ejec_actual = 0
-                total_ejec_acumulada = 0
-                total_ejecucion_total = 0
-                
-                for gc in componentes_estructura:
-                    componente = gc.componente
-                    avances_componente = avances_por_componente.get(componente.id, [])
-                    
-                    # Calcular porcentajes de ejecución
-                    ejec_anterior = 0
-                    ejec_actual = 0
-                    
-                    if avances_componente:
-                        # Obtener el avance más reciente
-                        ultimo_avance = avances_componente[0]
-                        ejec_actual = ultimo_avance.porcentaje_actual
-                        
-                        # Cada fecha es independiente - ejec_anterior es el valor guardado en esta fecha
-                        # No depende de otras fechas
-                        ejec_anterior = ultimo_avance.porcentaje_acumulado - ultimo_avance.porcentaje_actual
-                        
-                        # Asegurar que no sea negativo
-                        if ejec_anterior < 0:
-                            ejec_anterior = 0
-                    else:
-                        # Sin avances, todos los valores son 0
-                        ejec_anterior = 0
-                        ejec_actual = 0
-                    
-                    # Calcular ejecución acumulada
-                    ejec_acumulada = ejec_anterior + ejec_actual
-                    
-                    # Calcular ejecución total (incidencia × ejecución acumulada)
-                    incidencia = float(gc.incidencia)
-                    ejecucion_total = (incidencia / 100) * ejec_acumulada
-                    
-                    # Acumular totales
-                    total_ejec_anterior += ejec_anterior
-                    total_ejec_actual += ejec_actual
-                    total_ejec_acumulada += ejec_acumulada
-                    total_ejecucion_total += ejecucion_total
-                    
-                    # Guardar los porcentajes calculados en el modelo EjecucionPorcentajes
-                    try:
-                        ejecucion_porcentaje, created = EjecucionPorcentajes.objects.update_or_create(
-                            registro=registro,
-                            componente=componente,
-                            defaults={
-                                'porcentaje_ejec_actual': ejec_actual,
-                                'porcentaje_ejec_anterior': ejec_anterior,
-                            }
-                        )
-                    except Exception as e:
-                        # Si hay algún error al guardar, continuar sin interrumpir
-                        print(f"Error al guardar porcentajes para componente {componente.nombre}: {e}")
-                    
-                    row_data = {
-                        'componente': componente.nombre,
-                        'componente_id': componente.id,
-                        'incidencia': f"{incidencia:.1f}%",
-                        'incidencia_valor': incidencia,
-                        'ejec_anterior': f"{ejec_anterior}%",
-                        'ejec_anterior_valor': ejec_anterior,
-                        'ejec_actual': f"{ejec_actual}%",
-                        'ejec_actual_valor': ejec_actual,
-                        'ejec_acumulada': f"{ejec_acumulada}%",
-                        'ejecucion_total': f"{ejecucion_total:.1f}%"
-                    }
-                    
-                    table_data.append(row_data)
-                
-                # Agregar totales al contexto
-                context = {
-                    'table_data': table_data,
-                    'total_ejec_anterior': f"{total_ejec_anterior:.1f}%",
-                    'total_ejec_actual': f"{total_ejec_actual:.1f}%",
-                    'total_ejec_acumulada': f"{total_ejec_acumulada:.1f}%",
-                    'total_ejecucion_total': f"{total_ejecucion_total:.1f}%"
-                }
-                
-                return table_data
-            else:
-                # Si no hay estructura seleccionada, mostrar todos los avances
-                avances_componente = AvanceComponente.objects.filter(
-                    registro=registro
-                ).order_by('componente__nombre', '-fecha', '-created_at')
-                
-                # Convertir a formato de tabla
-                table_data = []
-                for avance in avances_componente:
-                    row_data = {
-                        'componente': avance.componente.nombre,
-                        'incidencia': 'N/A',
-                        'ejec_anterior': f"{avance.porcentaje_actual}%",
-                        'ejec_actual': f"{avance.porcentaje_actual}%",
-                        'ejec_acumulada': f"{avance.porcentaje_acumulado}%",
-                        'ejecucion_total': 'N/A'
-                    }
-                    table_data.append(row_data)
-                
-                return table_data
+            # Tabla de avance por componente (ver reg_construccion.avance)
+            avance = avance_registro(registro)
+            # Guardar los porcentajes calculados en el modelo EjecucionPorcentajes
+            guardar_ejecucion_porcentajes(registro, avance)
+            return avance['rows']
         
         # Datos por defecto
         return [